@@ -3,6 +3,12 @@ from flask_cors import CORS
 import os
 from app.routes import register_routes
 from app.database import init_database
+from app.config import PREWARM_ENABLED, IS_SERVERLESS
+from app.prewarm import start_prewarm_thread
+from app.http_cache import init_http_cache
+from app.json_codec import init_json
+from app.metrics import init_metrics
+from app.profiling import init_profiling
 
 def create_app():
     """Create and configure the Flask app for both local and Vercel deployment"""
@@ -12,6 +18,9 @@ def create_app():
     static_dir = os.path.join(base_dir, 'static')
     
     app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
+    init_json(app)  # orjson when available, for jsonify and request.get_json
+    init_metrics(app)  # First, so request timings include the other hooks
+    init_profiling(app)
     
     # Allow CORS for all domains - needed for Flutter app to access API
     CORS(app, supports_credentials=True, resources={r"/api/*": {"origins": "*"}})
@@ -28,6 +37,13 @@ def create_app():
     
     # Register all API routes
     register_routes(app)
+
+    # Compress large JSON/HTML responses
+    init_http_cache(app)
+
+    # Keep the store tabs' feeds cached (needs a long-lived process, so not on Vercel)
+    if PREWARM_ENABLED and not IS_SERVERLESS:
+        start_prewarm_thread()
     
     # Global error handlers to return JSON instead of HTML
     @app.errorhandler(404)
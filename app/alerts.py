@@ -0,0 +1,248 @@
+"""
+Price Alert Matcher
+Checks every batch of freshly normalized products against the active rows in `price_alerts`.
+
+Alerts are held in an in-memory index so a batch never scans the whole table:
+- Alerts with the same (tokenized) product title form a group, whose target prices are kept sorted.
+- Each group is listed in a token posting list under its model numbers, or if the title has
+  none, under a few of its words (a "prefix" big enough that any title similar enough to
+  match must contain at least one of them).
+For a product we look up the groups posted under its words, skip any whose highest target is
+below the price, confirm the title match, and fire every alert from the first target >= price on.
+
+Fired alerts are written to `price_alert_outbox` for delivery and removed from the index.
+Matching runs on a background thread; search requests only enqueue their batch.
+"""
+import os
+import math
+import time
+import queue
+import bisect
+import threading
+from app.config import ALERT_MATCH_THRESHOLD, ALERT_RELOAD_INTERVAL, ALERT_QUEUE_SIZE
+from app.database import get_active_alerts, save_fired_alerts
+from app.matching import title_tokens, similarity, extract_model_numbers
+
+class AlertIndex:
+    """In-memory index of active price alerts. Thread-safe."""
+
+    def __init__(self, threshold=0.6):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._groups = {}    # title tokens -> {"tokens", "models", "targets": [(target, id)], "alerts": {id: alert}}
+        self._postings = {}  # word -> set of group keys
+        self._group_of = {}  # alert id -> group key
+
+    def __len__(self):
+        return len(self._group_of)
+
+    # ---------------------------
+    # Building
+    # ---------------------------
+    def add(self, alert):
+        """Add an alert dict (id, user_id, product_title, target_price, email). Re-adding an id is a no-op."""
+        with self._lock:
+            self._add(alert)
+
+    def replace(self, alerts):
+        """Swap the whole index for a freshly loaded list of alerts."""
+        fresh = AlertIndex(self.threshold)
+        for alert in alerts:
+            fresh._add(alert)
+        with self._lock:
+            self._groups, self._postings, self._group_of = fresh._groups, fresh._postings, fresh._group_of
+
+    def remove(self, alert_id):
+        with self._lock:
+            self._remove(alert_id)
+
+    def _add(self, alert):
+        if alert["id"] in self._group_of:
+            return
+        tokens = frozenset(title_tokens(alert.get("product_title")))
+        if not tokens:
+            return
+        group = self._groups.get(tokens)
+        if group is None:
+            group = {"tokens": tokens, "models": extract_model_numbers(tokens), "targets": [], "alerts": {}}
+            self._groups[tokens] = group
+            for word in self._posting_words(group):
+                self._postings.setdefault(word, set()).add(tokens)
+        target = float(alert["target_price"])
+        bisect.insort(group["targets"], (target, alert["id"]))
+        group["alerts"][alert["id"]] = alert
+        self._group_of[alert["id"]] = tokens
+
+    def _posting_words(self, group):
+        """
+        An alert naming a model only matches listings naming the same model.
+        Otherwise a match shares at least ceil(threshold * n) of the title's n words, so it
+        must contain one of any (n - ceil(threshold * n) + 1) of them; use the rarest ones
+        so posting lists stay short.
+        """
+        if group["models"]:
+            return group["models"]
+        tokens = group["tokens"]
+        needed = max(math.ceil(self.threshold * len(tokens) - 1e-9), 1)
+        by_rarity = sorted(tokens, key=lambda t: (len(self._postings.get(t, ())), -len(t), t))
+        return set(by_rarity[:len(tokens) - needed + 1])
+
+    def _remove(self, alert_id):
+        key = self._group_of.pop(alert_id, None)
+        if key is None:
+            return
+        group = self._groups[key]
+        alert = group["alerts"].pop(alert_id)
+        group["targets"].remove((float(alert["target_price"]), alert_id))
+        if not group["targets"]:
+            del self._groups[key]
+            for word in group["tokens"]:  # Posting words are always a subset of these
+                posting = self._postings.get(word)
+                if posting is not None:
+                    posting.discard(key)
+                    if not posting:
+                        del self._postings[word]
+
+    # ---------------------------
+    # Matching
+    # ---------------------------
+    def _is_match(self, group, tokens):
+        if group["models"]:
+            # The alert names a model: that decides it
+            return bool(group["models"] & tokens)
+        return similarity(group["tokens"], tokens) >= self.threshold
+
+    def match(self, products):
+        """
+        Return [(alert, product)] for every alert whose target price is met by a product in the
+        batch. Each alert fires at most once (on the first product that meets it) and is removed.
+        """
+        fired = []
+        with self._lock:
+            for product in products:
+                price = product.get("price") or 0
+                if price <= 0:
+                    continue
+                tokens = title_tokens(product.get("title"))
+                candidates = set()
+                for word in tokens:
+                    posting = self._postings.get(word)
+                    if posting:
+                        candidates |= posting
+                if not candidates:
+                    continue
+
+                for key in candidates:
+                    group = self._groups.get(key)
+                    # Cheapest check first: does any target in this group allow this price?
+                    if group is None or group["targets"][-1][0] < price:
+                        continue
+                    if not self._is_match(group, tokens):
+                        continue
+                    start = bisect.bisect_left(group["targets"], (price, -math.inf))
+                    hits = [group["alerts"][alert_id] for _, alert_id in group["targets"][start:]]
+                    for alert in hits:
+                        fired.append((alert, product))
+                        self._remove(alert["id"])
+        return fired
+
+    def stats(self):
+        with self._lock:
+            return {
+                "alerts": len(self._group_of),
+                "groups": len(self._groups),
+                "posting_words": len(self._postings)
+            }
+
+alert_index = AlertIndex(ALERT_MATCH_THRESHOLD)
+
+_queue = queue.Queue(maxsize=ALERT_QUEUE_SIZE)
+_worker_pid = None
+_worker_lock = threading.Lock()
+_stats = {"batches": 0, "dropped_batches": 0, "products": 0, "fired": 0, "loaded_at": None}
+
+def check_alerts(products):
+    """Queue a batch of normalized products for alert matching. Never blocks the caller."""
+    if not products:
+        return
+    _start_worker()
+    try:
+        _queue.put_nowait(list(products))
+    except queue.Full:
+        _stats["dropped_batches"] += 1
+
+def register_alert(alert):
+    """Make a newly created alert live in this process without waiting for the next reload."""
+    alert_index.add(alert)
+
+def load_alerts():
+    """(Re)load active alerts - those not already in the outbox - from the database."""
+    rows = get_active_alerts()
+    if rows is None:
+        return False
+    alert_index.replace(rows)
+    _stats["loaded_at"] = time.time()
+    print(f"🔔 Loaded {len(rows)} active price alerts")
+    return True
+
+def process_batch(products):
+    """Match one batch and write any fired alerts to the outbox. Returns how many fired."""
+    fired = alert_index.match(products)
+    _stats["batches"] += 1
+    _stats["products"] += len(products)
+    if not fired:
+        return 0
+    rows = [
+        {
+            "alert_id": alert["id"],
+            "user_id": alert.get("user_id"),
+            "email": alert["email"],
+            "product_id": str(product.get("id") or "")[:255],
+            "product_title": str(product.get("title") or "")[:500],
+            "source": str(product.get("source") or "")[:50],
+            "price": product["price"],
+            "target_price": alert["target_price"]
+        }
+        for alert, product in fired
+    ]
+    # If this fails the alerts come back on the next reload, since they never reached the outbox
+    if save_fired_alerts(rows):
+        _stats["fired"] += len(rows)
+    return len(rows)
+
+def get_stats():
+    return dict(_stats, queued=_queue.qsize(), **alert_index.stats())
+
+def _start_worker():
+    """Start the matcher thread once per process."""
+    global _worker_pid
+    pid = os.getpid()
+    if _worker_pid == pid:
+        return
+    with _worker_lock:
+        if _worker_pid == pid:
+            return
+        _worker_pid = pid
+    threading.Thread(target=_worker_loop, name="price-alerts", daemon=True).start()
+
+def _worker_loop():
+    load_alerts()
+    next_reload = time.monotonic() + ALERT_RELOAD_INTERVAL
+    while True:
+        try:
+            batch = _queue.get(timeout=max(next_reload - time.monotonic(), 0.1))
+        except queue.Empty:
+            batch = None
+        # Pick up alerts created by other worker processes
+        if time.monotonic() >= next_reload:
+            load_alerts()
+            next_reload = time.monotonic() + ALERT_RELOAD_INTERVAL
+        if batch is None:
+            continue
+        try:
+            process_batch(batch)
+        except Exception as e:
+            print(f"❌ Price alert matching error: {e}")
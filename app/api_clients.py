@@ -1,65 +1,30 @@
-import requests
 import os
-import json
-import hashlib
 import time
-from app.config import SERPAPI_URL, SERPAPI_KEY, REQUEST_TIMEOUT, SOURCES
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config import (
+    SERPAPI_URL, SERPAPI_KEY, REQUEST_TIMEOUT, SOURCES, SINGLEFLIGHT_FILE_LOCK, CACHE_REFRESH_WORKERS
+)
+from app.http_client import request_json
+from app.cache import get_cache_entry, get_from_cache, save_to_cache, cached_at, CACHE_DIR
+from app.singleflight import SingleFlight, file_lock
+from app.price_history import record_prices
+from app.alerts import check_alerts
+from app.catalog_index import index_products
+from app.metrics import SERPAPI_REQUESTS, register_collector
+from app.profiling import span
+from app.credit_budget import credit_budget
 
 # Constants
 USD_TO_INR = 86.0
-CACHE_DURATION = 86400  # 24 hours in seconds
-CACHE_DIR = os.path.join(os.getcwd(), 'cache')
 
-def get_cache_path(key):
-    """Generate a unique filename for a cache key using MD5."""
-    hashed_key = hashlib.md5(key.encode()).hexdigest()
-    return os.path.join(CACHE_DIR, f"{hashed_key}.json")
-
-def get_from_cache(key):
-    """Retrieve data from the local JSON cache if it exists and is fresh."""
-    try:
-        path = get_cache_path(key)
-        
-        # Check if file exists
-        if not os.path.exists(path):
-            return None
-            
-        # Check if file is too old
-        file_age = time.time() - os.path.getmtime(path)
-        if file_age >= CACHE_DURATION:
-            return None
-            
-        # Read data
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-            
-    except Exception:
-        # If any error occurs (e.g. corrupted file), ignore it
-        return None
-
-def save_to_cache(key, data):
-    """Save data to a local JSON file."""
-    try:
-        os.makedirs(CACHE_DIR, exist_ok=True)
-        path = get_cache_path(key)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f)
-    except Exception:
-        pass
-
-def get_json(url, params=None, use_ua=True):
-    """Helper to make a GET request and return JSON."""
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"} if use_ua else {}
-        response = requests.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"❌ API Request failed: {url} | Status: {response.status_code} | Body: {response.text[:100]}")
-    except Exception as e:
-        print(f"❌ API Connection error: {e}")
-    return None
+def get_json(url, params=None, use_ua=True, timeout=None, store="other"):
+    """Helper to make a GET request through the shared connection pool and return JSON."""
+    headers = {"User-Agent": "Mozilla/5.0"} if use_ua else {}
+    return request_json(
+        url, params=params, headers=headers, timeout=timeout,
+        on_attempt=lambda status, seconds: SERPAPI_REQUESTS.observe(seconds, store, status)
+    )
 
 def clean_image_url(url):
     """Fix common issues with image URLs."""
@@ -102,48 +67,175 @@ def normalize(product_data, source):
     except Exception: 
         return None
 
-def search_serpapi_products(query, source_label="serpapi"):
+# Site-specific filters (Google Shopping 'site:' operator)
+STORE_SITES = {
+    "amazon": "amazon.com", 
+    "bestbuy": "bestbuy.com", 
+    "walmart": "walmart.com",
+    "ebay": "ebay.com", 
+    "target": "target.com", 
+    "newegg": "newegg.com",
+    "macys": "macys.com", 
+    "nordstrom": "nordstrom.com",
+    "sephora": "sephora.com", 
+    "barnesandnoble": "barnesandnoble.com", 
+    "dicks": "dickssportinggoods.com",
+    "homedepot": "homedepot.com", 
+    "chewy": "chewy.com", 
+    "guitarcenter": "guitarcenter.com", 
+    "staples": "staples.com"
+}
+
+# Identical concurrent searches share one upstream call
+search_flight = SingleFlight()
+
+# Background refreshes for stale cache entries
+_refresh_executor = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+def _collect_refresh_metrics():
+    return [("cache_refresh_pending", "gauge", "Background cache refreshes queued or running.",
+             [({}, len(_refreshing))])]
+
+register_collector(_collect_refresh_metrics)
+
+# Returned by _fetch_and_cache when the credit budget refused the call (None means upstream failed)
+CREDIT_REFUSED = object()
+
+def search_serpapi_products(query, source_label="serpapi", timeout=None, with_meta=False, priority="interactive"):
     """
     Search for products using SerpAPI (Google Shopping).
+    `timeout` caps the whole upstream call (retries included); defaults to REQUEST_TIMEOUT.
+    `priority` ('interactive', 'background' or 'suggestion') decides who gets the remaining
+    SerpAPI credits when they run low (see app/credit_budget.py).
+
+    With `with_meta=True` returns (products, meta) where meta["state"] says where the
+    products came from: 'fresh', 'stale' (served while refreshing in the background),
+    'live', 'fallback' (upstream failed, last-known-good cache), 'limited' (credit budget
+    exhausted: whatever is cached, however old), 'empty' or 'error'.
     """
     if not query:
-        return []
+        return _with_meta([], "empty", None, with_meta)
 
     if not SERPAPI_KEY:
         print(f"⚠️  SERPAPI_KEY is missing! Search for '{query}' will return no results.")
-        return []
+        return _with_meta([], "error", None, with_meta)
     
     # 1. Check cache first to save API credits
     cache_key = f"{source_label}_{query}"
-    cached_data = get_from_cache(cache_key)
-    if cached_data: 
-        return cached_data
-    
-    # 2. Define site-specific filters (Google Shopping 'site:' operator)
-    sites = {
-        "amazon": "amazon.com", 
-        "bestbuy": "bestbuy.com", 
-        "walmart": "walmart.com",
-        "ebay": "ebay.com", 
-        "target": "target.com", 
-        "newegg": "newegg.com",
-        "macys": "macys.com", 
-        "nordstrom": "nordstrom.com",
-        "sephora": "sephora.com", 
-        "barnesandnoble": "barnesandnoble.com", 
-        "dicks": "dickssportinggoods.com",
-        "homedepot": "homedepot.com", 
-        "chewy": "chewy.com", 
-        "guitarcenter": "guitarcenter.com", 
-        "staples": "staples.com"
-    }
+    cached_data, state, stored_at = get_cache_entry(cache_key)
+    if cached_data and state == "fresh":
+        return _with_meta(cached_data, "fresh", stored_at, with_meta)
+
+    # 2. Within the grace window: answer now, refresh behind the scenes
+    if cached_data and state == "stale":
+        refresh_in_background(query, source_label)
+        return _with_meta(cached_data, "stale", stored_at, with_meta)
     
-    # 3. Build search query
+    # 3. Out of credits for this priority: cached-only answers until the budget recovers
+    if not credit_budget.available(priority) and not search_flight.in_flight(cache_key):
+        return _with_meta(cached_data or [], "limited", stored_at, with_meta)
+
+    # 4. Cache miss: only one caller per key goes upstream, the rest wait for it
+    wait = (timeout or REQUEST_TIMEOUT) + 1
+    results = search_flight.do(
+        cache_key,
+        lambda: _fetch_with_worker_lock(query, source_label, cache_key, timeout, priority),
+        timeout=wait
+    )
+    # 5. Refused a credit (the budget ran out since step 3): cached-only, as above
+    if results is CREDIT_REFUSED:
+        return _with_meta(cached_data or [], "limited", stored_at, with_meta)
+    if results:
+        return _with_meta(results, "live", cached_at(cache_key) or time.time(), with_meta)
+
+    # 6. Upstream failed or came back empty: keep serving the last known good data
+    if cached_data:
+        return _with_meta(cached_data, "fallback", stored_at, with_meta)
+    return _with_meta([], "empty" if results == [] else "error", None, with_meta)
+
+def _with_meta(products, state, stored_at, with_meta):
+    if not with_meta:
+        return products
+    return products, {"state": state, "stored_at": stored_at}
+
+def refresh_in_background(query, source_label="serpapi"):
+    """Queue a cache refresh for one query unless one is already running."""
+    cache_key = f"{source_label}_{query}"
+    with _refresh_lock:
+        if cache_key in _refreshing or search_flight.in_flight(cache_key):
+            return
+        _refreshing.add(cache_key)
+
+    def refresh():
+        try:
+            search_flight.do(cache_key, lambda: _fetch_with_worker_lock(query, source_label, cache_key, None, "background"))
+        except Exception as e:
+            print(f"❌ Background refresh error for '{cache_key}': {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(cache_key)
+
+    _refresh_executor.submit(refresh)
+
+def refresh_now(query, source_label="serpapi", timeout=None, priority="background"):
+    """
+    Fetch a query from SerpAPI and update the cache whatever is cached now (used by the prewarmer).
+    Coalesced with identical in-flight searches. Returns the products, or None if upstream failed
+    (or the credit budget refused the call).
+    """
+    if not SERPAPI_KEY:
+        return None
+    cache_key = f"{source_label}_{query}"
+    results = search_flight.do(
+        cache_key,
+        lambda: _fetch_and_cache(query, source_label, cache_key, timeout, priority),
+        timeout=(timeout or REQUEST_TIMEOUT) + 1
+    )
+    return None if results is CREDIT_REFUSED else results
+
+def hedge_search(query, source_label="serpapi", timeout=None, priority="suggestion"):
+    """
+    A second, uncoalesced upstream call for a search that is taking too long (a hedged request).
+    Costs one more credit, so it is refused before anything else when credits run low.
+    Returns the products, or None if the call failed or was refused.
+    """
+    if not SERPAPI_KEY or not credit_budget.available(priority):
+        return None
+    results = _fetch_and_cache(query, source_label, f"{source_label}_{query}", timeout, priority)
+    return None if results is CREDIT_REFUSED else results
+
+def cached_search(query, source_label="serpapi"):
+    """Whatever is cached for a search, however old, without going upstream: (products, stored_at)."""
+    data, _, stored_at = get_cache_entry(f"{source_label}_{query}")
+    return data or [], stored_at
+
+def _fetch_with_worker_lock(query, source_label, cache_key, timeout, priority="interactive"):
+    """Optionally serialize the fetch across gunicorn workers with a lock file."""
+    if not SINGLEFLIGHT_FILE_LOCK:
+        return _fetch_and_cache(query, source_label, cache_key, timeout, priority)
+
+    with file_lock(os.path.join(CACHE_DIR, "locks"), cache_key, (timeout or REQUEST_TIMEOUT) + 1):
+        # Another worker may have filled the cache while we waited for the lock
+        cached_data = get_from_cache(cache_key)
+        if cached_data:
+            search_flight.cross_worker += 1
+            return cached_data
+        return _fetch_and_cache(query, source_label, cache_key, timeout, priority)
+
+def _fetch_and_cache(query, source_label, cache_key, timeout, priority="interactive"):
+    """
+    Call SerpAPI, normalize the results and store them in the cache.
+    Returns None if the upstream call failed (as opposed to [] for no results),
+    or CREDIT_REFUSED if the credit budget refused it.
+    """
+    # 1. Build search query
     search_query = query
-    if source_label in sites:
-        search_query = f"{query} site:{sites[source_label]}"
+    if source_label in STORE_SITES:
+        search_query = f"{query} site:{STORE_SITES[source_label]}"
     
-    # 4. Fetch from API
+    # 2. Fetch from API
     params = {
         "engine": "google_shopping",
         "q": search_query,
@@ -151,78 +243,107 @@ def search_serpapi_products(query, source_label="serpapi"):
     }
     
     # print(f"🔍 Searching SerpAPI for '{search_query}'...")
-    data = get_json(SERPAPI_URL, params, use_ua=False)
+    granted, _ = credit_budget.acquire(priority)
+    if not granted:
+        return CREDIT_REFUSED
+    with span(f"serpapi.{source_label}"):
+        data = get_json(SERPAPI_URL, params, use_ua=False, timeout=timeout, store=source_label)
     
     if not data:
         # print(f"❌ No data returned for '{search_query}'")
-        return []
+        return None
 
-    # 5. Process results
+    # 3. Process results
     results = []
     raw_results = data.get("shopping_results", [])
     
     # print(f"✅ Found {len(raw_results)} results for '{search_query}'")
     
-    for p in raw_results:
-        normalized_product = normalize(p, source_label)
-        if normalized_product:
-            results.append(normalized_product)
+    with span(f"normalize.{source_label}"):
+        for p in raw_results:
+            normalized_product = normalize(p, source_label)
+            if normalized_product:
+                results.append(normalized_product)
     
-    # 6. Save to cache
+    # 4. Save to cache, add to the local catalog and queue the prices for the history table and alert matcher
     if results: 
-        save_to_cache(cache_key, results)
+        with span(f"cache_write.{source_label}"):
+            save_to_cache(cache_key, results)
+            index_products(results)
+            record_prices(results)
+            check_alerts(results)
         
     return results
 
 # ---------------------------------------------------------
 # Store-Specific Fetchers
-# We create a specific function for each store to keep the code organized.
+# Each store tab shows one curated search (store id -> query); app/prewarm.py keeps them cached.
+# Keyword arguments (e.g. with_meta=True) are passed on to search_serpapi_products.
 # ---------------------------------------------------------
 
-def fetch_featured_products():
-    return search_serpapi_products("trending products 2026", "serpapi")
+CURATED_FEEDS = {
+    "serpapi": "trending products 2026",
+    "amazon": "trending electronics",
+    "bestbuy": "smart home gadgets",
+    "walmart": "furniture and decor",
+    "ebay": "watches and sneakers",
+    "target": "men women clothing",
+    "newegg": "gaming accessories",
+    "macys": "fashion clothing sale",
+    "nordstrom": "designer shoes",
+    "sephora": "skincare and makeup",
+    "barnesandnoble": "bestselling books",
+    "dicks": "sports equipment",
+    "homedepot": "tools and hardware",
+    "chewy": "pet food and toys",
+    "guitarcenter": "musical instruments",
+    "staples": "office supplies"
+}
+
+def fetch_featured_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["serpapi"], "serpapi", **kwargs)
 
-def fetch_amazon_products():
-    return search_serpapi_products("trending electronics", "amazon")
+def fetch_amazon_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["amazon"], "amazon", **kwargs)
 
-def fetch_bestbuy_products():
-    return search_serpapi_products("smart home gadgets", "bestbuy")
+def fetch_bestbuy_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["bestbuy"], "bestbuy", **kwargs)
 
-def fetch_walmart_products():
-    return search_serpapi_products("furniture and decor", "walmart")
+def fetch_walmart_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["walmart"], "walmart", **kwargs)
 
-def fetch_ebay_products():
-    return search_serpapi_products("watches and sneakers", "ebay")
+def fetch_ebay_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["ebay"], "ebay", **kwargs)
 
-def fetch_target_products():
-    return search_serpapi_products("men women clothing", "target")
+def fetch_target_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["target"], "target", **kwargs)
 
-def fetch_newegg_products():
-    return search_serpapi_products("gaming accessories", "newegg")
+def fetch_newegg_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["newegg"], "newegg", **kwargs)
 
-def fetch_macys_products():
-    return search_serpapi_products("fashion clothing sale", "macys")
+def fetch_macys_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["macys"], "macys", **kwargs)
 
-def fetch_nordstrom_products():
-    return search_serpapi_products("designer shoes", "nordstrom")
+def fetch_nordstrom_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["nordstrom"], "nordstrom", **kwargs)
 
-def fetch_sephora_products():
-    return search_serpapi_products("skincare and makeup", "sephora")
+def fetch_sephora_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["sephora"], "sephora", **kwargs)
 
-def fetch_barnes_products():
-    return search_serpapi_products("bestselling books", "barnesandnoble")
+def fetch_barnes_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["barnesandnoble"], "barnesandnoble", **kwargs)
 
-def fetch_dicks_products():
-    return search_serpapi_products("sports equipment", "dicks")
+def fetch_dicks_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["dicks"], "dicks", **kwargs)
 
-def fetch_homedepot_products():
-    return search_serpapi_products("tools and hardware", "homedepot")
+def fetch_homedepot_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["homedepot"], "homedepot", **kwargs)
 
-def fetch_chewy_products():
-    return search_serpapi_products("pet food and toys", "chewy")
+def fetch_chewy_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["chewy"], "chewy", **kwargs)
 
-def fetch_guitarcenter_products():
-    return search_serpapi_products("musical instruments", "guitarcenter")
+def fetch_guitarcenter_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["guitarcenter"], "guitarcenter", **kwargs)
 
-def fetch_staples_products():
-    return search_serpapi_products("office supplies", "staples")
+def fetch_staples_products(**kwargs):
+    return search_serpapi_products(CURATED_FEEDS["staples"], "staples", **kwargs)
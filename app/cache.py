@@ -0,0 +1,200 @@
+"""
+Product Cache
+Two tiers: a bounded in-memory LRU in front of the SQLite store in CACHE_DIR.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from app.config import (
+    CACHE_MEMORY_MAX_ENTRIES, CACHE_MEMORY_MAX_BYTES, CACHE_STALE_GRACE,
+    CACHE_MAX_BYTES, CACHE_RETENTION, CACHE_JANITOR_INTERVAL, CACHE_RAW_JSON
+)
+from app.cache_store import CacheStore
+from app.json_codec import dumps, loads, RawList
+from app.metrics import CACHE_LOOKUPS, register_collector
+
+# Constants
+CACHE_DURATION = 86400  # 24 hours in seconds
+CACHE_DIR = os.path.join(os.getcwd(), 'cache')
+
+class MemoryCache:
+    """
+    Thread-safe LRU cache bounded by entry count and (approximate) byte size.
+    Values are shared between callers, so treat them as read-only.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return (value, stored_at) for a key, or None. Freshness is up to the caller."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[2]
+
+    def set(self, key, value, size, stored_at=None):
+        """Store a value. `size` is its serialized length, used for the byte limit."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size, stored_at or time.time())
+            self._bytes += size
+            # Evict least recently used entries until both limits are met
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+# Shared memory tier for this process, backed by one SQLite file for all workers
+memory_cache = MemoryCache(CACHE_MEMORY_MAX_ENTRIES, CACHE_MEMORY_MAX_BYTES)
+cache_store = CacheStore(
+    os.path.join(CACHE_DIR, "cache.sqlite3"),
+    lifetime=CACHE_DURATION,
+    retention=CACHE_RETENTION,
+    max_bytes=CACHE_MAX_BYTES,
+    janitor_interval=CACHE_JANITOR_INTERVAL
+)
+_disk_stats = {"hits": 0, "misses": 0}
+_state_stats = {"fresh": 0, "stale": 0, "expired": 0, "miss": 0}
+
+def cache_state(stored_at):
+    """
+    Classify an entry by age:
+    'fresh' (within CACHE_DURATION), 'stale' (within the grace window) or 'expired'.
+    """
+    age = time.time() - stored_at
+    if age < CACHE_DURATION:
+        return "fresh"
+    if age < CACHE_DURATION + CACHE_STALE_GRACE:
+        return "stale"
+    return "expired"
+
+def _read_entry(key):
+    """Look a key up in memory, then on disk. Returns (data, stored_at) or (None, None)."""
+    # 1. Memory tier
+    entry = memory_cache.get(key)
+    if entry is not None and cache_state(entry[1]) == "fresh":
+        return entry
+
+    # 2. Disk tier (also when the memory copy is aging out: another worker
+    #    or the prewarmer may have refreshed it already)
+    try:
+        row = cache_store.get(key)
+        if row is None or (entry is not None and row[1] <= entry[1]):
+            if entry is not None:
+                return entry
+            _disk_stats["misses"] += 1
+            return None, None
+
+        raw, stored_at = row
+        data = _memory_value(loads(raw), raw)
+
+        # Promote into memory so the next hit skips the database
+        memory_cache.set(key, data, _memory_size(data, raw), stored_at)
+        _disk_stats["hits"] += 1
+        return data, stored_at
+
+    except Exception as e:
+        # If any error occurs (e.g. unreadable cache dir), treat it as a miss
+        print(f"⚠️  Cache read error: {e}")
+        return entry if entry is not None else (None, None)
+
+def get_cache_entry(key):
+    """
+    Retrieve data from the cache whatever its age.
+    Returns (data, state, stored_at); state is 'fresh', 'stale', 'expired' or 'miss'.
+    Expired data is kept around as a last-known-good fallback.
+    """
+    data, stored_at = _read_entry(key)
+    state = cache_state(stored_at) if data is not None else "miss"
+    _state_stats[state] += 1
+    CACHE_LOOKUPS.inc(state)
+    return data, state, stored_at
+
+def peek_cache(key):
+    """
+    (data, stored_at) for a key whatever its age, or (None, None). Not counted in the lookup
+    stats or cache_lookups_total: for scans over many keys (e.g. the cart optimizer) that
+    would swamp the request hit rate.
+    """
+    return _read_entry(key)
+
+def get_from_cache(key):
+    """Retrieve data from the cache if it exists and is fresh."""
+    data, state, _ = get_cache_entry(key)
+    return data if state == "fresh" else None
+
+def _memory_value(data, raw):
+    # With CACHE_RAW_JSON, lists carry their encoding so responses can reuse it (see json_codec.RawList)
+    if CACHE_RAW_JSON and isinstance(data, list):
+        return RawList(data, raw)
+    return data
+
+def _memory_size(data, raw):
+    return len(raw) * 2 if isinstance(data, RawList) else len(raw)
+
+def cached_at(key):
+    """When the cached copy of a key was stored, or None (used as its version, e.g. for ETags)."""
+    return _read_entry(key)[1]
+
+def save_to_cache(key, data):
+    """Save data to the SQLite store and the memory tier."""
+    try:
+        raw = dumps(data)
+        stored_at = time.time()
+        data = _memory_value(data, raw)
+        memory_cache.set(key, data, _memory_size(data, raw), stored_at)
+        cache_store.set(key, raw, stored_at)
+    except Exception as e:
+        print(f"⚠️  Cache write error: {e}")
+
+def _collect_cache_metrics():
+    memory = memory_cache.stats()
+    return [
+        ("cache_memory_entries", "gauge", "Entries in the in-memory cache tier.", [({}, memory["entries"])]),
+        ("cache_memory_bytes", "gauge", "Approximate size of the in-memory cache tier.", [({}, memory["bytes"])]),
+        ("cache_memory_requests_total", "counter", "In-memory tier lookups by result.",
+         [({"result": "hit"}, memory["hits"]), ({"result": "miss"}, memory["misses"])]),
+        ("cache_memory_evictions_total", "counter", "Entries evicted from the in-memory tier.", [({}, memory["evictions"])]),
+        ("cache_disk_requests_total", "counter", "SQLite store lookups by result.",
+         [({"result": "hit"}, _disk_stats["hits"]), ({"result": "miss"}, _disk_stats["misses"])]),
+    ]
+
+register_collector(_collect_cache_metrics)
+
+def get_cache_stats():
+    """Hit/miss counters for both tiers plus how often each freshness state was seen."""
+    return {"memory": memory_cache.stats(), "disk": dict(_disk_stats), "states": dict(_state_stats)}
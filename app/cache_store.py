@@ -0,0 +1,232 @@
+"""
+SQLite Cache Store
+All cached API responses live in one indexed file instead of one JSON file per key.
+Maintenance can also be run by hand: python scripts/cache_admin.py [stats|sweep|migrate]
+"""
+import os
+import re
+import glob
+import time
+import sqlite3
+import hashlib
+import threading
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS cache_entries (
+        key_hash TEXT PRIMARY KEY,
+        cache_key TEXT,
+        value TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        stored_at REAL NOT NULL,
+        purge_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_cache_purge ON cache_entries (purge_at)",
+    "CREATE INDEX IF NOT EXISTS idx_cache_stored ON cache_entries (stored_at, size)"
+]
+
+_LEGACY_NAME = re.compile(r"^[0-9a-f]{32}\.json$")
+
+def hash_key(key):
+    """Same MD5 naming the old per-file cache used, so legacy files can be imported."""
+    return hashlib.md5(key.encode()).hexdigest()
+
+class CacheStore:
+    """
+    Key/value store on a single SQLite file (WAL mode, safe across threads and processes).
+
+    Every write is one atomic upsert, so readers never see half-written entries.
+    Rows are kept until `purge_at` (stored_at + lifetime + retention) so expired data
+    can still serve as a fallback; a janitor thread sweeps them and enforces `max_bytes`.
+    """
+
+    def __init__(self, path, lifetime, retention, max_bytes, janitor_interval=600):
+        self.path = path
+        self.lifetime = lifetime
+        self.retention = retention
+        self.max_bytes = max_bytes
+        self.janitor_interval = janitor_interval
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready_pid = None
+        self._janitor_pid = None
+
+    # ---------------------------
+    # Connections
+    # ---------------------------
+    def _connect(self):
+        """One connection per thread (and per process after a fork)."""
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == pid:
+            return conn
+
+        if self._ready_pid != pid:
+            with self._init_lock:
+                if self._ready_pid != pid:
+                    self._setup()
+                    self._ready_pid = pid
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = pid
+        return conn
+
+    def _setup(self):
+        """Create the schema and import any legacy <md5>.json files once."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._import_legacy_files(conn)
+        finally:
+            conn.close()
+
+    # ---------------------------
+    # Reads & Writes
+    # ---------------------------
+    def get(self, key):
+        """Return (raw_json, stored_at) for a key, or None."""
+        row = self._connect().execute(
+            "SELECT value, stored_at FROM cache_entries WHERE key_hash = ?", (hash_key(key),)
+        ).fetchone()
+        self._start_janitor()
+        return row
+
+    def stored_at(self, keys):
+        """Return {key: stored_at} for the keys that have an entry, without reading the values."""
+        by_hash = {hash_key(key): key for key in keys}
+        if not by_hash:
+            return {}
+        placeholders = ", ".join("?" * len(by_hash))
+        rows = self._connect().execute(
+            f"SELECT key_hash, stored_at FROM cache_entries WHERE key_hash IN ({placeholders})", list(by_hash)
+        ).fetchall()
+        return {by_hash[key_hash]: stored_at for key_hash, stored_at in rows}
+
+    def iter_values(self, since=0):
+        """Yield (raw_json, stored_at) for entries stored after `since`, oldest first."""
+        cursor = self._connect().execute(
+            "SELECT value, stored_at FROM cache_entries WHERE stored_at >= ? ORDER BY stored_at", (since,)
+        )
+        for row in cursor:
+            yield row
+
+    def set(self, key, raw, stored_at=None):
+        """Insert or replace an entry in a single atomic statement."""
+        stored_at = stored_at or time.time()
+        self._connect().execute(
+            """INSERT INTO cache_entries (key_hash, cache_key, value, size, stored_at, purge_at)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(key_hash) DO UPDATE SET
+                   cache_key = excluded.cache_key, value = excluded.value, size = excluded.size,
+                   stored_at = excluded.stored_at, purge_at = excluded.purge_at""",
+            (hash_key(key), key, raw, len(raw), stored_at, stored_at + self.lifetime + self.retention)
+        )
+        self._start_janitor()
+
+    # ---------------------------
+    # Maintenance
+    # ---------------------------
+    def sweep(self):
+        """Delete rows past their purge time, then trim the oldest rows down to max_bytes."""
+        conn = self._connect()
+        expired = conn.execute("DELETE FROM cache_entries WHERE purge_at < ?", (time.time(),)).rowcount
+
+        trimmed = 0
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        while total > self.max_bytes:
+            rows = conn.execute(
+                "SELECT key_hash, size FROM cache_entries ORDER BY stored_at LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+            # Only as many of the oldest rows as it takes to get under the limit
+            doomed = []
+            for key_hash, size in rows:
+                if total <= self.max_bytes:
+                    break
+                doomed.append((key_hash,))
+                total -= size
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("DELETE FROM cache_entries WHERE key_hash = ?", doomed)
+            conn.execute("COMMIT")
+            trimmed += len(doomed)
+        return {"expired": expired, "trimmed": trimmed}
+
+    def stats(self):
+        count, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+        ).fetchone()
+        return {"path": self.path, "entries": count, "bytes": size, "max_bytes": self.max_bytes}
+
+    def _start_janitor(self):
+        """Start the background sweeper once per process."""
+        pid = os.getpid()
+        if self._janitor_pid == pid or not self.janitor_interval:
+            return
+        with self._init_lock:
+            if self._janitor_pid == pid:
+                return
+            self._janitor_pid = pid
+        threading.Thread(target=self._janitor_loop, name="cache-janitor", daemon=True).start()
+
+    def _janitor_loop(self):
+        while True:
+            time.sleep(self.janitor_interval)
+            try:
+                result = self.sweep()
+                if result["expired"] or result["trimmed"]:
+                    print(f"🧹 Cache sweep: {result['expired']} expired, {result['trimmed']} trimmed")
+            except Exception as e:
+                print(f"❌ Cache sweep error: {e}")
+
+    def import_legacy_files(self):
+        """Import any <md5>.json files left in the cache directory. Returns how many."""
+        return self._import_legacy_files(self._connect())
+
+    def _import_legacy_files(self, conn):
+        """Import the old one-file-per-key JSON cache that sits next to the database."""
+        cache_dir = os.path.dirname(self.path)
+        # Only <md5>.json names; other JSON files in the directory (e.g. prewarm state) aren't cache entries
+        files = [
+            path for path in glob.glob(os.path.join(cache_dir, "*.json"))
+            if _LEGACY_NAME.match(os.path.basename(path))
+        ]
+        if not files:
+            return 0
+
+        conn.execute("BEGIN IMMEDIATE")
+        imported = 0
+        try:
+            for path in files:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        raw = f.read()
+                    stored_at = os.path.getmtime(path)
+                except OSError:
+                    continue  # Another worker already imported and removed it
+                key_hash = os.path.splitext(os.path.basename(path))[0]
+                # Entries already written to the store are newer than the legacy file
+                conn.execute(
+                    """INSERT INTO cache_entries (key_hash, cache_key, value, size, stored_at, purge_at)
+                       VALUES (?, NULL, ?, ?, ?, ?)
+                       ON CONFLICT(key_hash) DO NOTHING""",
+                    (key_hash, raw, len(raw), stored_at, stored_at + self.lifetime + self.retention)
+                )
+                imported += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        for path in files:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        print(f"📦 Imported {imported} legacy cache files into {os.path.basename(self.path)}")
+        return imported
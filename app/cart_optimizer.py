@@ -0,0 +1,305 @@
+"""
+Cart Optimizer
+Finds the cheapest way to buy a cart across stores, using only cached search results.
+
+Cost of a basket = item prices + per-store shipping (waived above the store's free-shipping
+threshold), with at most `max_sellers` different stores. Small carts are solved exactly with
+branch-and-bound; larger ones with a greedy start plus local search. The time budget covers
+looking up offers too; when it runs out the best basket found so far is returned.
+"""
+import time
+from app.config import SOURCES, STORE_SHIPPING, DEFAULT_SHIPPING, CATALOG_MAX_AGE
+from app.cache import peek_cache
+from app.api_clients import STORE_SITES
+from app.matching import title_tokens, similarity
+from app.catalog_index import catalog_index
+from app.profiling import span
+
+# Stores whose cached results are searched for alternative offers
+OFFER_STORES = ["serpapi"] + list(STORE_SITES)
+# The item's own listing when we don't know which store it came from
+CURRENT_STORE = "current"
+# Extra candidates per item taken from the local catalog index
+LOCAL_CANDIDATES = 20
+
+_STORE_BY_NAME = {name.lower(): store for store, name in SOURCES.items()}
+
+def store_of(item):
+    """Map a product/cart item 'source' (display name or id) to a store id."""
+    source = str(item.get("source") or "").strip().lower()
+    if source in SOURCES or source in STORE_SITES:
+        return source
+    return _STORE_BY_NAME.get(source, CURRENT_STORE)
+
+def shipping_cost(store, subtotal):
+    """Shipping charged by a store for a given subtotal (0 above its free threshold)."""
+    if store == CURRENT_STORE or subtotal <= 0:
+        return 0.0
+    fee, free_above = STORE_SHIPPING.get(store, DEFAULT_SHIPPING)
+    return 0.0 if subtotal >= free_above else fee
+
+# ---------------------------
+# Candidate Offers
+# ---------------------------
+def _search_terms(item):
+    title = str(item.get("title") or "")
+    words = title.split()
+    terms = [title, " ".join(words[:3])]
+    return [t for i, t in enumerate(terms) if t and t not in terms[:i]]
+
+def gather_offers(cart, threshold=0.5, deadline=None):
+    """
+    Collect candidate offers for each cart item from cached store results and the local
+    catalog index (no API calls). Past `deadline` (a perf_counter time) the remaining items
+    only get their own listing.
+    Returns (offers, others): offers[i] is a list of {store, price, product} for cart[i],
+    cheapest per store; `others` are cached products that matched no item.
+    """
+    offers = []
+    others = {}
+    matched_ids = set()
+
+    for item in cart:
+        tokens = title_tokens(item.get("title"))
+        best = {}
+        # The item's own listing is always an option
+        own_store = store_of(item)
+        own_offer = {"store": own_store, "price": float(item["price"]), "product": item}
+        best[own_store] = own_offer
+
+        def consider(store, product):
+            price = product.get("price") or 0
+            if price <= 0:
+                return
+            if similarity(tokens, title_tokens(product.get("title"))) < threshold:
+                others.setdefault(product.get("id"), product)
+                return
+            matched_ids.add(product.get("id"))
+            if store not in best or price < best[store]["price"]:
+                best[store] = {"store": store, "price": float(price), "product": product}
+
+        for term in _search_terms(item):
+            for store in OFFER_STORES:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                products, _ = peek_cache(f"{store}_{term}")
+                for product in products or []:
+                    consider(store, product)
+
+        # Listings fetched for other searches, found through the local catalog index
+        if deadline is None or time.perf_counter() < deadline:
+            local = catalog_index.search(item.get("title"), LOCAL_CANDIDATES, max_age=CATALOG_MAX_AGE, min_coverage=threshold)
+            for _, product in local:
+                store = store_of(product)
+                if store != CURRENT_STORE:
+                    consider(store, product)
+
+        item_offers = list(best.values())
+        if not any(o is own_offer for o in item_offers):
+            # A cheaper cached offer from the same store replaced it; keep it for the "before" total
+            item_offers.append(own_offer)
+        offers.append(sorted(item_offers, key=lambda o: o["price"]))
+
+    cart_ids = {str(item.get("id")) for item in cart}
+    others = [p for pid, p in others.items() if pid not in matched_ids and str(pid) not in cart_ids]
+    return offers, others
+
+# ---------------------------
+# Solver
+# ---------------------------
+def basket_cost(cart, offers, choice):
+    """Total cost of a basket where choice[i] is the index into offers[i]."""
+    subtotals = {}
+    for i, item in enumerate(cart):
+        offer = offers[i][choice[i]]
+        subtotals[offer["store"]] = subtotals.get(offer["store"], 0.0) + offer["price"] * item["quantity"]
+    return sum(s + shipping_cost(store, s) for store, s in subtotals.items()), subtotals
+
+def sellers_used(offers, choice):
+    return len({offers[i][j]["store"] for i, j in enumerate(choice)})
+
+def _greedy(cart, offers, max_sellers):
+    """Cheapest offer per item, then drop the least useful stores until max_sellers is met."""
+    choice = [0] * len(cart)
+    allowed = {o["store"] for item_offers in offers for o in item_offers}
+
+    def best_allowed(i):
+        for j, offer in enumerate(offers[i]):
+            if offer["store"] in allowed:
+                return j
+        return None
+
+    while True:
+        used = {offers[i][choice[i]]["store"] for i in range(len(cart))}
+        if len(used) <= max_sellers:
+            break
+        # Try removing each used store; keep the removal that costs least
+        best_removal = None
+        for store in used:
+            allowed.discard(store)
+            trial = [best_allowed(i) for i in range(len(cart))]
+            allowed.add(store)
+            if None in trial:
+                continue  # Some item is only sold there
+            cost, _ = basket_cost(cart, offers, trial)
+            if best_removal is None or cost < best_removal[0]:
+                best_removal = (cost, store, trial)
+        if best_removal is None:
+            break  # Constraint cannot be met; caller reports it
+        allowed.discard(best_removal[1])
+        choice = best_removal[2]
+    return choice
+
+def _local_search(cart, offers, choice, max_sellers, deadline):
+    """Move single items between stores while it lowers the total (shipping included)."""
+    best_cost, _ = basket_cost(cart, offers, choice)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(len(cart)):
+            for j in range(len(offers[i])):
+                if j == choice[i]:
+                    continue
+                trial = choice[:i] + [j] + choice[i + 1:]
+                if sellers_used(offers, trial) > max_sellers:
+                    continue
+                cost, _ = basket_cost(cart, offers, trial)
+                if cost < best_cost - 0.005:
+                    choice, best_cost, improved = trial, cost, True
+            if time.perf_counter() >= deadline:
+                break
+    return choice
+
+def _branch_and_bound(cart, offers, max_sellers, incumbent, deadline):
+    """
+    Exact search over item -> store assignments.
+    Lower bound: cost so far plus the cheapest remaining offer for every unassigned item
+    (shipping is never negative, so this never overestimates).
+    Returns (choice, finished) where finished is False if the time budget ran out.
+    An incumbent over the seller limit only comes back if no basket within it was found.
+    """
+    n = len(cart)
+    # Branch on items with the widest price spread first; they decide the most
+    order = sorted(range(n), key=lambda i: -(offers[i][-1]["price"] - offers[i][0]["price"]) * cart[i]["quantity"])
+    min_rest = [0.0] * (n + 1)
+    for pos in range(n - 1, -1, -1):
+        i = order[pos]
+        min_rest[pos] = min_rest[pos + 1] + offers[i][0]["price"] * cart[i]["quantity"]
+
+    # An infeasible incumbent must not set the bound: every basket within the limit may cost more
+    feasible = sellers_used(offers, incumbent) <= max_sellers
+    best = {"cost": basket_cost(cart, offers, incumbent)[0] if feasible else float("inf"), "choice": list(incumbent)}
+    choice = [0] * n
+    subtotals = {}
+    counts = {}  # Items assigned per store; a store counts as a seller while > 0
+    state = {"finished": True, "nodes": 0}
+
+    def visit(pos, items_cost):
+        state["nodes"] += 1
+        if state["nodes"] % 256 == 0 and time.perf_counter() >= deadline:
+            state["finished"] = False
+        if not state["finished"]:
+            return
+        if pos == n:
+            total = items_cost + sum(shipping_cost(s, v) for s, v in subtotals.items() if counts[s])
+            if total < best["cost"] - 0.005:
+                best["cost"], best["choice"] = total, list(choice)
+            return
+        if items_cost + min_rest[pos] >= best["cost"] - 0.005:
+            return
+
+        i = order[pos]
+        qty = cart[i]["quantity"]
+        used = sum(1 for c in counts.values() if c)
+        for j, offer in enumerate(offers[i]):
+            store = offer["store"]
+            if not counts.get(store) and used >= max_sellers:
+                continue
+            line = offer["price"] * qty
+            choice[i] = j
+            subtotals[store] = subtotals.get(store, 0.0) + line
+            counts[store] = counts.get(store, 0) + 1
+            visit(pos + 1, items_cost + line)
+            subtotals[store] -= line
+            counts[store] -= 1
+
+    visit(0, 0.0)
+    return best["choice"], state["finished"]
+
+def optimize_cart(cart, max_sellers=3, time_budget_ms=30, exact_max_items=10, threshold=0.5):
+    """
+    Pick a store for every cart item to minimise total cost including shipping.
+    Returns a JSON-ready dict with per-item choices, per-store subtotals and the solver used.
+    original_total/new_total are item prices only (original_total matches /api/cart's total);
+    the estimated shipping of each basket is reported separately, and savings compares
+    items plus shipping on both sides.
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget_ms / 1000.0
+
+    cart = [dict(item, quantity=int(item.get("quantity") or 1), price=float(item["price"])) for item in cart]
+    with span("gather_offers"):
+        offers, others = gather_offers(cart, threshold, deadline)
+
+    # Today's basket: every item at its own listing
+    current = [next(j for j, o in enumerate(offers[i]) if o["product"] is cart[i]) for i in range(len(cart))]
+    original_cost, original_subtotals = basket_cost(cart, offers, current)
+
+    with span("solve"):
+        choice = _greedy(cart, offers, max_sellers)
+        choice = _local_search(cart, offers, choice, max_sellers, deadline)
+        solver, optimal = "heuristic", False
+        if len(cart) <= exact_max_items:
+            choice, optimal = _branch_and_bound(cart, offers, max_sellers, choice, deadline)
+            solver = "exact"
+
+    # Never recommend something worse than what the user already has
+    if sellers_used(offers, current) <= max_sellers and original_cost <= basket_cost(cart, offers, choice)[0]:
+        choice = current
+    new_cost, subtotals = basket_cost(cart, offers, choice)
+    original_total = sum(original_subtotals.values())
+    new_total = sum(subtotals.values())
+
+    assignments = []
+    for i, item in enumerate(cart):
+        offer = offers[i][choice[i]]
+        product = offer["product"]
+        assignments.append({
+            "id": item["id"],
+            "title": item.get("title"),
+            "quantity": item["quantity"],
+            "original_price": item["price"],
+            "store": offer["store"],
+            "store_name": SOURCES.get(offer["store"], offer["store"]),
+            "unit_price": offer["price"],
+            "offer_id": product.get("id"),
+            "offer_title": product.get("title"),
+            "offers_considered": len(offers[i])
+        })
+
+    stores = [
+        {
+            "store": store,
+            "store_name": SOURCES.get(store, store),
+            "subtotal": round(subtotal, 2),
+            "shipping": shipping_cost(store, subtotal)
+        }
+        for store, subtotal in sorted(subtotals.items()) if subtotal > 0
+    ]
+
+    return {
+        "original_total": round(original_total, 2),
+        "original_shipping": round(original_cost - original_total, 2),
+        "new_total": round(new_total, 2),
+        "new_shipping": round(new_cost - new_total, 2),
+        "savings": round(original_cost - new_cost, 2),
+        "assignments": assignments,
+        "stores": stores,
+        "sellers_used": len(stores),
+        "max_sellers": max_sellers,
+        "constraint_met": len(stores) <= max_sellers,
+        "solver": solver,
+        "optimal": optimal,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        "suggestions": sorted(others, key=lambda p: p.get("price") or 0)[:6]
+    }
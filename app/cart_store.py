@@ -0,0 +1,188 @@
+"""
+Cart Store
+Server-side shopping carts. The session cookie only carries an opaque cart token.
+
+Two backends with the same interface, picked by CART_BACKEND:
+- SQLCartStore (default): the cart_items table, shared by every worker and serverless instance
+- MemoryCartStore: in-process dict, only for single-process local development
+Carts expire CART_TTL seconds after their last change.
+"""
+import time
+import secrets
+import threading
+from collections import OrderedDict
+from app.config import CART_BACKEND, CART_TTL
+from app.database import db_connection
+
+def new_cart_token():
+    return secrets.token_urlsafe(24)
+
+def _item(product_id, data, quantity):
+    return {
+        "id": product_id,
+        "title": data.get("title"),
+        "price": float(data["price"]),
+        "quantity": quantity,
+        "source": data.get("source")
+    }
+
+class MemoryCartStore:
+    """Carts as token -> id-indexed OrderedDict of items. Thread-safe."""
+
+    SWEEP_EVERY = 1000  # Writes between sweeps of expired carts
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._carts = {}  # token -> (items, expires_at)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _live(self, token):
+        entry = self._carts.get(token)
+        if entry is None or entry[1] < time.time():
+            self._carts.pop(token, None)
+            return None
+        return entry[0]
+
+    def _touch(self, token, items):
+        self._carts[token] = (items, time.time() + self.ttl)
+        self._writes += 1
+        if self._writes % self.SWEEP_EVERY == 0:
+            now = time.time()
+            for expired in [t for t, (_, expires_at) in self._carts.items() if expires_at < now]:
+                del self._carts[expired]
+
+    def get(self, token):
+        with self._lock:
+            items = self._live(token)
+            return [dict(item) for item in items.values()] if items else []
+
+    def add(self, token, product_id, data, quantity=1):
+        """Add an item, or increase its quantity if it is already in the cart."""
+        with self._lock:
+            items = self._live(token) or OrderedDict()
+            if product_id in items:
+                items[product_id]["quantity"] += quantity
+            else:
+                items[product_id] = _item(product_id, data, quantity)
+            self._touch(token, items)
+            return [dict(item) for item in items.values()]
+
+    def remove(self, token, product_id):
+        with self._lock:
+            items = self._live(token) or OrderedDict()
+            items.pop(product_id, None)
+            self._touch(token, items)
+            return [dict(item) for item in items.values()]
+
+    def clear(self, token):
+        with self._lock:
+            self._carts.pop(token, None)
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "carts": len(self._carts), "ttl": self.ttl}
+
+class SQLCartStore:
+    """
+    Carts in the cart_items table, one row per (cart token, product id).
+    Quantity changes are a single upsert, so concurrent adds never lose an update.
+    """
+
+    PURGE_EVERY = 200  # Writes between deletes of expired rows
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._writes = 0
+
+    def _run(self, work):
+        """Run work(cursor, is_postgres) in a transaction. Returns its result, or None on failure."""
+        with db_connection() as conn:
+            if not conn:
+                return None
+            is_postgres = hasattr(conn, 'info')
+            cursor = conn.cursor()
+            try:
+                result = work(cursor, is_postgres)
+                conn.commit()
+                return result
+            except Exception as e:
+                print(f"❌ Cart store error: {e}")
+                conn.rollback()
+                return None
+            finally:
+                cursor.close()
+
+    def _select(self, cursor, token):
+        cursor.execute(
+            """SELECT product_id, title, price, quantity, source FROM cart_items
+               WHERE cart_token = %s AND expires_at > %s ORDER BY added_at, product_id""",
+            (token, time.time())
+        )
+        return [
+            {"id": row[0], "title": row[1], "price": float(row[2]), "quantity": row[3], "source": row[4]}
+            for row in cursor.fetchall()
+        ]
+
+    def _drop_expired(self, cursor, token, now):
+        """Delete this cart's expired rows, so a write can't revive them (or add to their quantity)."""
+        cursor.execute("DELETE FROM cart_items WHERE cart_token = %s AND expires_at <= %s", (token, now))
+
+    def _extend(self, cursor, token):
+        """Push the expiry of the cart's live items forward and now and then purge expired carts."""
+        now = time.time()
+        cursor.execute(
+            "UPDATE cart_items SET expires_at = %s WHERE cart_token = %s AND expires_at > %s",
+            (now + self.ttl, token, now)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            cursor.execute("DELETE FROM cart_items WHERE expires_at < %s", (now,))
+
+    def get(self, token):
+        return self._run(lambda cursor, _: self._select(cursor, token)) or []
+
+    def add(self, token, product_id, data, quantity=1):
+        """Add an item, or increase its quantity if it is already in the cart."""
+        item = _item(product_id, data, quantity)
+        now = time.time()
+
+        def work(cursor, is_postgres):
+            self._drop_expired(cursor, token, now)
+            if is_postgres:
+                upsert = """INSERT INTO cart_items
+                                (cart_token, product_id, title, price, quantity, source, added_at, expires_at)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                            ON CONFLICT (cart_token, product_id)
+                            DO UPDATE SET quantity = cart_items.quantity + EXCLUDED.quantity"""
+            else:
+                upsert = """INSERT INTO cart_items
+                                (cart_token, product_id, title, price, quantity, source, added_at, expires_at)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                            ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)"""
+            cursor.execute(upsert, (
+                token, product_id, (item["title"] or "")[:500], item["price"], quantity,
+                str(item["source"])[:50] if item["source"] else None, now, now + self.ttl
+            ))
+            self._extend(cursor, token)
+            return self._select(cursor, token)
+
+        return self._run(work)
+
+    def remove(self, token, product_id):
+        def work(cursor, _):
+            cursor.execute("DELETE FROM cart_items WHERE cart_token = %s AND product_id = %s", (token, product_id))
+            self._extend(cursor, token)
+            return self._select(cursor, token)
+        return self._run(work)
+
+    def clear(self, token):
+        def work(cursor, _):
+            cursor.execute("DELETE FROM cart_items WHERE cart_token = %s", (token,))
+            return True
+        return self._run(work)
+
+    def stats(self):
+        return {"backend": "sql", "ttl": self.ttl}
+
+cart_store = SQLCartStore(CART_TTL) if CART_BACKEND == "sql" else MemoryCartStore(CART_TTL)
@@ -0,0 +1,190 @@
+"""
+Local Catalog Index
+In-process inverted index over every product we have normalized, scored with BM25.
+
+Lets /api/search answer (or pre-fill) a query from products already fetched for other
+queries, instead of needing an exact cache hit. Products are added as SerpAPI results come
+in, and on startup the index is filled from the SQLite cache in a background thread.
+Titles are short, so each word counts once per title (BM25 with tf = 1).
+"""
+import os
+import math
+import time
+import heapq
+import threading
+from collections import OrderedDict, Counter
+from app.config import CATALOG_MAX_DOCS, CATALOG_MAX_AGE, CATALOG_MIN_RESULTS, CATALOG_MIN_STORES
+from app.cache import cache_store
+from app.json_codec import loads
+from app.matching import title_tokens
+
+K1 = 1.2
+B = 0.75
+
+class CatalogIndex:
+    """
+    BM25 inverted index of products, bounded to `max_docs` (oldest dropped first).
+    A product is one document per (source, id); re-adding it replaces the old copy.
+    """
+
+    def __init__(self, max_docs=50000):
+        self.max_docs = max_docs
+        self._docs = OrderedDict()  # doc key -> (product, tokens, indexed_at), oldest first
+        self._postings = {}         # word -> set of doc keys
+        self._total_len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def doc_key(product):
+        product_id = str(product.get("id") or "")
+        # serp_<position> ids are only positions within one result page
+        if not product_id or product_id.startswith("serp_"):
+            return (product.get("source"), "title", product.get("title"))
+        return (product.get("source"), product_id)
+
+    def add(self, products, indexed_at=None):
+        """Index (or re-index) a batch of normalized products."""
+        indexed_at = indexed_at or time.time()
+        with self._lock:
+            for product in products:
+                tokens = frozenset(title_tokens(product.get("title")))
+                if not tokens or not (product.get("price") or 0) > 0:
+                    continue
+                key = self.doc_key(product)
+                old = self._docs.get(key)
+                if old is not None:
+                    if old[2] > indexed_at:
+                        continue  # Already have a newer copy (e.g. warm load racing a live fetch)
+                    self._remove(key)
+                self._docs[key] = (product, tokens, indexed_at)
+                self._total_len += len(tokens)
+                for token in tokens:
+                    self._postings.setdefault(token, set()).add(key)
+
+            while len(self._docs) > self.max_docs:
+                self._remove(next(iter(self._docs)))
+
+    def _remove(self, key):
+        _, tokens, _ = self._docs.pop(key)
+        self._total_len -= len(tokens)
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.discard(key)
+                if not posting:
+                    del self._postings[token]
+
+    def search(self, query, limit=100, max_age=None, min_coverage=1.0):
+        """
+        Top `limit` products for a query as [(score, product)], best first.
+        Only products matching at least `min_coverage` of the query's words and indexed
+        within `max_age` seconds are returned.
+        """
+        terms = title_tokens(query)
+        if not terms:
+            return []
+        with self._lock:
+            n = len(self._docs)
+            if not n:
+                return []
+            avg_len = self._total_len / n
+            postings = {term: self._postings.get(term, set()) for term in terms}
+            idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in postings.items()}
+            needed = math.ceil(min_coverage * len(terms) - 1e-9)
+            oldest = time.time() - max_age if max_age else 0
+
+            candidates = []
+            if needed >= len(terms):
+                # Every word required: intersect, smallest posting list first. All hits share the
+                # same words, so only the title length changes the score.
+                ordered = sorted(postings.values(), key=len)
+                total_idf = sum(idf.values())
+                for key in set(ordered[0]).intersection(*ordered[1:]):
+                    _, tokens, indexed_at = self._docs[key]
+                    if indexed_at >= oldest:
+                        norm = K1 * (1 - B + B * len(tokens) / avg_len)
+                        candidates.append((total_idf * (K1 + 1) / (1 + norm), key))
+            else:
+                counts = Counter()
+                for posting in postings.values():
+                    counts.update(posting)
+                for key, matched in counts.items():
+                    if matched < needed:
+                        continue
+                    _, tokens, indexed_at = self._docs[key]
+                    if indexed_at < oldest:
+                        continue
+                    norm = K1 * (1 - B + B * len(tokens) / avg_len)
+                    score = sum(idf[term] for term in terms if key in postings[term])
+                    candidates.append((score * (K1 + 1) / (1 + norm), key))
+
+            top = heapq.nlargest(limit, candidates, key=lambda item: item[0])
+            return [(round(score, 4), self._docs[key][0]) for score, key in top]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "terms": len(self._postings),
+                "avg_title_words": round(self._total_len / len(self._docs), 2) if self._docs else 0.0,
+                "max_docs": self.max_docs
+            }
+
+catalog_index = CatalogIndex(CATALOG_MAX_DOCS)
+_stats = {"lookups": 0, "answered": 0, "warm_loaded": 0, "warm_ready": False}
+_warm_pid = None
+_warm_lock = threading.Lock()
+
+def index_products(products, indexed_at=None):
+    """Add freshly normalized products to the local catalog."""
+    if products:
+        catalog_index.add(products, indexed_at)
+
+def search_catalog(query, limit=100):
+    """
+    Look a query up in the local catalog.
+    Returns (products, enough): `enough` is True when the hits are fresh and numerous and
+    varied enough (CATALOG_MIN_RESULTS from CATALOG_MIN_STORES stores) to skip SerpAPI.
+    """
+    start_warm_load()
+    _stats["lookups"] += 1
+    products = [p for _, p in catalog_index.search(query, limit, max_age=CATALOG_MAX_AGE)]
+    stores = {p.get("source") for p in products}
+    enough = len(products) >= CATALOG_MIN_RESULTS and len(stores) >= CATALOG_MIN_STORES
+    if enough:
+        _stats["answered"] += 1
+    return products, enough
+
+def get_stats():
+    return dict(_stats, **catalog_index.stats())
+
+def start_warm_load():
+    """Fill the index from the SQLite cache once per process, on a background thread."""
+    global _warm_pid
+    pid = os.getpid()
+    if _warm_pid == pid:
+        return
+    with _warm_lock:
+        if _warm_pid == pid:
+            return
+        _warm_pid = pid
+    threading.Thread(target=_warm_load, name="catalog-warm", daemon=True).start()
+
+def _warm_load():
+    loaded = 0
+    try:
+        for raw, stored_at in cache_store.iter_values(since=time.time() - CATALOG_MAX_AGE):
+            try:
+                products = loads(raw)
+            except ValueError:
+                continue
+            if isinstance(products, list):
+                catalog_index.add([p for p in products if isinstance(p, dict)], stored_at)
+                loaded += len(products)
+    except Exception as e:
+        print(f"⚠️  Catalog warm load error: {e}")
+    _stats["warm_loaded"] = loaded
+    _stats["warm_ready"] = True
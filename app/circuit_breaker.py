@@ -0,0 +1,68 @@
+"""
+Circuit Breaker
+Stops calling an upstream that keeps failing, then lets a single trial call through after a cooldown.
+
+closed    -> calls go through; `failure_threshold` failures in a row open the circuit
+open      -> calls are skipped for `cooldown` seconds
+half-open -> one trial call: success closes the circuit, failure opens it again
+State is per process.
+"""
+import time
+import threading
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, cooldown=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go out now. In half-open state only one caller gets True."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half-open"
+                self._trial_running = False
+            if self.state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def release_trial(self):
+        """The half-open trial was answered without going upstream: let the next call try instead."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                    print(f"⚡ Circuit open for '{self.name}' after {self.failures} failures, retrying in {self.cooldown}s")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._trial_running = False
+
+    def stats(self):
+        with self._lock:
+            retry_in = max(self.cooldown - (time.monotonic() - self.opened_at), 0) if self.state == "open" else 0
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "times_opened": self.times_opened,
+                "retry_in": round(retry_in, 1)
+            }
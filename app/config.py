@@ -10,10 +10,101 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv(os.path.join(BASE_DIR, '.env'))
 
 # 2. API Configuration
-SERPAPI_URL = "https://serpapi.com/search"
+# Point SERPAPI_URL at scripts/fake_serpapi.py to develop or load-test without spending credits
+SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search")
 SERPAPI_KEY = os.getenv("SERPAPI_KEY", "")
 REQUEST_TIMEOUT = 10  # Seconds to wait for API response
 
+# SerpAPI credit budget shared by all workers (0 = unlimited, the default); see app/credit_budget.py
+SERPAPI_RATE_PER_MINUTE = float(os.getenv("SERPAPI_RATE_PER_MINUTE", "0"))
+SERPAPI_BURST = int(os.getenv("SERPAPI_BURST", "0"))  # 0 = one minute's worth of the rate
+SERPAPI_DAILY_BUDGET = int(os.getenv("SERPAPI_DAILY_BUDGET", "0"))
+SERPAPI_MONTHLY_BUDGET = int(os.getenv("SERPAPI_MONTHLY_BUDGET", "0"))
+# Share of each limit that background refreshes / comparison searches must leave for interactive searches
+SERPAPI_RESERVE_BACKGROUND = float(os.getenv("SERPAPI_RESERVE_BACKGROUND", "0.3"))
+SERPAPI_RESERVE_SUGGESTION = float(os.getenv("SERPAPI_RESERVE_SUGGESTION", "0.5"))
+
+# Pooled HTTP client (shared keep-alive connections to SerpAPI)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))   # Number of hosts to keep pools for
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))          # Open connections per host
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))             # Extra attempts on 429/5xx/network errors
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))   # Seconds, doubled after each attempt
+
+# Product cache (in-memory tier in front of the SQLite cache store)
+CACHE_MEMORY_MAX_ENTRIES = int(os.getenv("CACHE_MEMORY_MAX_ENTRIES", "512"))
+CACHE_MEMORY_MAX_BYTES = int(os.getenv("CACHE_MEMORY_MAX_BYTES", str(32 * 1024 * 1024)))
+# Seconds past the 24h cache lifetime during which stale results are served while refreshing in the background
+CACHE_STALE_GRACE = int(os.getenv("CACHE_STALE_GRACE", str(6 * 3600)))
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", "2"))
+# SQLite cache store: size cap, how long expired rows are kept as a fallback, sweep interval (seconds)
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+CACHE_RETENTION = int(os.getenv("CACHE_RETENTION", str(7 * 86400)))
+CACHE_JANITOR_INTERVAL = int(os.getenv("CACHE_JANITOR_INTERVAL", "600"))
+# Also keep each memory-tier product list's JSON, so full lists are sent without re-encoding (about 2x the memory)
+CACHE_RAW_JSON = os.getenv("CACHE_RAW_JSON", "false").lower() in ("1", "true", "yes")
+
+# JSON encoder for responses and the cache: auto (orjson if installed), orjson or json
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+
+# Request coalescing: also dedupe identical fetches across gunicorn workers via lock files
+SINGLEFLIGHT_FILE_LOCK = os.getenv("SINGLEFLIGHT_FILE_LOCK", "false").lower() in ("1", "true", "yes")
+
+# Curated feed prewarming (app/prewarm.py). Off by default in the web app; can also run as scripts/prewarm.py
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "false").lower() in ("1", "true", "yes")
+PREWARM_REFRESH_AT = float(os.getenv("PREWARM_REFRESH_AT", "0.8"))          # Fraction of the cache lifetime
+PREWARM_JITTER = int(os.getenv("PREWARM_JITTER", "1800"))                   # Up to this many seconds earlier
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "2"))            # Feeds refreshed at once
+PREWARM_CHECK_INTERVAL = int(os.getenv("PREWARM_CHECK_INTERVAL", "300"))    # Seconds between checks
+PREWARM_START_JITTER = float(os.getenv("PREWARM_START_JITTER", "2"))        # Random delay before each refresh
+
+# Local catalog index: answer /api/search from already-fetched products when it finds enough
+CATALOG_INDEX_ENABLED = os.getenv("CATALOG_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+CATALOG_MAX_DOCS = int(os.getenv("CATALOG_MAX_DOCS", "50000"))
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "86400"))     # Ignore products fetched longer ago (seconds)
+CATALOG_MIN_RESULTS = int(os.getenv("CATALOG_MIN_RESULTS", "20"))
+CATALOG_MIN_STORES = int(os.getenv("CATALOG_MIN_STORES", "3"))
+
+# Product list pagination: largest page size, and how long merged /api/search results are kept for later pages
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "100"))
+SEARCH_RESULTS_TTL = int(os.getenv("SEARCH_RESULTS_TTL", "300"))
+
+# /api/search store fan-out: stores still running after the deadline answer from the cache, slow stores
+# get a second (hedged) call after SEARCH_HEDGE_MS (0 = off, it costs credits), and a store that fails
+# SEARCH_BREAKER_FAILURES times in a row is skipped for SEARCH_BREAKER_COOLDOWN seconds
+SEARCH_DEADLINE_MS = int(os.getenv("SEARCH_DEADLINE_MS", "3000"))
+SEARCH_HEDGE_MS = int(os.getenv("SEARCH_HEDGE_MS", "0"))
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "32"))
+SEARCH_BREAKER_FAILURES = int(os.getenv("SEARCH_BREAKER_FAILURES", "3"))
+SEARCH_BREAKER_COOLDOWN = int(os.getenv("SEARCH_BREAKER_COOLDOWN", "60"))
+
+# /metrics (Prometheus text format); if METRICS_TOKEN is set, scrapers must send "Authorization: Bearer <token>"
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Request profiling (all off by default): header token for on-demand profiles, fraction of requests
+# profiled automatically, and the latency above which a request's spans/profile are saved to PROFILE_DIR
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/profiles" if os.getenv("VERCEL") else os.path.join(os.getcwd(), "profiles"))
+PROFILE_MAX_DUMPS = int(os.getenv("PROFILE_MAX_DUMPS", "200"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
+# HTTP responses: JSON/HTML bodies at least this large are gzip (or brotli) compressed
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+
+# Price history ingestion: observations are buffered in memory and written in batches
+PRICE_HISTORY_FLUSH_INTERVAL = int(os.getenv("PRICE_HISTORY_FLUSH_INTERVAL", "30"))   # Seconds between flushes
+PRICE_HISTORY_BATCH_SIZE = int(os.getenv("PRICE_HISTORY_BATCH_SIZE", "500"))          # Rows per INSERT statement
+PRICE_HISTORY_MAX_BUFFER = int(os.getenv("PRICE_HISTORY_MAX_BUFFER", "50000"))        # New rows are dropped beyond this
+
+# Price alerts: title similarity needed to match, how often to reload alerts added by other workers
+ALERT_MATCH_THRESHOLD = float(os.getenv("ALERT_MATCH_THRESHOLD", "0.6"))
+ALERT_RELOAD_INTERVAL = int(os.getenv("ALERT_RELOAD_INTERVAL", "300"))
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "100"))  # Pending batches; more are dropped
+
 # 3. Supported Stores (Source ID -> Display Name)
 SOURCES = {
     "amazon": "Amazon", 
@@ -27,9 +118,46 @@ SOURCES = {
     "serpapi": "Google Shopping"
 }
 
+# Shipping per store in INR: (fee, free shipping from this subtotal). Used by the cart optimizer.
+DEFAULT_SHIPPING = (99.0, 999.0)
+STORE_SHIPPING = {
+    "amazon": (40.0, 499.0),
+    "bestbuy": (149.0, 2999.0),
+    "walmart": (129.0, 2999.0),
+    "ebay": (199.0, 4999.0),
+    "target": (99.0, 2499.0),
+    "newegg": (149.0, 4999.0),
+    "serpapi": (99.0, 999.0)
+}
+
+# Server-side carts: "sql" (cart_items table, shared by all workers/instances) or "memory"
+# (opt-in for single-process development: each worker has its own carts and restarts lose them)
+CART_BACKEND = os.getenv("CART_BACKEND", "sql").lower()
+CART_TTL = int(os.getenv("CART_TTL", str(7 * 86400)))  # Seconds after the last change
+
+# Cart optimizer limits
+CART_MAX_SELLERS = int(os.getenv("CART_MAX_SELLERS", "3"))
+CART_OPTIMIZE_BUDGET_MS = int(os.getenv("CART_OPTIMIZE_BUDGET_MS", "30"))
+CART_EXACT_MAX_ITEMS = int(os.getenv("CART_EXACT_MAX_ITEMS", "10"))  # Larger carts use the heuristic only
+
 # 4. Database Configuration
 MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
 MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
 MYSQL_USER = os.getenv("MYSQL_USER", "root")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "vinay")
 MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "ecommerce_db")
+
+# Connection pool. Vercel runs one request at a time per instance, so a single connection is enough there.
+IS_SERVERLESS = bool(os.getenv("VERCEL"))
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "0"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "1" if IS_SERVERLESS else "5"))
+DB_POOL_IDLE_TIMEOUT = int(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))        # Close connections idle this long
+DB_POOL_PING_AFTER = int(os.getenv("DB_POOL_PING_AFTER", "30"))             # Ping connections idle this long before reuse
+DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", "5"))  # Max wait for a free connection
+
+# When to check the schema version: "startup" in create_app, or "lazy" on the first database checkout,
+# so serverless cold starts that never touch the database don't connect at all. A database that is
+# behind gets the pending migrations (app/migrations) unless DB_AUTO_MIGRATE is off; then run
+# python scripts/migrate.py up as a deploy step instead.
+DB_SCHEMA_CHECK = os.getenv("DB_SCHEMA_CHECK", "lazy" if IS_SERVERLESS else "startup").lower()
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
@@ -0,0 +1,185 @@
+"""
+SerpAPI Credit Budget
+Every SerpAPI call costs a credit. This governor decides whether a call may go out:
+- a token bucket (SERPAPI_RATE_PER_MINUTE, bursts up to SERPAPI_BURST) caps the spend rate
+- SERPAPI_DAILY_BUDGET / SERPAPI_MONTHLY_BUDGET cap the total (UTC days and calendar months)
+State lives in one SQLite file, so all gunicorn workers (and the prewarm process) share it.
+
+Callers have a priority:
+- interactive: a user is waiting on this exact query (main search, store tabs)
+- background:  stale-cache refreshes and the feed prewarmer
+- suggestion:  calls that only widen an answer (the per-store comparison searches)
+Lower priorities leave part of every limit unused (SERPAPI_RESERVE_BACKGROUND / _SUGGESTION),
+so when credits run low they stop first and interactive searches keep working. Refused callers
+answer from the cache (state 'limited') instead of going upstream.
+"""
+import os
+import time
+import sqlite3
+import threading
+from app.config import (
+    SERPAPI_RATE_PER_MINUTE, SERPAPI_BURST, SERPAPI_DAILY_BUDGET, SERPAPI_MONTHLY_BUDGET,
+    SERPAPI_RESERVE_BACKGROUND, SERPAPI_RESERVE_SUGGESTION
+)
+from app.metrics import Counter, register_collector
+from app.cache import CACHE_DIR
+
+PRIORITIES = ("interactive", "background", "suggestion")
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS credit_bucket (id INTEGER PRIMARY KEY CHECK (id = 1), tokens REAL NOT NULL, updated_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS credit_usage (period TEXT PRIMARY KEY, used INTEGER NOT NULL)"
+]
+
+CREDIT_DECISIONS = Counter("serpapi_credit_decisions_total", "SerpAPI calls allowed or refused by the credit budget.",
+                           ("priority", "result"))
+
+class CreditBudget:
+    """
+    Shared token bucket plus daily/monthly counters on a SQLite file.
+    A limit of 0 means unlimited. If the file can't be used, calls are allowed (fail open).
+    """
+
+    def __init__(self, path, rate_per_minute, burst, daily, monthly, reserves):
+        self.path = path
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(burst or rate_per_minute, 1)
+        self.daily = daily
+        self.monthly = monthly
+        self.reserves = reserves  # priority -> fraction of each limit it must leave unused
+        self.enabled = bool(rate_per_minute or daily or monthly)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready_pid = None
+
+    def _connect(self):
+        """One connection per thread (and per process after a fork)."""
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == pid:
+            return conn
+        if self._ready_pid != pid:
+            with self._init_lock:
+                if self._ready_pid != pid:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    setup = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+                    try:
+                        setup.execute("PRAGMA journal_mode=WAL")
+                        for statement in SCHEMA:
+                            setup.execute(statement)
+                    finally:
+                        setup.close()
+                    self._ready_pid = pid
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = pid
+        return conn
+
+    @staticmethod
+    def _periods(now):
+        day = time.strftime("%Y-%m-%d", time.gmtime(now))
+        return f"day:{day}", f"month:{day[:7]}"
+
+    def _state(self, conn, now):
+        """(tokens after refill, used today, used this month)."""
+        row = conn.execute("SELECT tokens, updated_at FROM credit_bucket WHERE id = 1").fetchone()
+        tokens = self.burst if row is None else min(self.burst, row[0] + max(now - row[1], 0) * self.rate)
+        day, month = self._periods(now)
+        used = dict(conn.execute("SELECT period, used FROM credit_usage WHERE period IN (?, ?)", (day, month)).fetchall())
+        return tokens, used.get(day, 0), used.get(month, 0)
+
+    def _refusal(self, priority, tokens, used_day, used_month):
+        """Which limit stops a call at this priority, or None if it may go out."""
+        keep = self.reserves.get(priority, 0.0)
+        if self.rate and tokens - 1 < keep * self.burst:
+            return "rate"
+        if self.daily and used_day + 1 > self.daily * (1 - keep):
+            return "daily"
+        if self.monthly and used_month + 1 > self.monthly * (1 - keep):
+            return "monthly"
+        return None
+
+    def available(self, priority="interactive"):
+        """Whether a call at this priority would be allowed right now (spends nothing)."""
+        if not self.enabled:
+            return True
+        try:
+            return self._refusal(priority, *self._state(self._connect(), time.time())) is None
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️  Credit budget unavailable, allowing call: {e}")
+            return True
+
+    def acquire(self, priority="interactive"):
+        """Spend one credit if allowed. Returns (granted, reason); reason is 'rate', 'daily' or 'monthly'."""
+        if not self.enabled:
+            return True, None
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")  # Serializes the check-and-spend across processes
+            try:
+                now = time.time()
+                tokens, used_day, used_month = self._state(conn, now)
+                reason = self._refusal(priority, tokens, used_day, used_month)
+                if reason is None:
+                    tokens -= 1
+                    for period in self._periods(now):
+                        conn.execute(
+                            "INSERT INTO credit_usage (period, used) VALUES (?, 1) "
+                            "ON CONFLICT(period) DO UPDATE SET used = used + 1",
+                            (period,)
+                        )
+                conn.execute(
+                    "INSERT INTO credit_bucket (id, tokens, updated_at) VALUES (1, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    (tokens, now)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️  Credit budget unavailable, allowing call: {e}")
+            return True, None
+        CREDIT_DECISIONS.inc(priority, "allowed" if reason is None else f"refused_{reason}")
+        return reason is None, reason
+
+    def stats(self):
+        if not self.enabled:
+            return {"enabled": False}
+        try:
+            tokens, used_day, used_month = self._state(self._connect(), time.time())
+        except (sqlite3.Error, OSError) as e:
+            return {"enabled": True, "error": str(e)}
+        return {
+            "enabled": True,
+            "tokens": round(tokens, 2),
+            "burst": self.burst,
+            "rate_per_minute": round(self.rate * 60, 2),
+            "used_today": used_day,
+            "daily_budget": self.daily or None,
+            "used_this_month": used_month,
+            "monthly_budget": self.monthly or None,
+            "allowed": {priority: self._refusal(priority, tokens, used_day, used_month) is None for priority in PRIORITIES}
+        }
+
+credit_budget = CreditBudget(
+    os.path.join(CACHE_DIR, "serpapi_credits.sqlite3"),
+    rate_per_minute=SERPAPI_RATE_PER_MINUTE,
+    burst=SERPAPI_BURST,
+    daily=SERPAPI_DAILY_BUDGET,
+    monthly=SERPAPI_MONTHLY_BUDGET,
+    reserves={"interactive": 0.0, "background": SERPAPI_RESERVE_BACKGROUND, "suggestion": SERPAPI_RESERVE_SUGGESTION}
+)
+
+def _collect_credit_metrics():
+    stats = credit_budget.stats()
+    if "used_today" not in stats:
+        return []
+    return [
+        ("serpapi_credit_tokens", "gauge", "Tokens left in the shared SerpAPI rate bucket.", [({}, stats["tokens"])]),
+        ("serpapi_credits_used", "gauge", "SerpAPI credits spent in the current period.",
+         [({"period": "day"}, stats["used_today"]), ({"period": "month"}, stats["used_this_month"])]),
+    ]
+
+register_collector(_collect_credit_metrics)
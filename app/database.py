@@ -1,15 +1,39 @@
-import mysql.connector
-from mysql.connector import Error
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from app.config import MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE, MYSQL_PORT
+import time
+import datetime
+import importlib
+import threading
+from contextlib import contextmanager
+from app.config import (
+    MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE, MYSQL_PORT,
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_IDLE_TIMEOUT, DB_POOL_PING_AFTER, DB_POOL_CHECKOUT_TIMEOUT,
+    DB_SCHEMA_CHECK, DB_AUTO_MIGRATE
+)
+from app.db_pool import ConnectionPool
+from app.migrate import dialect_of, current_version, latest_version, migrate
+from app.metrics import DB_QUERIES, query_operation, register_collector
+
+# PostgreSQL (Supabase) on the standard Postgres ports, MySQL otherwise
+USE_POSTGRES = MYSQL_PORT in (5432, 6543)
+
+_pool = None
+_pool_lock = threading.Lock()
+_schema_checked = False
+_schema_retry_at = 0.0
+_schema_lock = threading.Lock()
+SCHEMA_RETRY_INTERVAL = 30  # Seconds between attempts after a failed migration
+
+def _driver(name):
+    """
+    Import a database driver module on first use ("psycopg2.extras" or "mysql.connector").
+    Only the configured backend's driver is ever loaded; each costs tens of ms at cold start.
+    """
+    return importlib.import_module(name)
 
 def get_db_connection():
-    """Create a connection to the database (MySQL or PostgreSQL)."""
-    # Try PostgreSQL (Supabase) first if port matches standard Postgres ports
-    if MYSQL_PORT in [5432, 6543]:
+    """Open a new, unpooled connection to the database (MySQL or PostgreSQL)."""
+    if USE_POSTGRES:
         try:
-            conn = psycopg2.connect(
+            conn = _driver("psycopg2").connect(
                 host=MYSQL_HOST,
                 user=MYSQL_USER,
                 password=MYSQL_PASSWORD,
@@ -22,125 +46,150 @@ def get_db_connection():
             print(f"❌ PostgreSQL Connection failed: {e}")
             return None
     
-    # Fallback to MySQL
     try:
-        return mysql.connector.connect(
+        return _driver("mysql.connector").connect(
             host=MYSQL_HOST, 
             user=MYSQL_USER, 
             password=MYSQL_PASSWORD, 
             database=MYSQL_DATABASE, 
             port=MYSQL_PORT
         )
-    except Error as e:
+    except Exception as e:
         print(f"❌ MySQL Connection failed: {e}")
         return None
 
+def get_pool():
+    """The process-wide connection pool, created on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_db_connection,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    idle_timeout=DB_POOL_IDLE_TIMEOUT,
+                    ping_after=DB_POOL_PING_AFTER,
+                    checkout_timeout=DB_POOL_CHECKOUT_TIMEOUT
+                )
+    return _pool
+
+@contextmanager
+def db_connection():
+    """
+    Borrow a pooled connection:
+        with db_connection() as conn:
+            ...
+    conn is None if the database is unreachable. Uncommitted work is rolled back on return.
+    The first connection a process gets also checks the schema (see ensure_schema).
+    """
+    with get_pool().connection() as conn:
+        if conn is not None and not _schema_checked:
+            ensure_schema(conn)
+        yield conn
+
+def get_pool_stats():
+    """Pool size and checkout wait-time metrics for this worker process."""
+    return get_pool().stats()
+
+def _collect_pool_metrics():
+    if _pool is None:
+        return []  # Don't open connections just to report on them
+    stats = _pool.stats()
+    return [
+        ("db_pool_connections", "gauge", "Pooled database connections by state.",
+         [({"state": "idle"}, stats["idle"]), ({"state": "in_use"}, stats["in_use"])]),
+        ("db_pool_checkouts_total", "counter", "Connections handed out by the pool.", [({}, stats["checkouts"])]),
+        ("db_pool_waits_total", "counter", "Checkouts that had to wait for a free connection.", [({}, stats["waits"])]),
+        ("db_pool_wait_seconds_total", "counter", "Time spent waiting for a free connection.", [({}, stats["wait_seconds"])]),
+        ("db_pool_timeouts_total", "counter", "Checkouts that gave up waiting.", [({}, stats["timeouts"])]),
+    ]
+
+register_collector(_collect_pool_metrics)
+
 def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=False):
     """Helper to execute database queries."""
-    conn = get_db_connection()
-    if not conn:
-        return None
-    
-    # Check if it's a PostgreSQL connection
-    is_postgres = hasattr(conn, 'info')  # psycopg2 connection object has 'info' attribute
-    
+    started = time.perf_counter()
+    outcome = "unavailable"  # No connection; becomes "ok" or "error" once the query runs
     try:
-        if is_postgres:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-        else:
-            cursor = conn.cursor(dictionary=True)
-            
-        cursor.execute(query, params)
-        
-        if commit:
-            conn.commit()
-            if is_postgres:
-                # PostgreSQL doesn't always support lastrowid the same way
-                # Usually we need "RETURNING id" in the query for Postgres
-                return True 
-            else:
-                return cursor.lastrowid
+        with db_connection() as conn:
+            if not conn:
+                return None
             
-        if fetch_one:
-            return cursor.fetchone()
-        if fetch_all:
-            return cursor.fetchall()
+            # Check if it's a PostgreSQL connection
+            is_postgres = hasattr(conn, 'info')  # psycopg2 connection object has 'info' attribute
             
-    except Exception as e:
-        print(f"❌ Query error: {e}")
+            cursor = None
+            try:
+                if is_postgres:
+                    cursor = conn.cursor(cursor_factory=_driver("psycopg2.extras").RealDictCursor)
+                else:
+                    cursor = conn.cursor(dictionary=True)
+                    
+                cursor.execute(query, params)
+                
+                if commit:
+                    conn.commit()
+                    outcome = "ok"
+                    if is_postgres:
+                        # PostgreSQL doesn't always support lastrowid the same way
+                        # Usually we need "RETURNING id" in the query for Postgres
+                        return True 
+                    else:
+                        return cursor.lastrowid
+                    
+                outcome = "ok"
+                if fetch_one:
+                    return cursor.fetchone()
+                if fetch_all:
+                    return cursor.fetchall()
+                    
+            except Exception as e:
+                outcome = "error"
+                print(f"❌ Query error: {e}")
+            finally:
+                if cursor:
+                    cursor.close()
+        return None
     finally:
-        cursor.close()
-        conn.close()
-    return None
+        DB_QUERIES.observe(time.perf_counter() - started, query_operation(query), outcome)
 
 def init_database():
-    """Initialize the database tables if they don't exist."""
-    conn = get_db_connection()
-    if not conn:
+    """
+    Check the schema at startup (DB_SCHEMA_CHECK=startup). With DB_SCHEMA_CHECK=lazy nothing
+    happens here and the first database checkout does the check instead.
+    """
+    if DB_SCHEMA_CHECK != "startup":
         return
+    with db_connection():
+        pass
 
-    is_postgres = hasattr(conn, 'info')
-    cursor = conn.cursor()
-    
-    # Define Types based on DB
-    if is_postgres:
-        AUTO_INC = "SERIAL"
-        TIMESTAMP = "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
-    else:
-        AUTO_INC = "INT AUTO_INCREMENT"
-        TIMESTAMP = "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
-    
-    # List of tables to create
-    tables = [
-        f"""CREATE TABLE IF NOT EXISTS users (
-            id {AUTO_INC} PRIMARY KEY, 
-            username VARCHAR(50) UNIQUE NOT NULL, 
-            password_hash VARCHAR(255) NOT NULL, 
-            created_at {TIMESTAMP}
-        )""",
-        f"""CREATE TABLE IF NOT EXISTS orders (
-            id {AUTO_INC} PRIMARY KEY, 
-            user_id INT NOT NULL, 
-            total_amount DECIMAL(10, 2) NOT NULL, 
-            created_at {TIMESTAMP}, 
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-        )""",
-        f"""CREATE TABLE IF NOT EXISTS order_items (
-            id {AUTO_INC} PRIMARY KEY, 
-            order_id INT NOT NULL, 
-            product_id VARCHAR(255) NOT NULL, 
-            product_title VARCHAR(500) NOT NULL, 
-            price DECIMAL(10, 2) NOT NULL, 
-            quantity INT NOT NULL, 
-            FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
-        )""",
-        f"""CREATE TABLE IF NOT EXISTS price_history (
-            id {AUTO_INC} PRIMARY KEY,
-            product_id VARCHAR(255) NOT NULL,
-            price DECIMAL(10, 2) NOT NULL,
-            recorded_at DATE NOT NULL,
-            source VARCHAR(50)
-        )""",
-        f"""CREATE TABLE IF NOT EXISTS price_alerts (
-            id {AUTO_INC} PRIMARY KEY,
-            user_id INT,
-            product_title VARCHAR(500) NOT NULL,
-            target_price DECIMAL(10, 2) NOT NULL,
-            email VARCHAR(255) NOT NULL,
-            created_at {TIMESTAMP}
-        )"""
-    ]
-
-    try:
-        for table_sql in tables:
-            cursor.execute(table_sql)
-        conn.commit()
-        print("✅ Database ready")
-    except Error as e:
-        print(f"❌ Init error: {e}")
-    finally:
-        cursor.close()
-        conn.close()
+def ensure_schema(conn):
+    """
+    Read the schema version (one SELECT) until it is known to be current. Only if the database
+    is behind app/migrations are the pending migrations applied, unless DB_AUTO_MIGRATE is off.
+    Other threads wait on the lock meanwhile, so nobody queries half-migrated tables; a failed
+    migration is retried by a later checkout, at most every SCHEMA_RETRY_INTERVAL seconds.
+    """
+    global _schema_checked, _schema_retry_at
+    with _schema_lock:
+        if _schema_checked or time.monotonic() < _schema_retry_at:
+            return
+        version, latest = current_version(conn), latest_version(dialect_of(conn))
+        if version >= latest:
+            _schema_checked = True
+            return
+        if not DB_AUTO_MIGRATE:
+            print(f"⚠️  Database schema is at version {version}, expected {latest}: run python scripts/migrate.py up")
+            _schema_checked = True
+            return
+        try:
+            migrate(conn)
+            _schema_checked = True
+            print("✅ Database ready")
+        except Exception as e:
+            _schema_retry_at = time.monotonic() + SCHEMA_RETRY_INTERVAL
+            print(f"❌ Migration error: {e}")
 
 def create_user(username, password_hash):
     """Register a new user."""
@@ -154,87 +203,261 @@ def get_user_by_username(username):
 
 def create_order(user_id, total_amount, items):
     """Create a new order with items."""
-    conn = get_db_connection()
-    if not conn:
-        return None, "Database connection failed"
-        
-    is_postgres = hasattr(conn, 'info')
-    cursor = conn.cursor()
-    try:
-        # 1. Create Order
-        if is_postgres:
-            cursor.execute(
-                "INSERT INTO orders (user_id, total_amount) VALUES (%s, %s) RETURNING id",
-                (user_id, total_amount)
-            )
-            order_id = cursor.fetchone()[0]
-        else:
-            cursor.execute(
-                "INSERT INTO orders (user_id, total_amount) VALUES (%s, %s)",
-                (user_id, total_amount)
+    with db_connection() as conn:
+        if not conn:
+            return None, "Database connection failed"
+            
+        is_postgres = hasattr(conn, 'info')
+        cursor = conn.cursor()
+        try:
+            # 1. Create Order
+            if is_postgres:
+                cursor.execute(
+                    "INSERT INTO orders (user_id, total_amount) VALUES (%s, %s) RETURNING id",
+                    (user_id, total_amount)
+                )
+                order_id = cursor.fetchone()[0]
+            else:
+                cursor.execute(
+                    "INSERT INTO orders (user_id, total_amount) VALUES (%s, %s)",
+                    (user_id, total_amount)
+                )
+                order_id = cursor.lastrowid
+            
+            # 2. Add Items
+            item_values = [
+                (order_id, i['id'], i['title'], i['price'], i['quantity']) 
+                for i in items
+            ]
+            cursor.executemany(
+                """INSERT INTO order_items (order_id, product_id, product_title, price, quantity) 
+                   VALUES (%s, %s, %s, %s, %s)""",
+                item_values
             )
-            order_id = cursor.lastrowid
-        
-        # 2. Add Items
-        item_values = [
-            (order_id, i['id'], i['title'], i['price'], i['quantity']) 
-            for i in items
-        ]
-        cursor.executemany(
-            """INSERT INTO order_items (order_id, product_id, product_title, price, quantity) 
-               VALUES (%s, %s, %s, %s, %s)""",
-            item_values
-        )
-        
-        conn.commit()
-        return order_id, None
-    except Exception as e:
-        print(f"❌ Order error: {e}")
-        conn.rollback()
-        return None, str(e)
-    finally:
-        cursor.close()
-        conn.close()
+            
+            conn.commit()
+            return order_id, None
+        except Exception as e:
+            print(f"❌ Order error: {e}")
+            conn.rollback()
+            return None, str(e)
+        finally:
+            cursor.close()
 
 def get_user_orders(user_id):
-    """Get all orders for a user."""
-    query = """
-        SELECT o.id, o.total_amount, o.created_at,
-               oi.product_title, oi.price, oi.quantity, oi.product_id
-        FROM orders o
-        JOIN order_items oi ON o.id = oi.order_id
-        WHERE o.user_id = %s
-        ORDER BY o.created_at DESC
-    """
-    rows = execute_query(query, (user_id,), fetch_all=True)
-    
+    """Get all orders for a user, newest first."""
+    orders, _ = get_user_orders_page(user_id)
+    return orders
+
+def get_user_orders_page(user_id, limit=None, before=None, summary=False):
+    """
+    One page of a user's orders, newest first, using keyset pagination on (created_at, id).
+
+    `before` is the (created_at, id) of the last order on the previous page.
+    With `summary=True` each order has item counts (aggregated in SQL) instead of its items.
+    Returns (orders, last_key) where last_key is None if there are no more orders.
+    """
+    params = [user_id]
+    where = "o.user_id = %s"
+    if before:
+        where += " AND (o.created_at < %s OR (o.created_at = %s AND o.id < %s))"
+        params += [before[0], before[0], before[1]]
+    # Fetch one extra row to know whether another page follows
+    limit_sql = ""
+    if limit:
+        limit_sql = " LIMIT %s"
+        params.append(limit + 1)
+
+    if summary:
+        query = f"""
+            SELECT o.id, o.total_amount, o.created_at,
+                   COUNT(oi.id) AS line_count, COALESCE(SUM(oi.quantity), 0) AS item_count
+            FROM orders o
+            LEFT JOIN order_items oi ON oi.order_id = o.id
+            WHERE {where}
+            GROUP BY o.id, o.total_amount, o.created_at
+            ORDER BY o.created_at DESC, o.id DESC{limit_sql}
+        """
+    else:
+        query = f"""
+            SELECT o.id, o.total_amount, o.created_at
+            FROM orders o
+            WHERE {where}
+            ORDER BY o.created_at DESC, o.id DESC{limit_sql}
+        """
+    rows = execute_query(query, tuple(params), fetch_all=True)
     if not rows:
-        return []
-        
-    # Group items by order
-    orders = {}
+        return [], None
+
+    has_more = bool(limit) and len(rows) > limit
+    rows = rows[:limit] if limit else rows
+
+    orders = []
     for row in rows:
-        oid = row['id']
-        if oid not in orders:
-            orders[oid] = {
-                'order_id': oid,
-                'total_amount': float(row['total_amount']),
-                'created_at': row['created_at'],
-                'items': []
-            }
-        orders[oid]['items'].append({
-            'product_title': row['product_title'],
-            'price': float(row['price']),
-            'quantity': row['quantity'],
-            'product_id': row['product_id']
-        })
-    
-    return list(orders.values())
+        order = {
+            'order_id': row['id'],
+            'total_amount': float(row['total_amount']),
+            'created_at': row['created_at']
+        }
+        if summary:
+            order['line_count'] = int(row['line_count'])
+            order['item_count'] = int(row['item_count'])
+        else:
+            order['items'] = []
+        orders.append(order)
+
+    if not summary:
+        # Items for the whole page in one query (uses the order_items(order_id) index)
+        by_id = {order['order_id']: order for order in orders}
+        placeholders = ", ".join(["%s"] * len(by_id))
+        items = execute_query(
+            f"""SELECT order_id, product_title, price, quantity, product_id
+                FROM order_items WHERE order_id IN ({placeholders}) ORDER BY id""",
+            tuple(by_id), fetch_all=True
+        ) or []
+        for item in items:
+            by_id[item['order_id']]['items'].append({
+                'product_title': item['product_title'],
+                'price': float(item['price']),
+                'quantity': item['quantity'],
+                'product_id': item['product_id']
+            })
+
+    last = rows[-1]
+    return orders, ((last['created_at'], last['id']) if has_more else None)
 
 def add_price_alert(user_id, product_title, target_price, email):
-    """Add a price watch alert."""
+    """Add a price watch alert. Returns the new alert id, or None."""
+    with db_connection() as conn:
+        if not conn:
+            return None
+
+        is_postgres = hasattr(conn, 'info')
+        cursor = conn.cursor()
+        try:
+            if is_postgres:
+                cursor.execute(
+                    """INSERT INTO price_alerts (user_id, product_title, target_price, email)
+                       VALUES (%s, %s, %s, %s) RETURNING id""",
+                    (user_id, product_title, target_price, email)
+                )
+                alert_id = cursor.fetchone()[0]
+            else:
+                cursor.execute(
+                    """INSERT INTO price_alerts (user_id, product_title, target_price, email)
+                       VALUES (%s, %s, %s, %s)""",
+                    (user_id, product_title, target_price, email)
+                )
+                alert_id = cursor.lastrowid
+            conn.commit()
+            return alert_id
+        except Exception as e:
+            print(f"❌ Alert error: {e}")
+            conn.rollback()
+            return None
+        finally:
+            cursor.close()
+
+def get_active_alerts():
+    """All alerts that have not fired yet. Returns None if the database is unreachable."""
+    query = """
+        SELECT a.id, a.user_id, a.product_title, a.target_price, a.email
+        FROM price_alerts a
+        LEFT JOIN price_alert_outbox o ON o.alert_id = a.id
+        WHERE o.alert_id IS NULL
+    """
+    rows = execute_query(query, fetch_all=True)
+    if rows is None:
+        return None
+    return [dict(row, target_price=float(row['target_price'])) for row in rows]
+
+def save_fired_alerts(rows):
+    """
+    Queue fired alerts for delivery in price_alert_outbox (one row per alert; an alert
+    already fired by another worker is skipped). Returns True on success.
+    """
+    columns = ("alert_id", "user_id", "email", "product_id", "product_title", "source", "price", "target_price")
+    values = [tuple(row[c] for c in columns) for row in rows]
+    with db_connection() as conn:
+        if not conn:
+            return False
+
+        is_postgres = hasattr(conn, 'info')
+        cursor = conn.cursor()
+        try:
+            if is_postgres:
+                _driver("psycopg2.extras").execute_values(
+                    cursor,
+                    f"INSERT INTO price_alert_outbox ({', '.join(columns)}) VALUES %s ON CONFLICT (alert_id) DO NOTHING",
+                    values,
+                    page_size=len(values)
+                )
+            else:
+                cursor.executemany(
+                    f"INSERT IGNORE INTO price_alert_outbox ({', '.join(columns)}) "
+                    f"VALUES ({', '.join(['%s'] * len(columns))})",
+                    values
+                )
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"❌ Alert outbox error: {e}")
+            conn.rollback()
+            return False
+        finally:
+            cursor.close()
+
+def save_price_observations(rows):
+    """
+    Upsert (product_id, source, recorded_at, price) rows in one multi-row statement.
+    A product keeps one row per source and day; a later price for the same day replaces it.
+    Returns True on success.
+    """
+    with db_connection() as conn:
+        if not conn:
+            return False
+
+        is_postgres = hasattr(conn, 'info')
+        cursor = conn.cursor()
+        try:
+            if is_postgres:
+                _driver("psycopg2.extras").execute_values(
+                    cursor,
+                    """INSERT INTO price_history (product_id, source, recorded_at, price) VALUES %s
+                       ON CONFLICT (product_id, source, recorded_at) DO UPDATE SET price = EXCLUDED.price""",
+                    rows,
+                    page_size=len(rows)
+                )
+            else:
+                # mysql-connector rewrites executemany INSERTs into a single multi-row INSERT
+                cursor.executemany(
+                    """INSERT INTO price_history (product_id, source, recorded_at, price)
+                       VALUES (%s, %s, %s, %s)
+                       ON DUPLICATE KEY UPDATE price = VALUES(price)""",
+                    rows
+                )
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"❌ Price history write error: {e}")
+            conn.rollback()
+            return False
+        finally:
+            cursor.close()
+
+def get_price_history(product_id, source=None, days=90):
+    """Daily lowest price for a product over the last `days` days, oldest first."""
+    since = datetime.date.today() - datetime.timedelta(days=days)
     query = """
-        INSERT INTO price_alerts (user_id, product_title, target_price, email)
-        VALUES (%s, %s, %s, %s)
+        SELECT recorded_at, MIN(price) AS price
+        FROM price_history
+        WHERE product_id = %s AND recorded_at >= %s
     """
-    return execute_query(query, (user_id, product_title, target_price, email), commit=True)
+    params = [product_id, since]
+    if source:
+        query += " AND source = %s"
+        params.append(source)
+    query += " GROUP BY recorded_at ORDER BY recorded_at"
+
+    rows = execute_query(query, tuple(params), fetch_all=True) or []
+    return [{"date": row['recorded_at'].isoformat(), "price": float(row['price'])} for row in rows]
@@ -0,0 +1,247 @@
+"""
+Database Connection Pool
+Reuses open connections for both the psycopg2 (PostgreSQL) and mysql-connector backends.
+"""
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    - `factory()` opens a new connection (or returns None on failure).
+    - Connections idle longer than `ping_after` seconds are health-checked on checkout.
+    - `min_size` connections are opened on first use and kept open: connections idle longer
+      than `idle_timeout` are closed, down to `min_size`.
+    - Callers wait up to `checkout_timeout` seconds when `max_size` connections are in use.
+    No background thread is needed, so it also works in short-lived serverless processes.
+    """
+
+    def __init__(self, factory, min_size=0, max_size=5, idle_timeout=300, ping_after=30, checkout_timeout=5):
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.checkout_timeout = checkout_timeout
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = deque()  # (conn, last_used), most recently used on the right
+        self._size = 0        # Open connections, idle + checked out
+        self._owned = set()   # id() of the connections counted in _size
+        self._filled = False  # min_size connections opened
+        self._stats = {
+            "checkouts": 0, "waits": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+            "timeouts": 0, "created": 0, "closed": 0, "failed_checks": 0
+        }
+
+    def _check_fork(self):
+        # Sockets inherited from a parent process must not be shared; just forget them
+        if self._pid != os.getpid():
+            self._reset()
+
+    # ---------------------------
+    # Checkout / Return
+    # ---------------------------
+    def acquire(self):
+        """Check a connection out of the pool. Returns None if none could be opened in time."""
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        waited = False
+        if not self._filled or self._pid != os.getpid():
+            self._fill()
+
+        while True:
+            conn = None
+            create = False
+            with self._cond:
+                self._check_fork()
+                self._reap_idle()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        print(f"❌ DB pool exhausted: {self.max_size} connections in use")
+                        return None
+                    waited = True
+                    self._cond.wait(remaining)
+                    self._check_fork()
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+
+            if create:
+                conn = self._open()
+                if conn is None:
+                    return None
+            elif not self._is_healthy(conn, last_used):
+                with self._cond:
+                    self._stats["failed_checks"] += 1
+                self._discard(conn)
+                continue
+
+            self._record_checkout(time.monotonic() - started, waited)
+            return conn
+
+    def release(self, conn, broken=False):
+        """Return a connection. Any open transaction is rolled back first."""
+        if conn is None:
+            return
+        if not broken:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            self._discard(conn)
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._reap_idle()
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        with pool.connection() as conn:
+            ...
+        Yields None if the database is unreachable, mirroring get_db_connection().
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn, broken=not _is_open(conn))
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+    def _fill(self):
+        """Open min_size connections up front, so the first requests don't each pay a connect."""
+        with self._cond:
+            self._check_fork()
+            if self._filled:
+                return
+            self._filled = True
+            missing = max(min(self.min_size, self.max_size) - self._size, 0)
+            self._size += missing  # Reserve the slots, then connect outside the lock
+        for opened in range(missing):
+            conn = self._open()
+            if conn is None:
+                with self._cond:
+                    self._size -= missing - opened - 1  # _open already gave back this slot
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def _open(self):
+        try:
+            conn = self.factory()
+        except Exception as e:
+            print(f"❌ DB connect error: {e}")
+            conn = None
+        with self._cond:
+            if conn is None:
+                self._size -= 1
+                self._cond.notify()
+            else:
+                self._owned.add(id(conn))
+                self._stats["created"] += 1
+        return conn
+
+    def _is_healthy(self, conn, last_used):
+        """Cheap local check always; a round-trip ping only if the connection sat idle a while."""
+        if not _is_open(conn):
+            return False
+        if time.monotonic() - last_used < self.ping_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        with self._cond:
+            if id(conn) not in self._owned:
+                return  # Inherited from before a fork: already forgotten, and the parent still uses it
+            self._owned.discard(id(conn))
+            self._size -= 1
+            self._stats["closed"] += 1
+            self._cond.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _reap_idle(self):
+        """Close connections idle past idle_timeout, oldest first (caller holds the lock)."""
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._owned.discard(id(conn))
+            self._size -= 1
+            self._stats["closed"] += 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _record_checkout(self, wait, waited):
+        with self._cond:
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_seconds"] += wait
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], wait)
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones are closed when returned)."""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._owned.discard(id(conn))
+                self._size -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "avg_wait_ms": round(stats["wait_seconds"] / stats["checkouts"] * 1000, 3) if stats["checkouts"] else 0.0
+            })
+            stats["wait_seconds"] = round(stats["wait_seconds"], 4)
+            stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 4)
+            return stats
+
+def _is_open(conn):
+    """Local (no round trip) check that a connection has not been closed."""
+    if conn is None:
+        return False
+    if hasattr(conn, "closed"):  # psycopg2: 0 means open
+        return not conn.closed
+    return True  # mysql-connector only knows by pinging; see _is_healthy
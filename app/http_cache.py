@@ -0,0 +1,113 @@
+"""
+HTTP Caching & Compression
+Conditional GET for product JSON plus gzip/brotli compression of large responses.
+
+Product responses are built from cache entries, so their ETag is derived from the routes'
+arguments and the state and `stored_at` of every entry used: a repeat poll with If-None-Match
+gets a 304 without the body being rebuilt or serialized. Cache-Control max-age is the time left
+before the oldest of those entries expires.
+"""
+import gzip
+import time
+import hashlib
+from flask import request, jsonify, Response
+from app.config import COMPRESS_MIN_BYTES, COMPRESS_LEVEL
+from app.cache import CACHE_DURATION
+from app.profiling import span
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+# Cache states whose data may be cached by clients until the entry expires
+CACHEABLE_STATES = {"fresh", "live"}
+COMPRESSIBLE_TYPES = {"application/json", "text/html", "text/css", "application/javascript", "text/javascript"}
+
+def make_etag(*parts):
+    """Strong ETag value for a response identified by `parts` (route args, entry versions...)."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:32]
+
+def remaining_ttl(stored, cap=CACHE_DURATION):
+    """
+    Seconds (at most `cap`) until the first of the given cache entries expires, from
+    (state, stored_at) pairs. None if any entry is stale or a fallback, i.e. clients
+    should revalidate every time.
+    """
+    now = time.time()
+    remaining = cap
+    for state, stored_at in stored:
+        if state not in CACHEABLE_STATES:
+            return None
+        if stored_at:
+            remaining = min(remaining, CACHE_DURATION - (now - stored_at))
+    return max(int(remaining), 0)
+
+def _client_has(etag):
+    # Compressed variants carry a suffix (see compress_response); any of them matches
+    tags = request.if_none_match
+    return tags.star_tag or any(tag.split("-", 1)[0] == etag for tag in tags.as_set(include_weak=True))
+
+def versioned_json(build, version, stored, max_age=CACHE_DURATION):
+    """
+    Respond with build() (a response, or data for jsonify), or 304 Not Modified if the client
+    already has this version.
+    `version` identifies everything the body holds (e.g. cache entries' state and stored_at), as
+    the ETag is strong; the request's path and query string are always part of it. `stored` are
+    the (state, stored_at) pairs behind it and `max_age` caps how long clients may reuse the
+    response without asking.
+    """
+    etag = make_etag(request.full_path, version)
+    max_age = remaining_ttl(stored, max_age)
+
+    if _client_has(etag):
+        response = Response(status=304)
+    else:
+        with span("serialize"):
+            body = build()
+            response = body if isinstance(body, Response) else jsonify(body)
+    response.set_etag(etag)
+    if max_age:
+        response.headers["Cache-Control"] = f"public, max-age={max_age}"
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def compress_response(response):
+    """after_request hook: gzip (or brotli, if installed and accepted) bodies over COMPRESS_MIN_BYTES."""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        encoding = "br"
+    elif accepted["gzip"]:
+        encoding = "gzip"
+    else:
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    if encoding == "br":
+        response.set_data(brotli.compress(body, quality=min(COMPRESS_LEVEL, 11)))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=COMPRESS_LEVEL))
+    response.headers["Content-Encoding"] = encoding
+
+    # A compressed body is a different representation, so it needs its own strong ETag
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+def init_http_cache(app):
+    app.after_request(compress_response)
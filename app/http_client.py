@@ -0,0 +1,108 @@
+"""
+Pooled HTTP Client
+One keep-alive session per process, shared by every upstream API call.
+"""
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from app.config import (
+    REQUEST_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE,
+    HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR
+)
+
+# Status codes worth retrying (rate limited or temporary server trouble)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_BACKOFF = 5.0  # Never sleep longer than this between attempts
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+def _build_session():
+    """Create a session whose adapters keep connections open per host."""
+    session = requests.Session()
+    # Retries are handled in request_json so they can respect the caller's deadline
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=0,
+        pool_block=False
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session():
+    """
+    Return the process-wide session.
+    A new one is built after a fork (e.g. gunicorn --preload) so workers never share sockets.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+def _retry_delay(response, attempt):
+    """Work out how long to wait before the next attempt."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF)
+    return min(HTTP_BACKOFF_FACTOR * (2 ** attempt), MAX_BACKOFF)
+
+def request_json(url, params=None, headers=None, timeout=None, on_attempt=None):
+    """
+    GET a URL through the pooled session and return the decoded JSON (or None).
+
+    `timeout` is the total deadline for the call in seconds, retries included.
+    Defaults to REQUEST_TIMEOUT. `on_attempt(status, seconds)` is called after every
+    attempt; status is the HTTP status code, or 'timeout' / 'error'.
+    """
+    deadline = time.monotonic() + (timeout or REQUEST_TIMEOUT)
+    session = get_session()
+
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"❌ API deadline exceeded: {url}")
+            return None
+
+        response = None
+        started = time.monotonic()
+        try:
+            response = session.get(
+                url, params=params, headers=headers,
+                timeout=(min(HTTP_CONNECT_TIMEOUT, remaining), remaining)
+            )
+            if on_attempt:
+                on_attempt(response.status_code, time.monotonic() - started)
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code not in RETRY_STATUSES:
+                print(f"❌ API Request failed: {url} | Status: {response.status_code} | Body: {response.text[:100]}")
+                return None
+            error = f"Status: {response.status_code}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if on_attempt and response is None:
+                on_attempt("timeout" if isinstance(e, requests.Timeout) else "error", time.monotonic() - started)
+            error = str(e)
+        except Exception as e:
+            if on_attempt and response is None:
+                on_attempt("error", time.monotonic() - started)
+            print(f"❌ API Connection error: {e}")
+            return None
+
+        # Only retry if there is time left for the wait plus another attempt
+        delay = _retry_delay(response, attempt)
+        if attempt == HTTP_MAX_RETRIES or time.monotonic() + delay >= deadline:
+            print(f"❌ API Request failed: {url} | {error}")
+            return None
+        time.sleep(delay)
+
+    return None
@@ -0,0 +1,105 @@
+"""
+JSON Codec
+One place for JSON encoding/decoding: orjson when it is installed, the stdlib json module otherwise.
+
+Used by the Flask app (FastJSONProvider, so jsonify gets it too), the product cache and the
+search stream. Pick the backend with JSON_BACKEND: 'auto' (default), 'orjson' or 'json'.
+Anything orjson refuses (NaN, integers over 64 bits...) is retried with the stdlib encoder,
+so switching backends never turns a response into an error.
+"""
+import json
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+from app.config import JSON_BACKEND
+
+try:
+    import orjson
+except ImportError:  # Optional: stdlib json only
+    orjson = None
+
+if JSON_BACKEND == "orjson" and orjson is None:
+    print("⚠️  JSON_BACKEND=orjson but orjson is not installed; using the json module")
+USE_ORJSON = orjson is not None and JSON_BACKEND in ("auto", "orjson")
+BACKEND = "orjson" if USE_ORJSON else "json"
+
+def dumps_bytes(obj, default=None, sort_keys=False, indent=False):
+    """Compact UTF-8 JSON for `obj` as bytes."""
+    if USE_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except orjson.JSONEncodeError:
+            pass  # Fall through to the json module, which is more permissive
+    return _std_dumps(obj, default, sort_keys, indent).encode("utf-8")
+
+def dumps(obj, default=None, sort_keys=False, indent=False):
+    """Compact JSON for `obj` as str."""
+    if USE_ORJSON:
+        return dumps_bytes(obj, default, sort_keys, indent).decode("utf-8")
+    return _std_dumps(obj, default, sort_keys, indent)
+
+def _std_dumps(obj, default, sort_keys, indent):
+    if indent:
+        return json.dumps(obj, default=default, sort_keys=sort_keys, indent=2)
+    return json.dumps(obj, default=default, sort_keys=sort_keys, separators=(",", ":"))
+
+def loads(raw):
+    """Parse JSON from str or bytes."""
+    if USE_ORJSON:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+# ---------------------------
+# Pre-serialized values
+# ---------------------------
+class RawList(list):
+    """
+    A list that also carries its own JSON encoding (`raw`, bytes).
+    The memory cache hands these out with CACHE_RAW_JSON on, so a full product list can be
+    written into a response without being encoded again. Treat it as read-only: `raw` is
+    not updated if the list changes.
+    """
+    __slots__ = ("raw",)
+
+    def __init__(self, items, raw):
+        super().__init__(items)
+        self.raw = raw if isinstance(raw, bytes) else raw.encode("utf-8")
+
+def json_response(fields):
+    """
+    A JSON response for a dict whose values may include RawList: those are spliced in from
+    their `raw` bytes instead of being encoded again.
+    """
+    parts = []
+    for key, value in fields.items():
+        encoded = value.raw if isinstance(value, RawList) else dumps_bytes(value)
+        parts.append(dumps_bytes(str(key)) + b":" + encoded)
+    return Response(b"{" + b",".join(parts) + b"}\n", mimetype="application/json")
+
+# ---------------------------
+# Flask integration
+# ---------------------------
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using this module (keeps Flask's handling of dates, UUIDs and dataclasses)."""
+
+    sort_keys = False  # Clients don't depend on key order; sorting 500 products is wasted work
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, default=self.default, sort_keys=kwargs.get("sort_keys", self.sort_keys))
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = dumps_bytes(obj, default=self.default, sort_keys=self.sort_keys, indent=indent)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+def init_json(app):
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,147 @@
+"""
+Product Matching
+Groups listings of the same product from different stores into one entry with a price list.
+
+Comparing every pair of results is O(n²), so candidates are found by blocking instead:
+listings only get compared if they share a model number (or, without one, one of their
+rarest title words), and then only against one representative per group in that block.
+Matches are confirmed by model number or title similarity and merged with union-find.
+"""
+import re
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+_STOPWORDS = {
+    "the", "and", "for", "with", "a", "an", "of", "in", "new", "to", "by", "on", "at",
+    "free", "shipping", "sale", "deal", "best", "brand", "genuine", "original", "latest"
+}
+_UNIT_RE = re.compile(r"^\d+(?:gb|tb|mb|mm|cm|in|inch|w|mah|hz|ghz|k|p|g|oz|ml|l|lb|lbs|pack|pcs|pc|x)?$")
+_YEAR_RE = re.compile(r"^(19|20)\d\d$")
+
+# Blocks bigger than this are too generic to be useful ("black", "wireless", ...)
+MAX_BLOCK_SIZE = 40
+RARE_TOKENS_PER_PRODUCT = 2
+MAX_PRICE_RATIO = 2.5  # Listings this far apart in price are different products (or variants)
+
+def title_tokens(title):
+    """Lower-cased word set of a title, without filler words. Hyphenated words are joined."""
+    tokens = set()
+    for token in _TOKEN_RE.findall(str(title or "").lower()):
+        token = token.replace("-", "")
+        if token and token not in _STOPWORDS:
+            tokens.add(token)
+    return tokens
+
+def similarity(a, b):
+    """Jaccard similarity of two token sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def extract_model_numbers(tokens):
+    """
+    Model numbers are words mixing letters and digits, e.g. 'wh1000xm5', 'a2894', 'rtx4070'.
+    Plain sizes and quantities ('256gb', '15in', '2pack') and years are ignored.
+    """
+    models = set()
+    for token in tokens:
+        # Tokens are [a-z0-9] only, so "not all letters and not all digits" means mixed
+        if len(token) < 4 or token.isalpha() or token.isdigit():
+            continue
+        if not _UNIT_RE.match(token) and not _YEAR_RE.match(token):
+            models.add(token)
+    return models
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+def _is_match(a, b, threshold):
+    tokens_a, models_a, price_a = a
+    tokens_b, models_b, price_b = b
+    if price_a > 0 and price_b > 0 and max(price_a, price_b) / min(price_a, price_b) > MAX_PRICE_RATIO:
+        return False
+    if models_a and models_b:
+        # Both name a model: that decides it
+        return bool(models_a & models_b)
+    return similarity(tokens_a, tokens_b) >= threshold
+
+def group_products(products, threshold=0.6):
+    """
+    Group listings that look like the same product.
+    Returns a list of groups sorted by lowest price; each has the cheapest listing's
+    details plus `offers` (id, source, price, title) sorted by price.
+    """
+    features = []
+    doc_freq = {}
+    for p in products:
+        tokens = title_tokens(p.get("title"))
+        features.append((tokens, extract_model_numbers(tokens), p.get("price") or 0))
+        for token in tokens:
+            doc_freq[token] = doc_freq.get(token, 0) + 1
+
+    # 1. Blocking: bucket listings by model number, or by their rarest shared words if they have none
+    blocks = {}
+    for i, (tokens, models, _) in enumerate(features):
+        if models:
+            keys = [("m", m) for m in models]
+        else:
+            shared = [t for t in tokens if doc_freq[t] > 1]
+            shared.sort(key=lambda t: (doc_freq[t], t))
+            keys = [("t", t) for t in shared[:RARE_TOKENS_PER_PRODUCT]]
+        for key in keys:
+            blocks.setdefault(key, []).append(i)
+
+    # 2. Inside each block, compare listings against one representative per group found so far
+    uf = _UnionFind(len(products))
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        representatives = []
+        for i in members:
+            root = uf.find(i)
+            for rep in representatives:
+                if uf.find(rep) == root:
+                    break
+                if _is_match(features[rep], features[i], threshold):
+                    uf.union(rep, i)
+                    break
+            else:
+                representatives.append(i)
+
+    # 3. Build one entry per group
+    grouped = {}
+    for i, p in enumerate(products):
+        grouped.setdefault(uf.find(i), []).append(p)
+
+    groups = []
+    for members in grouped.values():
+        members.sort(key=lambda p: p.get("price") or float("inf"))
+        best = members[0]
+        prices = [p.get("price") or 0 for p in members]
+        groups.append({
+            "id": best.get("id"),
+            "title": best.get("title"),
+            "image": best.get("image"),
+            "category": best.get("category"),
+            "min_price": min(prices),
+            "max_price": max(prices),
+            "offer_count": len(members),
+            "stores": sorted({p.get("source") for p in members if p.get("source")}),
+            "offers": [
+                {"id": p.get("id"), "source": p.get("source"), "price": p.get("price"), "title": p.get("title")}
+                for p in members
+            ]
+        })
+    groups.sort(key=lambda g: g["min_price"])
+    return groups
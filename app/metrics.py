@@ -0,0 +1,225 @@
+"""
+Metrics
+Counters, gauges and latency histograms, served at /metrics in the Prometheus text format.
+
+Recorded on the hot paths:
+- http_request_duration_seconds     every Flask request, by route template and status
+- serpapi_request_duration_seconds  every upstream attempt in get_json, by store and status
+- cache_lookups_total               get_cache_entry / get_from_cache results (fresh, stale, expired, miss)
+- db_query_duration_seconds         execute_query, by statement type and outcome
+- search_fanout_pending             store searches queued or running in /api/search
+Existing stats (memory cache tier, SQLite store, DB pool, background refresh queue) are
+read when /metrics is scraped, through collectors.
+
+Values are per process: with several gunicorn workers each scrape sees one worker, so
+scrape them individually (or sum in Prometheus) rather than expecting global totals.
+No dependency on prometheus_client; this is the small subset we need.
+"""
+import time
+import bisect
+import threading
+from flask import request, g, Response
+from app.config import METRICS_ENABLED, METRICS_TOKEN
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, label_values):
+        if len(label_values) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}")
+        return tuple(str(v) for v in label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {_number(value)}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, *label_values):
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *label_values, amount=1):
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; each label set keeps [bucket counts..., count, sum]."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        key = self._key(label_values)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 3)
+            series[index] += 1  # index == len(buckets) is the +Inf bucket
+            series[-2] += 1
+            series[-1] += value
+
+    def time(self, *label_values):
+        """Context manager observing the duration of its block."""
+        return _Timer(self, label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {round(series[-1], 6)}")
+        return lines
+
+class _Timer:
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+# ---------------------------
+# Registry
+# ---------------------------
+_registry = []
+_collectors = []
+
+def register_collector(collect):
+    """
+    Add a function called on every scrape. It returns (name, kind, help, samples) tuples,
+    where samples is a list of ({label: value}, number).
+    """
+    _collectors.append(collect)
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        try:
+            families = collect()
+        except Exception as e:
+            print(f"⚠️  Metrics collector error: {e}")
+            continue
+        for name, kind, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_label_text(labels.keys(), labels.values())} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+# ---------------------------
+# Hot-path metrics
+# ---------------------------
+HTTP_REQUESTS = Histogram(
+    "http_request_duration_seconds", "Time to produce a response (streams: until headers are sent).",
+    ("method", "route", "status")
+)
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "Requests being handled by this process.")
+SERPAPI_REQUESTS = Histogram(
+    "serpapi_request_duration_seconds", "Upstream SerpAPI attempts (retries counted separately).",
+    ("store", "status"), buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0)
+)
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Product cache lookups by result.", ("state",))
+DB_QUERIES = Histogram(
+    "db_query_duration_seconds", "execute_query time including the pool checkout.", ("operation", "outcome"),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+SEARCH_FANOUT_PENDING = Gauge("search_fanout_pending", "Store searches queued or running for /api/search.")
+
+def query_operation(sql):
+    """Statement type used as the db_query_duration_seconds label (SELECT, INSERT...)."""
+    words = sql.split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+# ---------------------------
+# Flask integration
+# ---------------------------
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    HTTP_IN_PROGRESS.inc()
+    g.metrics_in_progress = True
+
+def _after_request(response):
+    started = g.pop("metrics_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUESTS.observe(time.perf_counter() - started, request.method, route, response.status_code)
+    return response
+
+def _teardown_request(exc):
+    # Teardown also runs when an earlier before_request hook answered and ours never ran
+    if g.pop("metrics_in_progress", False):
+        HTTP_IN_PROGRESS.dec()
+
+def init_metrics(app):
+    """Time every request and serve /metrics (token-protected if METRICS_TOKEN is set)."""
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    @app.route('/metrics')
+    def metrics():
+        if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+            return Response("Unauthorized\n", status=401, mimetype="text/plain")
+        return Response(render(), mimetype="text/plain; version=0.0.4")
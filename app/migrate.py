@@ -0,0 +1,166 @@
+"""
+Schema Migrations
+Numbered SQL files in app/migrations, applied in order and recorded in schema_migrations.
+
+Files are NNNN_description.sql (both databases) or NNNN_description.mysql.sql plus
+NNNN_description.postgres.sql (one variant per dialect, same number). Migrations only go
+forward: to change the schema, add the next number (python scripts/migrate.py new <name>).
+Statements are split on ';', so don't use semicolons inside them.
+
+- Each process reads the schema version once (see app.database.ensure_schema) and only
+  migrates when the database is behind the newest file.
+- An advisory lock lets one process migrate at a time; the others wait for it, then find
+  nothing left to do. PostgreSQL uses a transaction-level lock and applies all pending
+  migrations in one transaction, so it also works through the Supabase transaction pooler.
+- MySQL commits DDL implicitly, so each migration there is recorded as soon as it is done and
+  its statements must be safe to re-run: use IF NOT EXISTS, and indexes that already exist
+  (error 1061) are skipped.
+"""
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+DIALECTS = ("mysql", "postgres")
+
+LOCK_NAME = "best_buy_schema_migrations"  # MySQL GET_LOCK name
+LOCK_KEY = 730195804                      # PostgreSQL advisory lock key
+MYSQL_DUP_KEYNAME = 1061                  # CREATE INDEX on an index that already exists
+
+SCHEMA_MIGRATIONS = """CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)"""
+
+_FILENAME = re.compile(r"^(\d+)_(\w+?)(?:\.(mysql|postgres))?\.sql$")
+_available = {}
+
+def dialect_of(conn):
+    """'postgres' for psycopg2 connections, 'mysql' otherwise."""
+    return "postgres" if hasattr(conn, 'info') else "mysql"
+
+def available_migrations(dialect):
+    """[(version, name, path)] of the migrations for one dialect, oldest first."""
+    if dialect not in _available:
+        found = {}
+        for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+            match = _FILENAME.match(filename)
+            if not match or match.group(3) not in (None, dialect):
+                continue
+            version = int(match.group(1))
+            if version in found:
+                raise ValueError(f"Two migrations numbered {version} for {dialect}: {found[version][2]}, {filename}")
+            found[version] = (version, match.group(2), os.path.join(MIGRATIONS_DIR, filename))
+        _available[dialect] = [found[version] for version in sorted(found)]
+    return _available[dialect]
+
+def latest_version(dialect):
+    migrations = available_migrations(dialect)
+    return migrations[-1][0] if migrations else 0
+
+def split_statements(sql):
+    """The statements in a migration file, without '--' comment lines."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+def current_version(conn):
+    """Highest applied migration, 0 if none (or no schema_migrations table yet). One SELECT."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_migrations")
+        row = cursor.fetchone()
+        return (row[0] if row else None) or 0
+    except Exception:
+        return 0
+    finally:
+        cursor.close()
+        conn.rollback()  # End the read (PostgreSQL also needs this after a missing table)
+
+def applied_migrations(conn):
+    """{version: applied_at} of the migrations recorded in schema_migrations."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT version, applied_at FROM schema_migrations")
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    except Exception:
+        return {}
+    finally:
+        cursor.close()
+        conn.rollback()
+
+def migrate(conn, target=None, lock_timeout=60):
+    """
+    Apply the pending migrations up to `target` (default: all) under the advisory lock.
+    Returns the versions applied. Raises on failure (PostgreSQL then keeps none of this
+    run's migrations, MySQL keeps the ones that finished).
+    """
+    dialect = dialect_of(conn)
+    cursor = conn.cursor()
+    try:
+        _lock(cursor, dialect, lock_timeout)
+        try:
+            cursor.execute(SCHEMA_MIGRATIONS)
+            # Read after taking the lock: another process may have just migrated
+            cursor.execute("SELECT version FROM schema_migrations")
+            done = {row[0] for row in cursor.fetchall()}
+            applied = []
+            for version, name, path in available_migrations(dialect):
+                if version in done or (target is not None and version > target):
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    _apply(cursor, dialect, f.read())
+                cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                if dialect == "mysql":
+                    conn.commit()
+                applied.append(version)
+                print(f"🗄️  Applied migration {version:04d}_{name}")
+            conn.commit()
+            return applied
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            _unlock(cursor, dialect)
+    finally:
+        cursor.close()
+
+def _apply(cursor, dialect, sql):
+    for statement in split_statements(sql):
+        try:
+            cursor.execute(statement)
+        except Exception as e:
+            if dialect == "mysql" and getattr(e, "errno", None) == MYSQL_DUP_KEYNAME:
+                continue
+            raise
+
+def _lock(cursor, dialect, timeout):
+    if dialect == "postgres":
+        # Released by the COMMIT/ROLLBACK that ends the migration transaction
+        cursor.execute(f"SET LOCAL lock_timeout = '{int(timeout)}s'")
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (LOCK_KEY,))
+        cursor.fetchone()
+        return
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, timeout))
+    if cursor.fetchone()[0] != 1:
+        raise TimeoutError(f"Another process held the migration lock for {timeout}s")
+
+def _unlock(cursor, dialect):
+    if dialect == "mysql":
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchone()
+
+def new_migration(name, dialects=DIALECTS):
+    """Create the next numbered migration file(s); returns their paths."""
+    slug = re.sub(r"\W+", "_", name.strip().lower()).strip("_")
+    if not slug:
+        raise ValueError("Migration name is empty")
+    version = max([latest_version(d) for d in DIALECTS] + [0]) + 1
+    suffixes = [""] if not dialects else [f".{d}" for d in dialects]
+    paths = []
+    for suffix in suffixes:
+        path = os.path.join(MIGRATIONS_DIR, f"{version:04d}_{slug}{suffix}.sql")
+        with open(path, "x", encoding="utf-8") as f:
+            f.write(f"-- {name}\n")
+        paths.append(path)
+    _available.clear()
+    return paths
@@ -0,0 +1,68 @@
+-- Tables as created by init_database before migrations existed (IF NOT EXISTS adopts those databases)
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id SERIAL PRIMARY KEY,
+    user_id INT NOT NULL,
+    total_amount DECIMAL(10, 2) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS order_items (
+    id SERIAL PRIMARY KEY,
+    order_id INT NOT NULL,
+    product_id VARCHAR(255) NOT NULL,
+    product_title VARCHAR(500) NOT NULL,
+    price DECIMAL(10, 2) NOT NULL,
+    quantity INT NOT NULL,
+    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS price_history (
+    id SERIAL PRIMARY KEY,
+    product_id VARCHAR(255) NOT NULL,
+    price DECIMAL(10, 2) NOT NULL,
+    recorded_at DATE NOT NULL,
+    source VARCHAR(50)
+);
+
+CREATE TABLE IF NOT EXISTS price_alerts (
+    id SERIAL PRIMARY KEY,
+    user_id INT,
+    product_title VARCHAR(500) NOT NULL,
+    target_price DECIMAL(10, 2) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS cart_items (
+    cart_token VARCHAR(64) NOT NULL,
+    product_id VARCHAR(255) NOT NULL,
+    title VARCHAR(500),
+    price DECIMAL(10, 2) NOT NULL,
+    quantity INT NOT NULL,
+    source VARCHAR(50),
+    added_at DOUBLE PRECISION NOT NULL,
+    expires_at DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (cart_token, product_id)
+);
+
+CREATE TABLE IF NOT EXISTS price_alert_outbox (
+    id SERIAL PRIMARY KEY,
+    alert_id INT NOT NULL,
+    user_id INT,
+    email VARCHAR(255) NOT NULL,
+    product_id VARCHAR(255),
+    product_title VARCHAR(500) NOT NULL,
+    source VARCHAR(50),
+    price DECIMAL(10, 2) NOT NULL,
+    target_price DECIMAL(10, 2) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP NULL
+);
@@ -0,0 +1,8 @@
+-- MySQL has no CREATE INDEX IF NOT EXISTS; the runner skips indexes that already exist (error 1061)
+CREATE INDEX idx_orders_user_created ON orders (user_id, created_at, id);
+CREATE INDEX idx_order_items_order ON order_items (order_id);
+CREATE UNIQUE INDEX uq_price_history_obs ON price_history (product_id, source, recorded_at);
+CREATE INDEX idx_price_history_product ON price_history (product_id, recorded_at);
+CREATE UNIQUE INDEX uq_alert_outbox_alert ON price_alert_outbox (alert_id);
+CREATE INDEX idx_alert_outbox_pending ON price_alert_outbox (sent_at, id);
+CREATE INDEX idx_cart_items_expires ON cart_items (expires_at);
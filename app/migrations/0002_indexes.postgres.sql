@@ -0,0 +1,7 @@
+CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders (user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items (order_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_price_history_obs ON price_history (product_id, source, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_price_history_product ON price_history (product_id, recorded_at);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_alert_outbox_alert ON price_alert_outbox (alert_id);
+CREATE INDEX IF NOT EXISTS idx_alert_outbox_pending ON price_alert_outbox (sent_at, id);
+CREATE INDEX IF NOT EXISTS idx_cart_items_expires ON cart_items (expires_at);
@@ -0,0 +1,2 @@
+-- A user's alerts, newest first
+CREATE INDEX IF NOT EXISTS idx_price_alerts_user ON price_alerts (user_id, created_at);
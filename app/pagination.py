@@ -0,0 +1,119 @@
+"""
+Pagination
+Cursor pagination, price/store filters and sorting for product list endpoints.
+
+Pages are picked with a heap (heapq.nsmallest) instead of sorting the whole list, so page 1
+of a 500-product result only orders and serializes `limit` products. Cursors are keyset
+cursors - the sort key of the last product on the page - so pages stay consistent while the
+underlying list is reordered or grows.
+"""
+import json
+import heapq
+import base64
+import binascii
+from app.config import SOURCES, PAGE_MAX_LIMIT
+
+SORTS = {
+    "price_asc": lambda p: (p.get("price") or 0, str(p.get("id"))),
+    "price_desc": lambda p: (-(p.get("price") or 0), str(p.get("id"))),
+    "title": lambda p: (str(p.get("title") or "").lower(), str(p.get("id"))),
+}
+DEFAULT_SORT = "price_asc"
+
+def parse_page_args(args):
+    """
+    Read limit, cursor, min_price, max_price, source and sort from request args.
+    Returns (page, error). page is None when no limit or cursor is given, so callers
+    keep returning the full list.
+    """
+    if not args.get("limit") and not args.get("cursor"):
+        return None, None
+    try:
+        limit = int(args.get("limit") or 20)
+        min_price = float(args["min_price"]) if args.get("min_price") else None
+        max_price = float(args["max_price"]) if args.get("max_price") else None
+    except ValueError:
+        return None, "limit, min_price and max_price must be numbers"
+    if limit < 1:
+        return None, "limit must be at least 1"
+
+    sort = args.get("sort") or DEFAULT_SORT
+    if sort not in SORTS:
+        return None, f"sort must be one of: {', '.join(SORTS)}"
+
+    cursor = None
+    if args.get("cursor"):
+        cursor = decode_cursor(args["cursor"], sort)
+        if not _valid_product_key(cursor, sort):
+            return None, "Invalid cursor (it must come from a request with the same sort)"
+
+    sources = {s.strip().lower() for s in (args.get("source") or "").split(",") if s.strip()}
+    # Accept store ids ('bestbuy') as well as the display names products carry ('Best Buy')
+    sources |= {SOURCES[s].lower() for s in sources if s in SOURCES}
+
+    return {
+        "limit": min(limit, PAGE_MAX_LIMIT),
+        "cursor": cursor,
+        "min_price": min_price,
+        "max_price": max_price,
+        "sources": sources,
+        "sort": sort
+    }, None
+
+def encode_cursor(sort, key):
+    """Opaque cursor holding the sort key of the last item on a page."""
+    raw = json.dumps({"s": sort, "k": list(key)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor, sort):
+    """The sort key stored in a cursor, or None if it is malformed or made for another sort."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = tuple(data["k"])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return None
+    return key if data.get("s") == sort else None
+
+def _valid_product_key(key, sort):
+    # (price or title, id) - anything else would fail to compare against SORTS keys
+    if key is None or len(key) != 2 or not isinstance(key[1], str):
+        return False
+    return isinstance(key[0], str) == (sort == "title")
+
+def _matches(product, page):
+    price = product.get("price") or 0
+    if page["min_price"] is not None and price < page["min_price"]:
+        return False
+    if page["max_price"] is not None and price > page["max_price"]:
+        return False
+    if page["sources"] and str(product.get("source") or "").lower() not in page["sources"]:
+        return False
+    return True
+
+def paginate(products, page):
+    """
+    Apply filters and return one page:
+    {products, count, total (matching the filters), limit, sort, next_cursor (None on the last page)}.
+    """
+    key = SORTS[page["sort"]]
+    matching = [p for p in products if _matches(p, page)]
+
+    remaining = matching
+    if page["cursor"] is not None:
+        after = page["cursor"]
+        remaining = [p for p in matching if key(p) > after]
+
+    # One extra item tells us whether there is a next page
+    selected = heapq.nsmallest(page["limit"] + 1, remaining, key=key)
+    items = selected[:page["limit"]]
+    has_more = len(selected) > page["limit"]
+
+    return {
+        "products": items,
+        "count": len(items),
+        "total": len(matching),
+        "limit": page["limit"],
+        "sort": page["sort"],
+        "next_cursor": encode_cursor(page["sort"], key(items[-1])) if has_more else None
+    }
@@ -0,0 +1,179 @@
+"""
+Feed Prewarmer
+Keeps the 16 curated store feeds (/api/products/<source>) cached so store tabs never wait on SerpAPI.
+
+A feed is refreshed once its cached copy is PREWARM_REFRESH_AT of the way through its lifetime,
+minus a random jitter so the feeds don't all come due together, with at most PREWARM_CONCURRENCY
+refreshes at a time. Last refresh time, duration and outcome per feed go to cache/prewarm_state.json.
+
+Only one process schedules refreshes: whoever holds the cache/locks/prewarm.lock file lock.
+The others keep retrying for it, so one takes over if the leader exits. Run it either
+- as a separate process: python scripts/prewarm.py [run|once|status]
+- or in every web worker with PREWARM_ENABLED=true (one of them leads)
+"""
+import os
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config import (
+    PREWARM_REFRESH_AT, PREWARM_JITTER, PREWARM_CONCURRENCY, PREWARM_CHECK_INTERVAL, PREWARM_START_JITTER
+)
+from app.api_clients import CURATED_FEEDS, refresh_now
+from app.cache import cache_store, CACHE_DURATION, CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: no leader election, every process schedules
+    fcntl = None
+
+LOCK_PATH = os.path.join(CACHE_DIR, "locks", "prewarm.lock")
+STATE_PATH = os.path.join(CACHE_DIR, "prewarm_state.json")
+
+_state_lock = threading.Lock()
+_thread_pid = None
+
+# ---------------------------
+# Feed State
+# ---------------------------
+def feed_key(feed):
+    return f"{feed}_{CURATED_FEEDS[feed]}"
+
+def load_state():
+    """Last refresh per feed: {feed: {last_refresh, duration_ms, ok, products, error}}."""
+    try:
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_feed_state(feed, entry):
+    with _state_lock:
+        state = load_state()
+        state[feed] = entry
+        tmp_path = f"{STATE_PATH}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, STATE_PATH)  # Readers never see a half-written file
+        except OSError as e:
+            print(f"⚠️  Could not save prewarm state: {e}")
+
+def get_status():
+    """Cache age and last refresh for every feed."""
+    state = load_state()
+    stored = cache_store.stored_at([feed_key(feed) for feed in CURATED_FEEDS])
+    now = time.time()
+    status = {}
+    for feed in CURATED_FEEDS:
+        stored_at = stored.get(feed_key(feed))
+        status[feed] = dict(
+            state.get(feed, {}),
+            query=CURATED_FEEDS[feed],
+            cache_age=round(now - stored_at) if stored_at else None
+        )
+    return status
+
+def due_feeds(force=False):
+    """Feeds with no cached copy, or one past its (jittered) refresh point."""
+    if force:
+        return list(CURATED_FEEDS)
+    stored = cache_store.stored_at([feed_key(feed) for feed in CURATED_FEEDS])
+    now = time.time()
+    due = []
+    for feed in CURATED_FEEDS:
+        stored_at = stored.get(feed_key(feed))
+        refresh_after = CACHE_DURATION * PREWARM_REFRESH_AT - random.uniform(0, PREWARM_JITTER)
+        if stored_at is None or now - stored_at >= refresh_after:
+            due.append(feed)
+    return due
+
+# ---------------------------
+# Refreshing
+# ---------------------------
+def refresh_feed(feed, delay=0):
+    """Refresh one feed from SerpAPI and record how it went."""
+    if delay:
+        time.sleep(delay)
+    started = time.time()
+    error = None
+    try:
+        products = refresh_now(CURATED_FEEDS[feed], feed)
+    except Exception as e:
+        products, error = None, str(e)
+    duration_ms = round((time.time() - started) * 1000)
+
+    entry = {
+        "last_refresh": started,
+        "duration_ms": duration_ms,
+        "ok": products is not None,
+        "products": len(products or []),
+        "error": error or (None if products is not None else "upstream request failed")
+    }
+    _save_feed_state(feed, entry)
+    if products is None:
+        print(f"❌ Prewarm failed for '{feed}' after {duration_ms} ms")
+    return entry
+
+def run_once(force=False):
+    """Refresh every due feed, PREWARM_CONCURRENCY at a time. Returns {feed: state entry}."""
+    feeds = due_feeds(force)
+    if not feeds:
+        return {}
+    with ThreadPoolExecutor(max_workers=PREWARM_CONCURRENCY, thread_name_prefix="prewarm") as pool:
+        futures = {
+            feed: pool.submit(refresh_feed, feed, random.uniform(0, PREWARM_START_JITTER))
+            for feed in feeds
+        }
+        results = {feed: future.result() for feed, future in futures.items()}
+    ok = sum(1 for r in results.values() if r["ok"])
+    print(f"🔥 Prewarmed {ok}/{len(results)} feeds")
+    return results
+
+# ---------------------------
+# Scheduling
+# ---------------------------
+def _try_lead():
+    """Take the leader lock without waiting. Returns the open lock file, or None."""
+    if fcntl is None:
+        return open(os.devnull, "w")
+    try:
+        os.makedirs(os.path.dirname(LOCK_PATH), exist_ok=True)
+        handle = open(LOCK_PATH, "w")
+    except OSError:
+        return None
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return handle
+    except OSError:
+        handle.close()
+        return None
+
+def run_forever(stop=None):
+    """Schedule refreshes while leader; otherwise wait for the leader lock. Runs until `stop` is set."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        handle = _try_lead()
+        if handle is None:
+            stop.wait(PREWARM_CHECK_INTERVAL)
+            continue
+        try:
+            print(f"🔥 Prewarm scheduler leading in process {os.getpid()}")
+            while not stop.is_set():
+                try:
+                    run_once()
+                except Exception as e:
+                    print(f"❌ Prewarm error: {e}")
+                stop.wait(PREWARM_CHECK_INTERVAL * random.uniform(0.8, 1.2))
+        finally:
+            handle.close()  # Closing the file releases the lock
+
+def start_prewarm_thread():
+    """Run the scheduler on a daemon thread in this process (once per process)."""
+    global _thread_pid
+    if _thread_pid == os.getpid():
+        return
+    _thread_pid = os.getpid()
+    threading.Thread(target=run_forever, name="prewarm", daemon=True).start()
@@ -0,0 +1,102 @@
+"""
+Price History
+Records the price of every product we normalize as an observation in `price_history`.
+
+Search requests only add to an in-memory buffer (no DB work on the request path).
+A background thread flushes it with multi-row upserts, keeping one row per
+(product, source, day) - the latest price seen that day wins.
+"""
+import os
+import time
+import atexit
+import datetime
+import threading
+from app.config import PRICE_HISTORY_FLUSH_INTERVAL, PRICE_HISTORY_BATCH_SIZE, PRICE_HISTORY_MAX_BUFFER
+from app.database import save_price_observations
+
+MAX_BACKOFF = 600  # Seconds between flush attempts while the database is down
+
+_buffer = {}  # (product_id, source, day) -> price
+_lock = threading.Lock()
+_flusher_pid = None
+_stats = {"recorded": 0, "dropped": 0, "written": 0, "flushes": 0, "failed_flushes": 0}
+
+def record_prices(products):
+    """Queue price observations for a batch of normalized products. Never touches the database."""
+    today = datetime.date.today()
+    with _lock:
+        for p in products:
+            product_id = str(p.get("id") or "")
+            price = p.get("price") or 0
+            # serp_<position> ids are only positions in one result page, not a product identity
+            if not product_id or product_id.startswith("serp_") or price <= 0:
+                continue
+            key = (product_id[:255], str(p.get("source") or "")[:50], today)
+            if key not in _buffer and len(_buffer) >= PRICE_HISTORY_MAX_BUFFER:
+                _stats["dropped"] += 1
+                continue
+            _buffer[key] = price
+            _stats["recorded"] += 1
+    _start_flusher()
+
+def flush():
+    """Write everything buffered so far. Returns the number of rows written."""
+    with _lock:
+        if not _buffer:
+            return 0
+        pending = list(_buffer.items())
+        _buffer.clear()
+
+    rows = [(product_id, source, day, price) for (product_id, source, day), price in pending]
+    written = 0
+    for start in range(0, len(rows), PRICE_HISTORY_BATCH_SIZE):
+        batch = rows[start:start + PRICE_HISTORY_BATCH_SIZE]
+        if not save_price_observations(batch):
+            _requeue(pending[start:])
+            with _lock:
+                _stats["failed_flushes"] += 1
+            return written
+        written += len(batch)
+
+    with _lock:
+        _stats["written"] += written
+        _stats["flushes"] += 1
+    return written
+
+def _requeue(pending):
+    """Put unwritten rows back; anything recorded since the flush started is newer and wins."""
+    with _lock:
+        for key, price in pending:
+            if key not in _buffer and len(_buffer) < PRICE_HISTORY_MAX_BUFFER:
+                _buffer[key] = price
+
+def get_stats():
+    with _lock:
+        return dict(_stats, buffered=len(_buffer))
+
+def _start_flusher():
+    """Start the background flush thread once per process."""
+    global _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _lock:
+        if _flusher_pid == pid:
+            return
+        _flusher_pid = pid
+    threading.Thread(target=_flush_loop, name="price-history-flush", daemon=True).start()
+    atexit.register(flush)
+
+def _flush_loop():
+    interval = PRICE_HISTORY_FLUSH_INTERVAL
+    while True:
+        time.sleep(interval)
+        try:
+            failed_before = _stats["failed_flushes"]
+            flush()
+            failed = _stats["failed_flushes"] > failed_before
+        except Exception as e:
+            print(f"❌ Price history flush error: {e}")
+            failed = True
+        # Back off while the database is unreachable instead of retrying every interval
+        interval = min(interval * 2, MAX_BACKOFF) if failed else PRICE_HISTORY_FLUSH_INTERVAL
@@ -0,0 +1,223 @@
+"""
+Request Profiling
+Opt-in tracing and profiling to see where a slow request spent its time.
+
+- Spans: span("name") blocks time the stages of /api/search and /api/cart/optimize (local
+  catalog, each store, SerpAPI HTTP, normalization, grouping, solving, serialization).
+  They are recorded for every request once profiling is configured, and cost a few
+  microseconds each.
+- On demand: a request with "X-Profile: <PROFILE_TOKEN>" is profiled with cProfile, or with
+  the stack sampler if it also sends "X-Profile-Mode: sample". Its spans come back in a
+  Server-Timing header and its dump is always saved.
+- Automatically: PROFILE_SAMPLE_RATE of requests are profiled with the sampler; like on-demand
+  profiles they get the Server-Timing header and their dump is always saved.
+- Slow requests: any other request over PROFILE_SLOW_MS is saved to PROFILE_DIR with its spans.
+
+cProfile only sees the request's own thread. The sampler also covers the threads that
+worked for the request (e.g. the /api/search store workers), so prefer it for searches.
+Dumps are <id>.json (request, spans, top functions), <id>.prof (load it with pstats or
+snakeviz) and <id>.folded (stacks for flamegraph.pl or speedscope).
+"""
+import io
+import os
+import sys
+import time
+import json
+import hmac
+import uuid
+import random
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import request, g
+from app.config import (
+    PROFILE_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS, PROFILE_DIR, PROFILE_MAX_DUMPS, PROFILE_SAMPLE_INTERVAL_MS
+)
+
+_current_trace = ContextVar("current_trace", default=None)
+_dump_lock = threading.Lock()
+
+class Trace:
+    """Span timings for one request, from any thread working on it."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.spans = []  # (name, start_ms, duration_ms, thread name)
+        self.threads = {threading.get_ident()}
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def add(self, name, started, ended):
+        self.spans.append((
+            name,
+            round((started - self.started) * 1000, 2),
+            round((ended - started) * 1000, 2),
+            threading.current_thread().name
+        ))
+
+@contextmanager
+def span(name):
+    """Time a block as part of the current request's trace (does nothing outside one)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    trace.threads.add(threading.get_ident())
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, started, time.perf_counter())
+
+class StackSampler:
+    """Samples the stacks of a trace's threads every `interval` seconds on a background thread."""
+
+    def __init__(self, trace, interval):
+        self.trace = trace
+        self.interval = interval
+        self.stacks = Counter()  # "thread;file:function;..." -> samples
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        names = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.trace.threads):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                if ident not in names:
+                    thread = next((t for t in threading.enumerate() if t.ident == ident), None)
+                    names[ident] = thread.name if thread else str(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join([names[ident]] + stack[::-1])] += 1
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit=30):
+        """Functions by how often they were on top of a sampled stack."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [{"function": f, "samples": n, "percent": round(100 * n / total, 1)} for f, n in leaves.most_common(limit)]
+
+# ---------------------------
+# Flask integration
+# ---------------------------
+def _requested_mode():
+    """'cprofile' or 'sample' if this request asked for or was picked for profiling, else None."""
+    token = request.headers.get("X-Profile")
+    if PROFILE_TOKEN and token and hmac.compare_digest(token, PROFILE_TOKEN):
+        mode = request.headers.get("X-Profile-Mode", "cprofile").lower()
+        return mode if mode in ("cprofile", "sample") else "cprofile"
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+def _before_request():
+    trace = Trace()
+    g.profile_trace = trace
+    g.profile_context = _current_trace.set(trace)
+    g.profile_mode = _requested_mode()
+    if g.profile_mode == "cprofile":
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+    elif g.profile_mode == "sample":
+        g.profiler = StackSampler(trace, PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        g.profiler.start()
+
+def _after_request(response):
+    trace = g.get("profile_trace")
+    if trace is None:
+        return response
+    profiler = g.pop("profiler", None)
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+    elif profiler is not None:
+        profiler.stop()
+    duration_ms = trace.elapsed_ms()
+
+    # Profiled requests (forced or sampled) are always reported; others only when slow
+    profiled = g.profile_mode is not None
+    if profiled:
+        timings = [f"total;dur={duration_ms:.1f}"]
+        timings += [f"{name};dur={duration};desc=\"{thread}\"" for name, _, duration, thread in trace.spans]
+        response.headers["Server-Timing"] = ", ".join(timings)
+        response.headers["X-Profile-Id"] = trace.id
+    if profiled or (PROFILE_SLOW_MS and duration_ms >= PROFILE_SLOW_MS):
+        try:
+            save_dump(trace, duration_ms, response.status_code, g.profile_mode, profiler)
+        except Exception as e:
+            print(f"⚠️  Could not save profile {trace.id}: {e}")
+    return response
+
+def _teardown_request(exc):
+    context = g.pop("profile_context", None)
+    if context is not None:
+        _current_trace.reset(context)
+
+def save_dump(trace, duration_ms, status, mode, profiler):
+    """Write a request's spans (and profile, if any) to PROFILE_DIR."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{trace.id}")
+    report = {
+        "id": trace.id,
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "status": status,
+        "duration_ms": round(duration_ms, 2),
+        "mode": mode,
+        "spans": [{"name": n, "start_ms": s, "duration_ms": d, "thread": t} for n, s, d, t in trace.spans]
+    }
+    if isinstance(profiler, cProfile.Profile):
+        profiler.dump_stats(base + ".prof")
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(30)
+        report["top"] = text.getvalue().splitlines()
+    elif isinstance(profiler, StackSampler):
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            f.write(profiler.folded())
+        report["top"] = profiler.top()
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"🔬 {request.method} {report['path']} took {duration_ms:.0f} ms, profile saved: {base}.json")
+    _prune_dumps()
+
+def _prune_dumps():
+    """Keep only the newest PROFILE_MAX_DUMPS requests' files."""
+    with _dump_lock:
+        reports = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+        for name in reports[:max(len(reports) - PROFILE_MAX_DUMPS, 0)]:
+            stem = name[:-5]
+            for ext in (".json", ".prof", ".folded"):
+                try:
+                    os.remove(os.path.join(PROFILE_DIR, stem + ext))
+                except OSError:
+                    pass
+
+def init_profiling(app):
+    """Install the hooks if any profiling is configured (otherwise span() stays a no-op)."""
+    if not (PROFILE_TOKEN or PROFILE_SAMPLE_RATE or PROFILE_SLOW_MS):
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
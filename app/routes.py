@@ -1,6 +1,6 @@
-from flask import jsonify, request, session, render_template
+from flask import jsonify, request, session, render_template, Response, stream_with_context
 from werkzeug.security import generate_password_hash, check_password_hash
-import concurrent.futures
+import time
 import random
 import datetime
 
@@ -11,14 +11,128 @@ from app.api_clients import (
     fetch_macys_products, fetch_nordstrom_products,
     fetch_sephora_products, fetch_barnes_products, fetch_dicks_products,
     fetch_homedepot_products, fetch_chewy_products, fetch_guitarcenter_products, fetch_staples_products,
-    search_serpapi_products
+    search_serpapi_products, search_flight
+)
+
+from app.cache import get_cache_stats, MemoryCache
+from app.pagination import parse_page_args, paginate, encode_cursor, decode_cursor
+from app.cart_optimizer import optimize_cart as optimize_cart_items
+from app.cart_store import cart_store, new_cart_token
+from app.matching import group_products
+from app.alerts import register_alert
+from app.prewarm import get_status as get_prewarm_status
+from app.catalog_index import search_catalog, get_stats as get_catalog_stats
+from app.credit_budget import credit_budget
+from app.search_fanout import SEARCH_STORES, fan_out_search, has_fresh_results, get_fanout_stats
+from app.http_cache import versioned_json
+from app.json_codec import dumps, json_response
+from app.profiling import span
+from app.config import (
+    CART_MAX_SELLERS, CART_OPTIMIZE_BUDGET_MS, CART_EXACT_MAX_ITEMS, CATALOG_INDEX_ENABLED, SEARCH_RESULTS_TTL,
+    PAGE_MAX_LIMIT
 )
 
 # Import Database functions
 from app.database import (
-    create_user, get_user_by_username, create_order, get_user_orders, add_price_alert
+    create_user, get_user_by_username, create_order, get_user_orders, get_user_orders_page, add_price_alert,
+    get_pool_stats, get_price_history
 )
 
+# Merged /api/search results by query, so later pages don't search again
+merged_results = MemoryCache(max_entries=256, max_bytes=16 * 1024 * 1024)
+
+def build_search_summary(query, results, cache_states):
+    """Dedupe, sort and group the combined store results into the /api/search response body."""
+    # Remove duplicates based on ID or strict title matching
+    seen = set()
+    unique_results = []
+    for p in results:
+        # Create a unique key (id is usually good, but let's be safe)
+        key = p.get('id')
+        if key not in seen:
+            seen.add(key)
+            unique_results.append(p)
+
+    # Sort by price (lowest first) to show best deals at top
+    sorted_results = sorted(unique_results, key=lambda x: x.get('price', float('inf')))
+
+    # Same product from different stores -> one group with a price list
+    groups = group_products(sorted_results)
+
+    # Stores that missed the deadline or were skipped by their circuit breaker (cached data only)
+    timed_out = [store for store, state in cache_states.items() if state == "timeout"]
+    skipped = [store for store, state in cache_states.items() if state == "circuit_open"]
+
+    return {
+        "query": query, "total": len(sorted_results), "products": sorted_results,
+        "groups": groups, "total_groups": len(groups),
+        "cache_state": cache_states,
+        "partial": bool(timed_out or skipped), "timed_out": timed_out, "skipped": skipped
+    }
+
+def run_search(query, use_local=True):
+    """
+    The full /api/search response body: from the local catalog if it finds enough and no store has
+    fresh results for this exact query, else from every store.
+    Returns (summary, version, stored): `version` changes whenever the results can, and `stored` are
+    the (cache_state, stored_at) pairs they came from (see app.http_cache).
+    """
+    # Answer from products we already have when the local catalog finds enough, unless the
+    # exact query is cached: those results are complete, the catalog's are only a subset
+    if use_local and not has_fresh_results(query):
+        with span("local_catalog"):
+            local_results, enough = search_catalog(query)
+        if enough:
+            version = [(p.get("source"), p.get("id"), p.get("price")) for p in local_results]
+            with span("merge_group"):
+                summary = build_search_summary(query, local_results, {"local": "fresh"})
+            return summary, version, [("fresh", None)]
+
+    results = []
+    cache_states = {}
+    versions = {}
+    for store, store_results, state, stored_at in fan_out_search(query):
+        cache_states[store] = state
+        versions[store] = (state, stored_at)
+        results.extend(store_results)
+    # The body reports each store's cache_state, so it is part of the version too
+    version = sorted((store, state, stored_at) for store, (state, stored_at) in versions.items())
+    with span("merge_group"):
+        summary = build_search_summary(query, results, cache_states)
+    return summary, version, list(versions.values())
+
+def _merged_key(query, use_local):
+    # Live (?live=1) and local-catalog searches give different results for the same query
+    return (query.lower(), use_local)
+
+def get_merged_results(query, use_local=True):
+    """A recent run_search(query, use_local) result, or None."""
+    entry = merged_results.get(_merged_key(query, use_local))
+    if entry is None or time.time() - entry[1] > SEARCH_RESULTS_TTL:
+        return None
+    return entry[0]
+
+def remember_merged_results(query, use_local, result):
+    merged_results.set(_merged_key(query, use_local), result, len(dumps(result[0]["products"])))
+
+def current_cart_token(create=False):
+    """
+    The opaque cart token kept in the session cookie (the cart itself is in cart_store).
+    A cart still stored in the cookie by an older version is moved to the store.
+    """
+    token = session.get("cart_token")
+    legacy_cart = session.pop("cart", None)
+    if not token and (create or legacy_cart):
+        token = new_cart_token()
+        session["cart_token"] = token
+    for item in legacy_cart or []:
+        cart_store.add(token, str(item["id"]), item, int(item.get("quantity", 1)))
+    return token
+
+def get_current_cart():
+    token = current_cart_token()
+    return (cart_store.get(token) or []) if token else []
+
 def register_routes(app):
     """
     Register all the website routes (URLs) for the app.
@@ -135,16 +249,27 @@ def register_routes(app):
         try:
             # For the main 'featured' list, we combine multiple sources
             # search_serpapi_products handles caching internally
-            products = fetch_featured_products()
+            products, meta = fetch_featured_products(with_meta=True)
             
             # If no featured products, try a generic search
             if not products:
-                products = search_serpapi_products("trending electronics", "serpapi")
+                products, meta = search_serpapi_products("trending electronics", "serpapi", with_meta=True)
             
             # Log the request and response for debugging
-            print(f"📦 API Request: /api/products | Found: {len(products)} products")
-                
-            return jsonify({"source": "featured", "total": len(products), "products": products})
+            print(f"📦 API Request: /api/products | Found: {len(products)} products | Cache: {meta['state']}")
+
+            page, error = parse_page_args(request.args)
+            if error:
+                return jsonify({"error": error}), 400
+
+            def build():
+                if page:
+                    return {"source": "featured", **paginate(products, page), "cache_state": meta["state"]}
+                return json_response({
+                    "source": "featured", "total": len(products), "products": products,
+                    "cache_state": meta["state"]
+                })
+            return versioned_json(build, (meta["state"], meta["stored_at"]), [(meta["state"], meta["stored_at"])])
         except Exception as e:
             print(f"❌ Get products error: {e}")
             return jsonify({"error": "Failed to fetch products", "details": str(e)}), 500
@@ -176,59 +301,123 @@ def register_routes(app):
             
             if src not in source_map:
                 return jsonify({"error": "Unknown source"}), 400
+
+            page, error = parse_page_args(request.args)
+            if error:
+                return jsonify({"error": error}), 400
                 
-            products = source_map[src]()
-            return jsonify({"source": src, "total": len(products), "products": products})
+            products, meta = source_map[src](with_meta=True)
+
+            def build():
+                if page:
+                    return {"source": src, **paginate(products, page), "cache_state": meta["state"]}
+                return json_response({
+                    "source": src, "total": len(products), "products": products,
+                    "cache_state": meta["state"]
+                })
+            return versioned_json(build, (meta["state"], meta["stored_at"]), [(meta["state"], meta["stored_at"])])
         except Exception as e:
             print(f"❌ Get products by source error: {e}")
             return jsonify({"error": "Failed to fetch products", "details": str(e)}), 500
 
     @app.route('/api/search')
     def search_products():
+        """
+        Search every store and merge the results.
+        With ?limit (and then ?cursor) the merged list is paged, filtered (min_price, max_price,
+        source) and sorted (sort) server-side; it is kept for SEARCH_RESULTS_TTL seconds so
+        later pages don't search again. Groups are only returned without paging.
+        """
         try:
             query = request.args.get('q', '').strip()
             if not query:
                 return jsonify({"error": "Missing search query"}), 400
-                
-            # Define stores to check explicitly for comparison
-            stores = ["serpapi", "amazon", "bestbuy", "walmart", "ebay", "target"]
-            results = []
 
-            # Helper function for parallel execution
-            def fetch_store_results(store):
-                try:
-                    # search_serpapi_products handles caching and 'site:' filtering
-                    return search_serpapi_products(query, store)
-                except Exception as e:
-                    print(f"Error searching {store}: {e}")
-                    return []
-
-            # Run searches in parallel to be fast
-            with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-                futures = [executor.submit(fetch_store_results, store) for store in stores]
-                for future in concurrent.futures.as_completed(futures):
-                    store_results = future.result()
-                    if store_results:
-                        results.extend(store_results)
-            
-            # Remove duplicates based on ID or strict title matching
-            seen = set()
-            unique_results = []
-            for p in results:
-                # Create a unique key (id is usually good, but let's be safe)
-                key = p.get('id')
-                if key not in seen:
-                    seen.add(key)
-                    unique_results.append(p)
-
-            # Sort by price (lowest first) to show best deals at top
-            sorted_results = sorted(unique_results, key=lambda x: x.get('price', float('inf')))
-            
-            return jsonify({"query": query, "total": len(sorted_results), "products": sorted_results})
+            page, error = parse_page_args(request.args)
+            if error:
+                return jsonify({"error": error}), 400
+
+            use_local = CATALOG_INDEX_ENABLED and request.args.get('live') != '1'
+            result = get_merged_results(query, use_local) if page else None
+            if result is None:
+                result = run_search(query, use_local)
+                # Partial results would pin the missing stores' gap on every later page
+                if page and not result[0]["partial"]:
+                    remember_merged_results(query, use_local, result)
+            summary, version, stored = result
+
+            def build():
+                if page:
+                    return {
+                        "query": query, **paginate(summary["products"], page),
+                        "total_groups": summary["total_groups"], "cache_state": summary["cache_state"],
+                        "partial": summary["partial"], "timed_out": summary["timed_out"], "skipped": summary["skipped"]
+                    }
+                return summary
+            return versioned_json(build, version, stored, max_age=SEARCH_RESULTS_TTL)
         except Exception as e:
             print(f"\u274c Search error: {e}")
             return jsonify({"error": "Search failed", "details": str(e)}), 500
 
+    @app.route('/api/search/stream')
+    def search_products_stream():
+        """
+        Same search, streamed: local catalog hits first (store "local"), then one frame per store
+        as soon as it answers, then a summary frame. Stores are skipped if the local catalog found
+        enough (?live=1 always asks them).
+        NDJSON by default; Server-Sent Events if the client accepts text/event-stream or ?format=sse.
+        """
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "Missing search query"}), 400
+
+        use_sse = request.args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+
+        def frame(payload):
+            line = dumps(payload)
+            return f"data: {line}\n\n" if use_sse else line + "\n"
+
+        use_local = CATALOG_INDEX_ENABLED and request.args.get('live') != '1'
+
+        def generate():
+            yield frame({"type": "start", "query": query, "stores": SEARCH_STORES})
+            results = []
+            cache_states = {}
+            try:
+                # Pre-fill from the local catalog (unless the exact query is cached); stop there if it found enough
+                if use_local and not has_fresh_results(query):
+                    local_results, enough = search_catalog(query)
+                    if local_results:
+                        results.extend(local_results)
+                        cache_states["local"] = "fresh"
+                        yield frame({
+                            "type": "batch", "store": "local", "cache_state": "fresh",
+                            "total": len(local_results), "products": local_results
+                        })
+                    if enough:
+                        yield frame({"type": "summary", **build_search_summary(query, results, cache_states)})
+                        return
+
+                for store, store_results, state, _ in fan_out_search(query):
+                    cache_states[store] = state
+                    results.extend(store_results)
+                    yield frame({
+                        "type": "batch", "store": store, "cache_state": state,
+                        "total": len(store_results), "products": store_results
+                    })
+                yield frame({"type": "summary", **build_search_summary(query, results, cache_states)})
+            except Exception as e:
+                print(f"\u274c Search stream error: {e}")
+                yield frame({"type": "error", "error": "Search failed", "details": str(e)})
+
+        response = Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream' if use_sse else 'application/x-ndjson'
+        )
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # Stop proxies from buffering the stream
+        return response
+
     @app.route('/api/debug/serpapi')
     def debug_serpapi():
         try:
@@ -255,6 +444,30 @@ def register_routes(app):
                 "status": "error"
             }), 500
 
+    @app.route('/api/debug/cache')
+    def debug_cache():
+        """Cache, request coalescing, local catalog and store circuit counters for this worker process, plus feed prewarm status and SerpAPI credits."""
+        try:
+            stats = get_cache_stats()
+            stats["coalescing"] = search_flight.stats()
+            stats["prewarm"] = get_prewarm_status()
+            stats["catalog"] = get_catalog_stats()
+            stats["credits"] = credit_budget.stats()
+            stats["store_circuits"] = get_fanout_stats()
+            return jsonify(stats)
+        except Exception as e:
+            print(f"❌ Debug cache error: {e}")
+            return jsonify({"error": "Failed to read cache stats", "details": str(e)}), 500
+
+    @app.route('/api/debug/db')
+    def debug_db():
+        """Connection pool size and wait-time metrics for this worker process."""
+        try:
+            return jsonify(get_pool_stats())
+        except Exception as e:
+            print(f"❌ Debug db error: {e}")
+            return jsonify({"error": "Failed to read pool stats", "details": str(e)}), 500
+
     # ---------------------------
     # Cart API
     # ---------------------------
@@ -268,25 +481,10 @@ def register_routes(app):
             if not product_id or not price:
                 return jsonify({"error": "Invalid product data"}), 400
             
-            cart = session.get("cart", [])
-            
-            # Check if item already in cart
-            found = False
-            for item in cart:
-                if item["id"] == product_id:
-                    item["quantity"] += data.get("quantity", 1)
-                    found = True
-                    break
-            
-            if not found:
-                cart.append({
-                    "id": product_id, 
-                    "title": data.get("title"), 
-                    "price": float(price), 
-                    "quantity": int(data.get("quantity", 1))
-                })
-            
-            session["cart"] = cart
+            token = current_cart_token(create=True)
+            cart = cart_store.add(token, product_id, data, int(data.get("quantity", 1)))
+            if cart is None:
+                return jsonify({"error": "Cart storage is unavailable"}), 503
             return jsonify({"message": "Added to cart", "cart": cart})
         except Exception as e:
             print(f"❌ Add to cart error: {e}")
@@ -295,7 +493,7 @@ def register_routes(app):
     @app.route('/api/cart')
     def get_cart():
         try:
-            cart = session.get("cart", [])
+            cart = get_current_cart()
             total = sum(item["price"] * item["quantity"] for item in cart)
             return jsonify({"cart": cart, "total_amount": round(total, 2)})
         except Exception as e:
@@ -311,11 +509,12 @@ def register_routes(app):
             if not product_id:
                 return jsonify({"error": "Missing product ID"}), 400
                 
-            # Keep items that don't match the ID
-            cart = session.get("cart", [])
-            session["cart"] = [item for item in cart if item["id"] != product_id]
+            token = current_cart_token()
+            cart = cart_store.remove(token, product_id) if token else []
+            if cart is None:
+                return jsonify({"error": "Cart storage is unavailable"}), 503
             
-            return jsonify({"message": "Removed from cart", "cart": session["cart"]})
+            return jsonify({"message": "Removed from cart", "cart": cart})
         except Exception as e:
             print(f"❌ Remove from cart error: {e}")
             return jsonify({"error": "Failed to remove from cart", "details": str(e)}), 500
@@ -323,7 +522,9 @@ def register_routes(app):
     @app.route('/api/cart/clear', methods=['POST'])
     def clear_cart():
         try:
-            session["cart"] = []
+            token = current_cart_token()
+            if token:
+                cart_store.clear(token)
             return jsonify({"message": "Cart cleared"})
         except Exception as e:
             print(f"❌ Clear cart error: {e}")
@@ -331,54 +532,30 @@ def register_routes(app):
 
     @app.route('/api/cart/optimize')
     def optimize_cart():
-        """Simulates finding a cheaper total price AND suggests related products."""
+        """Finds the cheapest combination of sellers for the cart using cached store results."""
         try:
-            cart = session.get("cart", [])
+            cart = get_current_cart()
             if not cart:
                 return jsonify({"error": "Cart is empty"}), 400
-            
-            # Simulate a 5-15% discount
-            original_total = sum(item["price"] * item["quantity"] for item in cart)
-            discount_factor = 0.85 + (random.random() * 0.1) # 0.85 to 0.95
-            new_total = round(original_total * discount_factor, 2)
 
-            # --- Generate Suggestions ---
-            suggestions = []
             try:
-                # Select up to 3 items from the cart to base suggestions on
-                target_items = cart[:3]
-                
-                def get_suggestions_for_item(item):
-                    try:
-                        title = item.get("title", "")
-                        # Use the first 3 words to get a broad category match
-                        search_term = " ".join(title.split()[:3])
-                        results = search_serpapi_products(search_term, "serpapi")
-                        # Return top 2 distinct items
-                        return [p for p in results if p.get("id") != item.get("id")][:2]
-                    except:
-                        return []
-
-                # Run searches in parallel
-                with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-                    futures = [executor.submit(get_suggestions_for_item, item) for item in target_items]
-                    for future in concurrent.futures.as_completed(futures):
-                        suggestions.extend(future.result())
-                
-                # Shuffle and limit to 6 items to keep it fresh
-                random.shuffle(suggestions)
-                suggestions = suggestions[:6]
-                
-            except Exception as e:
-                print(f"Suggestion error: {e}")
-            
-            return jsonify({
-                "original_total": original_total,
-                "new_total": new_total,
-                "savings": round(original_total - new_total, 2),
-                "message": "We found a better deal by combining sellers!",
-                "suggestions": suggestions
-            })
+                max_sellers = max(1, int(request.args.get("max_sellers", CART_MAX_SELLERS)))
+            except ValueError:
+                max_sellers = CART_MAX_SELLERS
+
+            result = optimize_cart_items(
+                cart,
+                max_sellers=max_sellers,
+                time_budget_ms=CART_OPTIMIZE_BUDGET_MS,
+                exact_max_items=CART_EXACT_MAX_ITEMS
+            )
+
+            if result["savings"] > 0:
+                result["message"] = "We found a better deal by combining sellers!"
+            else:
+                result["message"] = "Your cart already has the best prices we know of."
+            with span("serialize"):
+                return jsonify(result)
         except Exception as e:
             print(f"\u274c Optimize cart error: {e}")
             return jsonify({"error": "Failed to optimize cart", "details": str(e)}), 500
@@ -392,7 +569,7 @@ def register_routes(app):
             if not session.get("logged_in"):
                 return jsonify({"error": "Please login first"}), 401
                 
-            cart = session.get("cart", [])
+            cart = get_current_cart()
             if not cart:
                 return jsonify({"error": "Cart is empty"}), 400
                 
@@ -401,7 +578,7 @@ def register_routes(app):
             
             order_id, error_msg = create_order(user_id, total_amount, cart)
             if order_id:
-                session["cart"] = [] # Clear cart
+                cart_store.clear(current_cart_token()) # Clear cart
                 return jsonify({"message": "Order placed successfully!", "order_id": order_id}), 201
             
             return jsonify({"error": f"Failed to place order: {error_msg}"}), 500
@@ -415,8 +592,29 @@ def register_routes(app):
             if not session.get("logged_in"):
                 return jsonify({"error": "Please login first"}), 401
                 
-            orders = get_user_orders(session["user_id"])
-            return jsonify({"orders": orders}), 200
+            # ?limit / ?cursor page through orders newest first; ?summary=1 skips the line items
+            summary = request.args.get('summary') in ('1', 'true')
+            limit = None
+            if request.args.get('limit') or request.args.get('cursor'):
+                try:
+                    limit = min(max(int(request.args.get('limit') or 20), 1), PAGE_MAX_LIMIT)
+                except ValueError:
+                    return jsonify({"error": "limit must be a number"}), 400
+
+            before = None
+            if request.args.get('cursor'):
+                key = decode_cursor(request.args['cursor'], "orders")
+                try:
+                    before = (datetime.datetime.fromisoformat(key[0]), int(key[1]))
+                except (TypeError, ValueError, IndexError):
+                    return jsonify({"error": "Invalid cursor"}), 400
+
+            if limit is None and not summary:
+                return jsonify({"orders": get_user_orders(session["user_id"])}), 200
+
+            orders, last_key = get_user_orders_page(session["user_id"], limit, before, summary)
+            next_cursor = encode_cursor("orders", [last_key[0].isoformat(), last_key[1]]) if last_key else None
+            return jsonify({"orders": orders, "next_cursor": next_cursor}), 200
         except Exception as e:
             print(f"❌ Orders error: {e}")
             return jsonify({"error": "Failed to fetch orders", "details": str(e)}), 500
@@ -425,25 +623,34 @@ def register_routes(app):
     # Extra Features (Price History, Alerts, AI)
     # ---------------------------
     @app.route('/api/price-history', methods=['POST'])
-    def get_price_history():
-        """Returns generated price history for the graph demo."""
+    def get_price_history_route():
+        """Daily price series for a product, from recorded search results."""
         data = request.get_json() or {}
         try:
-            current_price = float(data.get('price', 100))
-        except:
-            current_price = 100.0
-        
-        # Generate 30 days of fake history data
-        history = []
-        today = datetime.date.today()
-        
-        for i in range(30):
-            date = (today - datetime.timedelta(days=30-i)).isoformat()
-            # Fluctuate price by +/- 10%
-            fluctuation = current_price * (1 + (random.random() * 0.2 - 0.1))
-            history.append({"date": date, "price": round(fluctuation, 2)})
-            
-        return jsonify({"history": history, "current_price": current_price})
+            current_price = float(data.get('price', 0))
+        except (TypeError, ValueError):
+            current_price = 0.0
+        try:
+            days = min(max(int(data.get('days', 90)), 1), 365)
+        except (TypeError, ValueError):
+            days = 90
+
+        product_id = str(data.get('id') or '')
+        history = get_price_history(product_id, data.get('source'), days) if product_id else []
+
+        # Today's price may still be waiting in the ingestion buffer
+        today = datetime.date.today().isoformat()
+        if current_price > 0 and (not history or history[-1]["date"] != today):
+            history.append({"date": today, "price": round(current_price, 2)})
+
+        prices = [h["price"] for h in history]
+        return jsonify({
+            "history": history,
+            "current_price": current_price,
+            "lowest_price": min(prices) if prices else None,
+            "highest_price": max(prices) if prices else None,
+            "days": days
+        })
 
     @app.route('/api/set-alert', methods=['POST'])
     def set_price_alert():
@@ -451,15 +658,23 @@ def register_routes(app):
             return jsonify({"error": "Please login first"}), 401
             
         data = request.get_json() or {}
-        success = add_price_alert(
+        target_price = float(data.get("target_price", 0))
+        alert_id = add_price_alert(
             session["user_id"], 
             data.get("title"), 
-            float(data.get("target_price", 0)), 
+            target_price, 
             data.get("email")
         )
         
-        if success:
-            return jsonify({"message": "Price alert set!"})
+        if alert_id:
+            register_alert({
+                "id": alert_id,
+                "user_id": session["user_id"],
+                "product_title": data.get("title"),
+                "target_price": target_price,
+                "email": data.get("email")
+            })
+            return jsonify({"message": "Price alert set!", "alert_id": alert_id})
         else:
             return jsonify({"error": "Failed to set alert"}), 500
 
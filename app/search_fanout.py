@@ -0,0 +1,186 @@
+"""
+Search Fan-out
+Runs one search against every store in SEARCH_STORES in parallel for /api/search.
+
+A slow store no longer holds the whole response:
+- deadline: after SEARCH_DEADLINE_MS the stores still running are reported as 'timeout' (with
+  whatever is cached for them) and the response goes out with the rest. Upstream calls get the
+  time left until the deadline as their timeout, so a hanging store can't hold pool workers
+  much longer than the request that started them.
+- hedging: a store still running after SEARCH_HEDGE_MS gets a second call; the first answer wins.
+  Hedges cost credits, so they are off by default and use the 'suggestion' credit priority.
+  They are skipped while the pool has no free workers for them.
+- circuit breakers: a store that fails or times out SEARCH_BREAKER_FAILURES times in a row is
+  skipped (state 'circuit_open', cached data only) for SEARCH_BREAKER_COOLDOWN seconds.
+"""
+import time
+import threading
+import contextvars
+import concurrent.futures
+from app.config import (
+    SEARCH_DEADLINE_MS, SEARCH_HEDGE_MS, SEARCH_MAX_WORKERS, SEARCH_BREAKER_FAILURES, SEARCH_BREAKER_COOLDOWN
+)
+from app.api_clients import search_serpapi_products, hedge_search, cached_search, cached_at
+from app.cache import peek_cache, cache_state
+from app.circuit_breaker import CircuitBreaker
+from app.metrics import SEARCH_FANOUT_PENDING, Counter, register_collector
+from app.profiling import span
+
+# Stores checked explicitly for comparison on every search
+SEARCH_STORES = ["serpapi", "amazon", "bestbuy", "walmart", "ebay", "target"]
+
+# Upstream outcomes that tell us something about a store's health (cache hits don't)
+HEALTHY_STATES = {"live", "empty"}
+FAILED_STATES = {"error", "fallback", "timeout"}
+
+# Shared by all requests, so timed-out calls can finish in the background without a new pool per search
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="store-search")
+_in_flight = 0  # Calls submitted to _executor and not finished yet
+_in_flight_lock = threading.Lock()
+breakers = {store: CircuitBreaker(store, SEARCH_BREAKER_FAILURES, SEARCH_BREAKER_COOLDOWN) for store in SEARCH_STORES}
+
+STORE_OUTCOMES = Counter("search_store_outcomes_total", "Store results in /api/search by cache state.", ("store", "state"))
+HEDGES = Counter("search_hedges_total", "Hedged store calls by outcome.", ("store", "result"))
+
+def _collect_breaker_metrics():
+    states = {"closed": 0, "half-open": 1, "open": 2}
+    return [("search_circuit_state", "gauge", "Store circuit breakers: 0 closed, 1 half-open, 2 open.",
+             [({"store": store}, states[breaker.stats()["state"]]) for store, breaker in breakers.items()])]
+
+register_collector(_collect_breaker_metrics)
+
+def _priority(store):
+    # The main query is what the user asked for; per-store searches only widen it
+    return "interactive" if store == "serpapi" else "suggestion"
+
+def _search_store(query, store, timeout):
+    try:
+        # search_serpapi_products handles caching and 'site:' filtering
+        with span(f"store.{store}"):
+            products, meta = search_serpapi_products(query, store, timeout, with_meta=True, priority=_priority(store))
+        return store, products, meta["state"], meta["stored_at"]
+    except Exception as e:
+        print(f"Error searching {store}: {e}")
+        return store, [], "error", None
+    finally:
+        _finished()
+
+def _hedge_store(query, store, timeout):
+    """Second call for a slow store; None unless it came back with products."""
+    try:
+        with span(f"hedge.{store}"):
+            products = hedge_search(query, store, timeout)
+        if products:
+            return store, products, "live", cached_at(f"{store}_{query}")
+        return None
+    except Exception as e:
+        print(f"Error in hedged search for {store}: {e}")
+        return None
+    finally:
+        _finished()
+
+def _submit(fn, *args):
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += 1
+    SEARCH_FANOUT_PENDING.inc()
+    # Each call runs in a copy of this context so its spans land in the request's trace
+    return _executor.submit(contextvars.copy_context().run, fn, *args)
+
+def _finished():
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+    SEARCH_FANOUT_PENDING.dec()
+
+def _remaining(deadline):
+    """Seconds left until the deadline, as an upstream timeout (None: no deadline)."""
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.1)
+
+def has_fresh_results(query):
+    """True if some store has fresh cached results for exactly this query (the fan-out answers from them)."""
+    for store in SEARCH_STORES:
+        products, stored_at = peek_cache(f"{store}_{query}")
+        if products and cache_state(stored_at) == "fresh":
+            return True
+    return False
+
+def _record(store, state):
+    STORE_OUTCOMES.inc(store, state)
+    if state in HEALTHY_STATES:
+        breakers[store].record_success()
+    elif state in FAILED_STATES:
+        breakers[store].record_failure()
+    else:
+        # Cache hits and credit refusals say nothing about the store, but must not hold the trial slot
+        breakers[store].release_trial()
+
+def fan_out_search(query, deadline_ms=None, hedge_ms=None):
+    """
+    Search all SEARCH_STORES in parallel; yield (store, products, cache_state, stored_at) as each
+    finishes. Every store is yielded exactly once, at the latest when the deadline passes.
+    """
+    deadline_ms = SEARCH_DEADLINE_MS if deadline_ms is None else deadline_ms
+    hedge_ms = SEARCH_HEDGE_MS if hedge_ms is None else hedge_ms
+    started = time.monotonic()
+    deadline = started + deadline_ms / 1000 if deadline_ms else None
+    hedge_at = started + hedge_ms / 1000 if hedge_ms else None
+
+    pending = {}  # future -> (store, is_hedge)
+    for store in SEARCH_STORES:
+        if breakers[store].allow():
+            pending[_submit(_search_store, query, store, _remaining(deadline))] = (store, False)
+        else:
+            products, stored_at = cached_search(query, store)
+            STORE_OUTCOMES.inc(store, "circuit_open")
+            yield store, products, "circuit_open", stored_at
+
+    waiting = {store for store, _ in pending.values()}
+    held = {}  # store -> failed result, kept while its hedge is still running
+    hedged = False
+    while waiting:
+        wake_at = min([t for t in (deadline, None if hedged else hedge_at) if t], default=None)
+        timeout = None if wake_at is None else max(wake_at - time.monotonic(), 0)
+        done, _ = concurrent.futures.wait(list(pending), timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+
+        for future in done:
+            store, is_hedge = pending.pop(future)
+            result = future.result()
+            if is_hedge:
+                HEDGES.inc(store, "won" if result and store in waiting else "lost" if result else "failed")
+            if store not in waiting:
+                continue  # The other copy answered first
+            still_running = any(s == store for s, _ in pending.values())
+            if result is None or (result[2] in FAILED_STATES and still_running):
+                # Failed copy: wait for the other one, answer with the failure if it fails too
+                if result is not None:
+                    held[store] = result
+                if still_running:
+                    continue
+                result = held.get(store) or (store, [], "error", None)
+            waiting.discard(store)
+            held.pop(store, None)
+            _record(store, result[2])
+            yield result
+
+        now = time.monotonic()
+        if hedge_at and not hedged and now >= hedge_at:
+            hedged = True
+            # Hedges would only queue behind the calls already running
+            if _in_flight + len(waiting) <= SEARCH_MAX_WORKERS:
+                for store in waiting:
+                    pending[_submit(_hedge_store, query, store, _remaining(deadline))] = (store, True)
+            else:
+                for store in waiting:
+                    HEDGES.inc(store, "skipped")
+        if deadline and now >= deadline:
+            for store in sorted(waiting):
+                products, stored_at = cached_search(query, store)
+                _record(store, "timeout")
+                yield store, products, "timeout", stored_at
+            return
+
+def get_fanout_stats():
+    return {store: breaker.stats() for store, breaker in breakers.items()}
@@ -0,0 +1,114 @@
+"""
+Request Coalescing (single-flight)
+Concurrent callers asking for the same key share one upstream fetch.
+"""
+import os
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl  # POSIX only; cross-worker locking is skipped without it
+except ImportError:
+    fcntl = None
+
+class _Call:
+    """One in-flight fetch that other callers can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Deduplicates concurrent calls per key within this process."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.deduplicated = 0
+        self.cross_worker = 0
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run `fn()` once for all concurrent callers of `key` and return its result.
+        Followers give up after `timeout` seconds and get None.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            if not call.event.wait(timeout):
+                return None
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "deduplicated": self.deduplicated,
+                "cross_worker_deduplicated": self.cross_worker
+            }
+
+@contextmanager
+def file_lock(lock_dir, key, timeout):
+    """
+    Hold an exclusive lock file for `key` so only one worker process fetches it.
+    Yields True if the lock was taken, False if it timed out or locking is unavailable.
+    """
+    if fcntl is None:
+        yield False
+        return
+
+    try:
+        os.makedirs(lock_dir, exist_ok=True)
+        path = os.path.join(lock_dir, hashlib.md5(key.encode()).hexdigest() + ".lock")
+        handle = open(path, "w")
+    except OSError:
+        yield False
+        return
+
+    acquired = False
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.05)
+        yield acquired
+    finally:
+        if acquired:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
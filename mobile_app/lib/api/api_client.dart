@@ -33,6 +33,32 @@ class ApiClient {
     return _toApiResponse(response);
   }
 
+  /// GET a newline-delimited JSON stream and yield each frame as it arrives.
+  Stream<Map<String, dynamic>> getLines(
+    String path, {
+    Map<String, String>? query,
+  }) async* {
+    final uri = Uri.parse(
+      '${AppConfig.apiBaseUrl}$path',
+    ).replace(queryParameters: query);
+    final request = http.Request('GET', uri)..headers.addAll(_headers());
+    final response = await _client.send(request);
+    _storeCookie(response.headers['set-cookie']);
+
+    final lines = response.stream
+        .transform(utf8.decoder)
+        .transform(const LineSplitter());
+    await for (final line in lines) {
+      if (line.trim().isEmpty) {
+        continue;
+      }
+      final dynamic payload = jsonDecode(line);
+      if (payload is Map<String, dynamic>) {
+        yield payload;
+      }
+    }
+  }
+
   Map<String, String> _headers() {
     final headers = <String, String>{'Content-Type': 'application/json'};
 
@@ -44,7 +70,10 @@ class ApiClient {
   }
 
   void _captureCookie(http.Response response) {
-    final setCookie = response.headers['set-cookie'];
+    _storeCookie(response.headers['set-cookie']);
+  }
+
+  void _storeCookie(String? setCookie) {
     if (setCookie == null || setCookie.isEmpty) {
       return;
     }
@@ -75,6 +75,17 @@ class BackendService {
     }
   }
 
+  /// Streams search results: a 'batch' frame per store as it answers, then a
+  /// 'summary' frame with the merged, sorted list (same shape as /api/search).
+  Stream<Map<String, dynamic>> searchProductsStream(String query) async* {
+    try {
+      yield* _client.getLines('/api/search/stream', query: {'q': query});
+    } catch (e) {
+      debugPrint('❌ Search Stream Exception: $e');
+      yield {'type': 'error', 'error': 'Search failed'};
+    }
+  }
+
   Future<ApiResponse> addToCart(
     Map<String, dynamic> product, {
     int quantity = 1,
@@ -87,6 +98,7 @@ class BackendService {
         'title': product['title'] ?? 'Product',
         'price': _asDouble(product['price']),
         'quantity': quantity,
+        'source': product['source'],
       },
     );
   }
@@ -157,10 +169,18 @@ class BackendService {
     }
   }
 
-  Future<Map<String, dynamic>> getPriceHistory(double price) async {
+  Future<Map<String, dynamic>> getPriceHistory(
+    double price, {
+    String? productId,
+    String? source,
+  }) async {
     final response = await _client.post(
       '/api/price-history',
-      body: {'price': price},
+      body: {
+        'price': price,
+        if (productId != null) 'id': productId,
+        if (source != null) 'source': source,
+      },
     );
     return response.data;
   }
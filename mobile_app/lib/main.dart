@@ -262,6 +262,7 @@ class _DiscoverScreenState extends State<DiscoverScreen> {
   List<Map<String, dynamic>> _allProducts = [];
   List<Map<String, dynamic>> _products = [];
   bool _loading = true;
+  int _searchGeneration = 0;
   String _selectedCategory = 'All';
 
   @override
@@ -297,16 +298,46 @@ class _DiscoverScreenState extends State<DiscoverScreen> {
       return;
     }
 
-    setState(() => _loading = true);
+    // A newer search makes the frames of this one stale
+    final generation = ++_searchGeneration;
+    setState(() {
+      _loading = true;
+      _allProducts = [];
+    });
     try {
       debugPrint('🔍 Performing search for: $query');
-      final res = await widget.service.searchProducts(query);
-      debugPrint('📊 Search returned ${res.length} products');
-      setState(() {
-        _allProducts = res;
-      });
-      _applyFilters();
-      if (res.isEmpty) {
+      var received = <Map<String, dynamic>>[];
+      var failed = false;
+      // Each store's results are shown as soon as it answers; the summary
+      // then replaces them with the merged, de-duplicated list
+      await for (final frame in widget.service.searchProductsStream(query)) {
+        if (!mounted || generation != _searchGeneration) return;
+        final type = frame['type'];
+        if (type == 'batch') {
+          received = [...received, ..._frameProducts(frame)]
+            ..sort((a, b) => _price(a).compareTo(_price(b)));
+          setState(() {
+            _allProducts = received;
+            _loading = false;
+          });
+          _applyFilters();
+        } else if (type == 'summary') {
+          setState(() => _allProducts = _frameProducts(frame));
+          _applyFilters();
+        } else if (type == 'error' || frame['error'] != null) {
+          failed = true;
+        }
+      }
+
+      if (failed && _allProducts.isEmpty) {
+        // The stream broke before any store answered: fall back to a plain search
+        final res = await widget.service.searchProducts(query);
+        if (!mounted || generation != _searchGeneration) return;
+        setState(() => _allProducts = res);
+        _applyFilters();
+      }
+      debugPrint('📊 Search returned ${_allProducts.length} products');
+      if (_allProducts.isEmpty) {
         ScaffoldMessenger.of(context).showSnackBar(
           const SnackBar(
             content: Text('No products found. Try different search.'),
@@ -315,14 +346,31 @@ class _DiscoverScreenState extends State<DiscoverScreen> {
       }
     } catch (e) {
       debugPrint('❌ Search error: $e');
-      ScaffoldMessenger.of(
-        context,
-      ).showSnackBar(SnackBar(content: Text('Search error: $e')));
+      if (mounted) {
+        ScaffoldMessenger.of(
+          context,
+        ).showSnackBar(SnackBar(content: Text('Search error: $e')));
+      }
     } finally {
-      setState(() => _loading = false);
+      if (mounted && generation == _searchGeneration) {
+        setState(() => _loading = false);
+      }
     }
   }
 
+  List<Map<String, dynamic>> _frameProducts(Map<String, dynamic> frame) {
+    final products = frame['products'];
+    if (products is! List) return [];
+    return products
+        .whereType<Map>()
+        .map((item) => Map<String, dynamic>.from(item))
+        .toList();
+  }
+
+  double _price(Map<String, dynamic> product) {
+    return double.tryParse('${product['price']}') ?? double.infinity;
+  }
+
   void _applyFilters() {
     final query = _searchCtrl.text.trim().toLowerCase();
     final source = _normalizeSource(_selectedCategory);
@@ -611,8 +659,8 @@ class _CartScreenState extends State<CartScreen> {
         builder: (ctx) => AlertDialog(
           title: const Text('Cart Optimized'),
           content: Text(
-            'Current total: ₹${res['original_total']}\n'
-            'Optimized total: ₹${res['new_total']}\n'
+            'Current total: ₹${res['original_total']} + ₹${res['original_shipping']} shipping\n'
+            'Optimized total: ₹${res['new_total']} + ₹${res['new_shipping']} shipping\n'
             'You save: ₹${res['savings']}',
           ),
           actions: [
@@ -989,7 +1037,11 @@ class _ProductDetailsScreenState extends State<ProductDetailsScreen> {
     setState(() => _loadingHistory = true);
     try {
       final price = double.tryParse('${widget.product['price']}') ?? 100;
-      final data = await widget.service.getPriceHistory(price);
+      final data = await widget.service.getPriceHistory(
+        price,
+        productId: widget.product['id']?.toString(),
+        source: widget.product['source']?.toString(),
+      );
       final raw = data['history'];
       if (raw is List) {
         setState(() {
@@ -0,0 +1,112 @@
+"""
+Benchmark the price alert matcher (app/alerts.py).
+
+Builds an index of synthetic alerts (100k by default) and times matching batches of
+search results against it, compared with scanning every alert for each product.
+Nothing is written to the database.
+
+Run from the project root: python scripts/bench_alerts.py [alert_count]
+"""
+import os
+import sys
+import time
+import random
+import statistics
+
+# Add project root to path so we can import app
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.alerts import AlertIndex
+from app.matching import title_tokens, similarity
+
+BATCH_SIZE = 60    # About what one store search returns
+BATCHES = 50
+SCAN_BATCHES = 3   # The full scan is slow; time only a few batches
+
+BRANDS = ["Sony", "Samsung", "Apple", "Logitech", "Anker", "Bose", "Dell", "HP", "Lenovo", "JBL",
+          "Asus", "Acer", "Canon", "Nikon", "Philips", "Xiaomi", "OnePlus", "Garmin", "Fitbit", "Razer"]
+KINDS = ["Wireless Headphones", "Bluetooth Speaker", "Gaming Mouse", "Portable SSD", "Laptop 15 inch",
+         "Smart Watch", "Power Bank", "Mechanical Keyboard", "4K Monitor", "Earbuds", "Webcam",
+         "Router", "Tablet", "Action Camera", "Soundbar", "Drone", "Electric Toothbrush", "Air Fryer"]
+EXTRAS = ["", "Black", "- Renewed", "with Case", "2024 Model", "| Free Shipping", "White", "Bundle"]
+
+def catalog(size, seed=11):
+    """(title, typical price) pairs for distinct products."""
+    random.seed(seed)
+    products = []
+    for _ in range(size):
+        model = f"{random.choice('ABCDEFGHKMNPRSTWX')}{random.randint(100, 99999)}{random.choice(['', 'X', 'M5', 'S', 'Pro'])}"
+        products.append((f"{random.choice(BRANDS)} {model} {random.choice(KINDS)}", random.uniform(1000, 90000)))
+    return products
+
+def make_alerts(products, count):
+    alerts = []
+    for i in range(count):
+        title, price = random.choice(products)
+        alerts.append({
+            "id": i + 1,
+            "user_id": random.randint(1, 20000),
+            "product_title": title,
+            "target_price": round(price * random.uniform(0.7, 1.0), 2),
+            "email": f"user{i}@example.com"
+        })
+    return alerts
+
+def make_batch(products):
+    batch = []
+    for i in range(BATCH_SIZE):
+        title, price = random.choice(products)
+        batch.append({
+            "id": f"p{i}",
+            "title": f"{title} {random.choice(EXTRAS)}".strip(),
+            "price": round(price * random.uniform(0.65, 1.15), 2),
+            "source": random.choice(["Amazon", "Walmart", "Best Buy", "eBay"])
+        })
+    return batch
+
+def full_scan(alerts, batch, threshold):
+    """What matching would cost without the index: every alert against every product."""
+    alert_tokens = [(a, title_tokens(a["product_title"])) for a in alerts]
+    fired = 0
+    for product in batch:
+        tokens = title_tokens(product["title"])
+        for alert, a_tokens in alert_tokens:
+            if product["price"] <= alert["target_price"] and similarity(a_tokens, tokens) >= threshold:
+                fired += 1
+    return fired
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    products = catalog(max(count // 5, 100))
+    alerts = make_alerts(products, count)
+
+    index = AlertIndex(threshold=0.6)
+    started = time.perf_counter()
+    index.replace(alerts)
+    build_ms = (time.perf_counter() - started) * 1000
+    stats = index.stats()
+    print(f"Index: {stats['alerts']} alerts, {stats['groups']} title groups, "
+          f"{stats['posting_words']} posting words, built in {build_ms:.0f} ms")
+
+    timings, fired = [], 0
+    for _ in range(BATCHES):
+        batch = make_batch(products)
+        started = time.perf_counter()
+        fired += len(index.match(batch))
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"Indexed: {BATCHES} batches x {BATCH_SIZE} products, p50 {statistics.median(timings):.2f} ms, "
+          f"max {max(timings):.2f} ms, {fired} alerts fired, {len(index)} still active")
+
+    remaining = [a for a in alerts if a["id"] in index._group_of]
+    scan_timings = []
+    for _ in range(SCAN_BATCHES):
+        batch = make_batch(products)
+        started = time.perf_counter()
+        full_scan(remaining, batch, 0.6)
+        scan_timings.append((time.perf_counter() - started) * 1000)
+    print(f"Full scan: p50 {statistics.median(scan_timings):.0f} ms per batch "
+          f"({statistics.median(scan_timings) / statistics.median(timings):.0f}x slower)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark JSON encoding of product payloads (app/json_codec.py).
+
+Times a 500-product /api/search-sized list through the stdlib json module, the configured
+backend (orjson when installed) and the pre-serialized path used with CACHE_RAW_JSON.
+Nothing is cached or written.
+
+Run from the project root: python scripts/bench_json.py [product_count]
+"""
+import os
+import sys
+import json
+import time
+import random
+import statistics
+
+# Add project root to path so we can import app
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from flask import Flask
+from app.json_codec import BACKEND, dumps, loads, RawList, json_response, init_json
+
+ROUNDS = 50
+STORES = ["Amazon", "Walmart", "Best Buy", "eBay", "Target", "Newegg"]
+
+def make_products(count, seed=7):
+    random.seed(seed)
+    return [{
+        "id": f"{random.getrandbits(64):x}",
+        "title": f"Wireless Headphones Model {random.randint(100, 99999)} Noise Cancelling - Black",
+        "price": round(random.uniform(10, 900), 2),
+        "image": f"https://example.com/images/{i}.jpg",
+        "link": f"https://example.com/products/{i}?ref=shopping",
+        "source": random.choice(STORES),
+        "rating": round(random.uniform(1, 5), 1),
+        "reviews": random.randint(0, 20000)
+    } for i in range(count)]
+
+def timed(label, work):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        work()
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<34} p50 {statistics.median(timings):7.2f} ms")
+    return statistics.median(timings)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    products = make_products(count)
+    body = {"query": "headphones", "total": count, "products": products, "cache_state": {}}
+    raw = dumps(products)
+    print(f"{count} products, {len(raw) / 1024:.0f} KB encoded, backend: {BACKEND}")
+
+    app = Flask(__name__)
+    init_json(app)
+    raw_list = RawList(products, raw)
+    with app.app_context():
+        baseline = timed("json.dumps (stdlib)", lambda: json.dumps(body))
+        timed("json.loads (stdlib)", lambda: json.loads(raw))
+        timed(f"dumps ({BACKEND})", lambda: dumps(body))
+        timed(f"loads ({BACKEND})", lambda: loads(raw))
+        fast = timed("jsonify", lambda: app.json.response(body).get_data())
+        spliced = timed("pre-serialized (CACHE_RAW_JSON)", lambda: json_response(dict(body, products=raw_list)).get_data())
+    print(f"jsonify is {baseline / fast:.1f}x, pre-serialized {baseline / spliced:.1f}x faster than stdlib")
+
+if __name__ == "__main__":
+    main()
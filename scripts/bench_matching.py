@@ -0,0 +1,87 @@
+"""
+Benchmark cross-store product grouping (app/matching.py).
+
+Uses recorded result sets, in this order:
+1. JSON files given on the command line (a list of products, or a /api/search response)
+2. Merged per-query results from the local SQLite cache (cache/cache.sqlite3)
+3. A synthetic 600-listing set if neither is available
+
+Run from the project root: python scripts/bench_matching.py [results.json ...]
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import statistics
+
+# Add project root to path so we can import app
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.matching import group_products
+
+RUNS = 50
+
+def load_files(paths):
+    result_sets = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        products = data.get("products", []) if isinstance(data, dict) else data
+        result_sets.append((os.path.basename(path), products))
+    return result_sets
+
+def load_cache(db_path):
+    """Rebuild what /api/search merged for each cached query ('{store}_{query}' keys)."""
+    if not os.path.exists(db_path):
+        return []
+    conn = sqlite3.connect(db_path)
+    by_query = {}
+    for key, value in conn.execute("SELECT cache_key, value FROM cache_entries WHERE cache_key IS NOT NULL"):
+        query = key.split("_", 1)[-1]
+        by_query.setdefault(query, []).extend(json.loads(value))
+    conn.close()
+    return sorted(by_query.items(), key=lambda item: -len(item[1]))[:10]
+
+def synthetic(size=600, seed=7):
+    random.seed(seed)
+    brands = ["Sony", "Samsung", "Apple", "Logitech", "Anker", "Bose", "Dell", "HP", "Lenovo", "JBL"]
+    kinds = ["Wireless Headphones", "Bluetooth Speaker", "Gaming Mouse", "Portable SSD", "Laptop 15 inch",
+             "Smart Watch", "Power Bank", "Mechanical Keyboard", "4K Monitor", "Earbuds"]
+    stores = ["Amazon", "Walmart", "Best Buy", "eBay", "Target", "Google Shopping"]
+    extras = ["", "Black", "- Renewed", "with Case", "2024 Model", "| Free Shipping"]
+    base = []
+    for _ in range(size // 6):
+        model = f"{random.choice('ABCDEFGHKMNPRSTWX')}{random.randint(100, 9999)}{random.choice(['', 'X', 'M5', 'S'])}"
+        base.append((f"{random.choice(brands)} {model} {random.choice(kinds)}", random.uniform(1000, 90000)))
+    products = []
+    for i in range(size):
+        title, price = random.choice(base)
+        products.append({
+            "id": f"p{i}",
+            "title": f"{title} {random.choice(extras)}".strip(),
+            "price": round(price * random.uniform(0.9, 1.1), 2),
+            "source": random.choice(stores)
+        })
+    return [("synthetic", products)]
+
+def main():
+    result_sets = (
+        load_files(sys.argv[1:]) if len(sys.argv) > 1
+        else load_cache(os.path.join(BASE_DIR, "cache", "cache.sqlite3")) or synthetic()
+    )
+
+    print(f"{'result set':30} {'listings':>8} {'groups':>7} {'p50 ms':>8} {'max ms':>8}")
+    for name, products in result_sets:
+        timings = []
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            groups = group_products(products)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{name[:30]:30} {len(products):>8} {len(groups):>7} "
+              f"{statistics.median(timings):>8.2f} {max(timings):>8.2f}")
+
+if __name__ == "__main__":
+    main()
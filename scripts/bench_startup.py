@@ -0,0 +1,100 @@
+"""
+Benchmark cold starts of the app (what a new Vercel instance or gunicorn worker pays).
+
+Each run is a fresh Python process that imports the app, calls create_app (as api/index.py
+does) and serves GET /health, timing the imports, create_app and the first request. It also reports
+which database drivers were imported and which background threads were running, since
+neither should happen before the first request that needs them.
+
+Run from the project root: python scripts/bench_startup.py [--runs N] [--serverless] [--imports]
+  --serverless  set VERCEL=1 (lazy schema check, single-connection pool, no prewarm)
+  --imports     also print the slowest packages to import (python -X importtime)
+Set the usual DB/SerpAPI environment variables to benchmark against a real database.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process; prints one JSON line
+CHILD = r"""
+import sys, time, json, threading
+started = time.perf_counter()
+sys.path.insert(0, %(base)r)
+import flask, requests
+deps = time.perf_counter()
+import app.routes
+imported = time.perf_counter()
+from app import create_app
+application = create_app()
+created = time.perf_counter()
+status = application.test_client().get("/health").status_code
+served = time.perf_counter()
+print(json.dumps({
+    "deps_ms": (deps - started) * 1000,
+    "imports_ms": (imported - deps) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - created) * 1000,
+    "total_ms": (served - started) * 1000,
+    "status": status,
+    "drivers": [m for m in ("mysql.connector", "psycopg2") if m in sys.modules],
+    "threads": sorted(t.name for t in threading.enumerate() if t is not threading.main_thread())
+}))
+"""
+
+STAGES = ["deps_ms", "imports_ms", "create_app_ms", "first_request_ms", "total_ms"]
+
+def run_once(env):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD % {"base": BASE_DIR}],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    # The app prints status lines; the result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+def slowest_imports(env, limit=15):
+    """Import time (self time summed per top-level package) of importing the app."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {BASE_DIR!r}); import app.routes"],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[0].split(":")[-1].strip().isdigit():
+            package = parts[2].strip().split(".")[0]
+            packages[package] = packages.get(package, 0) + int(parts[0].split(":")[-1])
+    for package, us in sorted(packages.items(), key=lambda item: -item[1])[:limit]:
+        print(f"  {us / 1000:8.1f} ms  {package}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--serverless", action="store_true", help="Set VERCEL=1")
+    parser.add_argument("--imports", action="store_true", help="Show the slowest imports")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.serverless:
+        env["VERCEL"] = "1"
+
+    results = [run_once(env) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts{' (serverless)' if args.serverless else ''}, median / min:")
+    for stage in STAGES:
+        values = [r[stage] for r in results]
+        print(f"  {stage:<18} {statistics.median(values):8.1f} ms  {min(values):8.1f} ms")
+    last = results[-1]
+    print(f"  /health status      {last['status']}")
+    print(f"  drivers imported    {', '.join(last['drivers']) or 'none'}")
+    print(f"  background threads  {', '.join(last['threads']) or 'none'}")
+
+    if args.imports:
+        print("Slowest packages to import (one run):")
+        slowest_imports(env)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Cache maintenance for the SQLite product cache.
+Run from the project root: python scripts/cache_admin.py [stats|sweep|migrate]
+"""
+import os
+import sys
+
+# Add project root to path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.cache import cache_store
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+
+    if command == "sweep":
+        result = cache_store.sweep()
+        print(f"🧹 Removed {result['expired']} expired and {result['trimmed']} oversize entries")
+    elif command == "migrate":
+        print(f"📦 Imported {cache_store.import_legacy_files()} legacy cache files")
+    elif command == "stats":
+        stats = cache_store.stats()
+        print(f"📊 {stats['entries']} entries | {stats['bytes'] / 1024 / 1024:.1f} MB of {stats['max_bytes'] / 1024 / 1024:.0f} MB | {stats['path']}")
+    else:
+        print("Usage: python scripts/cache_admin.py [stats|sweep|migrate]")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Fake SerpAPI server for local development and load tests.
+
+Answers GET /search?engine=google_shopping&q=... like SerpAPI does, without spending credits:
+- queries with a fixture in scripts/fixtures/serpapi/ (e.g. "sony headphones" ->
+  sony_headphones.json) return its recorded shopping_results
+- any other query gets generated results, the same ones every time for the same query
+A trailing "site:amazon.com" filter is honoured by relabelling the results' store.
+
+Latency and failures can be injected to see how the app copes with a slow or flaky upstream.
+
+Run:    python scripts/fake_serpapi.py [--port 8765] [--latency 300] [--jitter 200]
+                                       [--error-rate 0.02] [--rate-limit-rate 0.01] [--hang-rate 0]
+Then:   SERPAPI_URL=http://127.0.0.1:8765/search SERPAPI_KEY=fake python run.py
+Record: python scripts/fake_serpapi.py record "iphone 15"   (real SerpAPI call, needs SERPAPI_KEY)
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Add project root to path so we can import app
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+FIXTURE_DIR = os.path.join(BASE_DIR, "scripts", "fixtures", "serpapi")
+REAL_SERPAPI_URL = "https://serpapi.com/search"
+
+SITE_STORES = {
+    "amazon.com": "Amazon.com", "bestbuy.com": "Best Buy", "walmart.com": "Walmart", "ebay.com": "eBay",
+    "target.com": "Target", "newegg.com": "Newegg", "macys.com": "Macy's", "nordstrom.com": "Nordstrom",
+    "sephora.com": "Sephora", "barnesandnoble.com": "Barnes & Noble", "dickssportinggoods.com": "Dick's",
+    "homedepot.com": "The Home Depot", "chewy.com": "Chewy", "guitarcenter.com": "Guitar Center",
+    "staples.com": "Staples"
+}
+ADJECTIVES = ["Wireless", "Portable", "Smart", "Premium", "Compact", "Pro", "Ultra", "Classic", "Deluxe", "Mini"]
+BRANDS = ["Sony", "Samsung", "Apple", "Anker", "Logitech", "JBL", "Philips", "Lenovo", "Bose", "Dell", "HP", "Canon"]
+
+def fixture_name(query):
+    return "".join(c if c.isalnum() else "_" for c in query.lower().strip()) + ".json"
+
+def load_fixtures():
+    """Recorded responses by lowercase query."""
+    fixtures = {}
+    if not os.path.isdir(FIXTURE_DIR):
+        return fixtures
+    for name in os.listdir(FIXTURE_DIR):
+        if name.endswith(".json"):
+            with open(os.path.join(FIXTURE_DIR, name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            query = data.get("search_parameters", {}).get("q") or name[:-5].replace("_", " ")
+            fixtures[query.lower()] = data.get("shopping_results", [])
+    return fixtures
+
+def generate_results(query, count=40):
+    """Deterministic made-up shopping_results for a query."""
+    rng = random.Random(hashlib.md5(query.encode()).hexdigest())
+    stores = list(SITE_STORES.values())[:6]
+    results = []
+    for position in range(1, count + 1):
+        price = round(rng.uniform(5, 900), 2)
+        product_id = str(rng.getrandbits(60))
+        results.append({
+            "position": position,
+            "title": f"{rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {query.title()} {rng.randint(100, 9999)}",
+            "product_id": product_id,
+            "product_link": f"https://www.google.com/shopping/product/{product_id}",
+            "source": rng.choice(stores),
+            "price": f"${price:,.2f}",
+            "extracted_price": price,
+            "rating": round(rng.uniform(3.5, 5.0), 1),
+            "reviews": rng.randint(0, 30000),
+            "thumbnail": f"https://encrypted-tbn0.gstatic.com/shopping?q=tbn:{product_id}"
+        })
+    return results
+
+class FakeSerpAPI:
+    """Response logic and counters; the HTTP handler below just calls answer()."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, rate_limit_rate=0.0, hang_rate=0.0, hang_s=30):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.hang_rate = hang_rate
+        self.hang_s = hang_s
+        self.fixtures = load_fixtures()
+        self.counts = {"requests": 0, "fixture": 0, "generated": 0, "errors": 0, "rate_limited": 0, "hung": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def answer(self, params):
+        """(status, headers, body dict) for one /search request."""
+        self._count("requests")
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+        roll = random.random()
+        if roll < self.hang_rate:
+            self._count("hung")
+            time.sleep(self.hang_s)  # Longer than the app's REQUEST_TIMEOUT
+            return 504, {}, {"error": "Injected timeout"}
+        roll -= self.hang_rate
+        if roll < self.rate_limit_rate:
+            self._count("rate_limited")
+            return 429, {"Retry-After": "1"}, {"error": "Injected rate limit"}
+        roll -= self.rate_limit_rate
+        if roll < self.error_rate:
+            self._count("errors")
+            return 500, {}, {"error": "Injected server error"}
+
+        if not params.get("api_key"):
+            return 401, {}, {"error": "Invalid API key."}
+        query = params.get("q", "").strip()
+        store = None
+        if " site:" in query:
+            query, site = query.rsplit(" site:", 1)
+            store = SITE_STORES.get(site.strip().lower(), site)
+
+        results = self.fixtures.get(query.lower())
+        self._count("fixture" if results is not None else "generated")
+        if results is None:
+            results = generate_results(query)
+        if store:
+            results = [dict(r, source=store) for r in results]
+        return 200, {}, {
+            "search_metadata": {"status": "Success"},
+            "search_parameters": {"engine": params.get("engine", "google_shopping"), "q": params.get("q", "")},
+            "shopping_results": results
+        }
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/stats":
+                status, headers, body = 200, {}, fake.counts
+            elif url.path == "/search":
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                status, headers, body = fake.answer(params)
+            else:
+                status, headers, body = 404, {}, {"error": "Not found"}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # One line per request would swamp a load test
+
+    return Handler
+
+def serve(args):
+    fake = FakeSerpAPI(
+        latency_ms=args.latency, jitter_ms=args.jitter, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, hang_rate=args.hang_rate, hang_s=args.hang_seconds
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(fake))
+    server.daemon_threads = True
+    print(f"🧪 Fake SerpAPI on http://{args.host}:{args.port}/search "
+          f"({len(fake.fixtures)} fixtures, latency {args.latency}±{args.jitter} ms, "
+          f"errors {args.error_rate:.0%}, 429s {args.rate_limit_rate:.0%}, hangs {args.hang_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served: {fake.counts}")
+
+def record(query):
+    """Save a real SerpAPI response for `query` as a fixture (uses one credit)."""
+    import requests
+    from app.config import SERPAPI_KEY
+    if not SERPAPI_KEY:
+        print("❌ SERPAPI_KEY is not set")
+        return 1
+    response = requests.get(REAL_SERPAPI_URL, params={
+        "engine": "google_shopping", "q": query, "api_key": SERPAPI_KEY
+    }, timeout=30)
+    if response.status_code != 200:
+        print(f"❌ SerpAPI returned {response.status_code}: {response.text[:200]}")
+        return 1
+    data = response.json()
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    path = os.path.join(FIXTURE_DIR, fixture_name(query))
+    with open(path, "w", encoding="utf-8") as f:
+        # Only what the fake serves; search_metadata holds account details
+        json.dump({
+            "search_parameters": {"engine": "google_shopping", "q": query},
+            "shopping_results": data.get("shopping_results", [])
+        }, f, indent=2)
+    print(f"✅ Saved {len(data.get('shopping_results', []))} results to {path}")
+    return 0
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "record":
+        return record(" ".join(sys.argv[2:]))
+    parser = argparse.ArgumentParser(description="Fake SerpAPI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0, help="Mean response delay (ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="Random +/- delay (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=30)
+    serve(parser.parse_args())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Load test the running app end to end.
+
+Each virtual user (one thread with its own cookie session) repeatedly picks a scenario:
+- search:   GET /api/search?q=... (sometimes paged)
+- products: GET /api/products or /api/products/<store> (sometimes paged)
+- cart:     add two products, view the cart, remove one
+- checkout: add a product and check out (each user registers and logs in first)
+and latency p50/p95/p99, throughput and errors are reported per endpoint.
+
+Point the app at the fake SerpAPI so no credits are spent:
+    python scripts/fake_serpapi.py --latency 300 --jitter 200 &
+    SERPAPI_URL=http://127.0.0.1:8765/search SERPAPI_KEY=fake python run.py &
+    python scripts/load_test.py --users 20 --duration 60
+
+Run from the project root: python scripts/load_test.py [--base-url URL] [--users N] [--duration S]
+"""
+import sys
+import time
+import random
+import argparse
+import threading
+import statistics
+from collections import defaultdict
+import requests
+
+QUERIES = ["sony headphones", "iphone 15", "trending electronics", "gaming laptop", "air fryer",
+           "running shoes", "coffee maker", "4k monitor", "bluetooth speaker", "office chair"]
+STORES = ["amazon", "bestbuy", "walmart", "ebay", "target", "newegg", "macys", "staples"]
+SCENARIOS = {"search": 4, "products": 4, "cart": 2, "checkout": 1}  # Relative weights
+
+class Recorder:
+    """Latency samples and failures per endpoint, shared by all users."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.failures = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def call(self, session, name, method, url, expect=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=60, **kwargs)
+            ok = response.status_code in expect
+        except requests.RequestException:
+            response, ok = None, False
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.samples[name].append(elapsed)
+            if not ok:
+                self.failures[name] += 1
+        return response if ok else None
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+class VirtualUser:
+    def __init__(self, base_url, recorder, number):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.number = number
+        self.session = requests.Session()
+        self.logged_in = False
+        self.seen = []  # Products seen in responses; used to fill the cart
+
+    def call(self, name, method, path, **kwargs):
+        return self.recorder.call(self.session, name, method, self.base_url + path, **kwargs)
+
+    def remember(self, response):
+        if response is not None:
+            products = (response.json() or {}).get("products") or []
+            if products:
+                self.seen = products[:50]
+
+    def search(self):
+        params = {"q": random.choice(QUERIES)}
+        if random.random() < 0.5:
+            params.update(limit=20, sort=random.choice(["price_asc", "price_desc", "title"]))
+        self.remember(self.call("GET /api/search", "GET", "/api/search", params=params))
+
+    def products(self):
+        params = {"limit": 20} if random.random() < 0.5 else {}
+        if random.random() < 0.3:
+            response = self.call("GET /api/products", "GET", "/api/products", params=params)
+        else:
+            response = self.call("GET /api/products/<store>", "GET", f"/api/products/{random.choice(STORES)}", params=params)
+        self.remember(response)
+
+    def _add_random_product(self):
+        if not self.seen:
+            self.products()
+        if not self.seen:
+            return None
+        product = random.choice(self.seen)
+        self.call("POST /api/cart/add", "POST", "/api/cart/add", json=product)
+        return product
+
+    def cart(self):
+        first = self._add_random_product()
+        self._add_random_product()
+        self.call("GET /api/cart", "GET", "/api/cart")
+        if first:
+            self.call("POST /api/cart/remove", "POST", "/api/cart/remove", json={"id": first["id"]})
+
+    def login(self):
+        username = f"load_{int(time.time())}_{self.number}_{random.randint(0, 99999)}"
+        credentials = {"username": username, "password": "load-test-password"}
+        self.call("POST /api/register", "POST", "/api/register", json=credentials, expect=(201,))
+        self.logged_in = self.call("POST /api/login", "POST", "/api/login", json=credentials) is not None
+
+    def checkout(self):
+        if not self.logged_in:
+            self.login()
+            if not self.logged_in:
+                return
+        if self._add_random_product():
+            self.call("POST /api/checkout", "POST", "/api/checkout", expect=(201,))
+
+    def run(self, deadline):
+        names = list(SCENARIOS)
+        weights = [SCENARIOS[n] for n in names]
+        while time.time() < deadline:
+            getattr(self, random.choices(names, weights)[0])()
+
+def report(recorder, elapsed):
+    total = sum(len(s) for s in recorder.samples.values())
+    failures = sum(recorder.failures.values())
+    print(f"\n{total} requests in {elapsed:.1f} s: {total / elapsed:.1f} req/s, {failures} failed\n")
+    print(f"{'endpoint':<28} {'count':>7} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'fail':>6}")
+    for name in sorted(recorder.samples):
+        values = sorted(recorder.samples[name])
+        print(f"{name:<28} {len(values):>7} {len(values) / elapsed:>7.1f} {statistics.median(values):>8.1f} "
+              f"{percentile(values, 0.95):>8.1f} {percentile(values, 0.99):>8.1f} {values[-1]:>8.1f} "
+              f"{recorder.failures[name]:>6}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the shopping API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--ramp-up", type=float, default=2, help="Seconds over which users start")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    try:
+        requests.get(args.base_url.rstrip("/") + "/health", timeout=5).raise_for_status()
+    except requests.RequestException as e:
+        print(f"❌ App not reachable at {args.base_url}: {e}")
+        return 1
+
+    recorder = Recorder()
+    started = time.time()
+    deadline = started + args.duration
+    print(f"🏋️  {args.users} users for {args.duration:.0f} s against {args.base_url}")
+    threads = []
+    for number in range(args.users):
+        user = VirtualUser(args.base_url, recorder, number)
+        thread = threading.Thread(target=user.run, args=(deadline,), daemon=True)
+        threads.append(thread)
+        thread.start()
+        time.sleep(args.ramp_up / max(args.users, 1))
+    for thread in threads:
+        thread.join()
+    report(recorder, time.time() - started)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Database schema migrations (see app/migrate.py).
+Run from the project root:
+  python scripts/migrate.py status            applied and pending migrations
+  python scripts/migrate.py up [version]      apply pending migrations (up to version)
+  python scripts/migrate.py new <name> [--shared]
+                                              create the next migration, one file per dialect
+                                              (--shared: a single file for both)
+Uses the MYSQL_* settings from .env, like the app.
+"""
+import os
+import sys
+
+# Add project root to path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import get_db_connection
+from app.migrate import dialect_of, available_migrations, applied_migrations, migrate, new_migration
+
+USAGE = "Usage: python scripts/migrate.py [status|up [version]|new <name> [--shared]]"
+
+def connect():
+    conn = get_db_connection()
+    if conn is None:
+        print("❌ Could not connect to the database")
+        sys.exit(1)
+    return conn
+
+def status():
+    conn = connect()
+    try:
+        dialect = dialect_of(conn)
+        applied = applied_migrations(conn)
+        pending = 0
+        for version, name, _ in available_migrations(dialect):
+            if version in applied:
+                print(f"✅ {version:04d}_{name}  applied {applied[version]}")
+            else:
+                pending += 1
+                print(f"⏳ {version:04d}_{name}  pending")
+        print(f"📊 {dialect}: {len(applied)} applied, {pending} pending")
+    finally:
+        conn.close()
+
+def up(target=None):
+    conn = connect()
+    try:
+        applied = migrate(conn, target)
+        print(f"✅ {len(applied)} migrations applied" if applied else "✅ Schema is up to date")
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+def main():
+    args = sys.argv[1:]
+    command = args[0] if args else "status"
+
+    if command == "status":
+        status()
+    elif command == "up":
+        up(int(args[1]) if len(args) > 1 else None)
+    elif command == "new" and len(args) > 1:
+        shared = "--shared" in args
+        name = " ".join(a for a in args[1:] if a != "--shared")
+        for path in new_migration(name, dialects=None if shared else ("mysql", "postgres")):
+            print(f"📝 Created {os.path.relpath(path)}")
+    else:
+        print(USAGE)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Keep the curated store feeds warm in the product cache (see app/prewarm.py).
+Run from the project root: python scripts/prewarm.py [run|once|force|status]
+
+  run     Schedule refreshes until stopped (waits to become leader if another process is)
+  once    Refresh the feeds that are due now, then exit
+  force   Refresh every feed now, then exit
+  status  Show cache age and last refresh per feed
+"""
+import os
+import sys
+import time
+
+# Add project root to path so we can import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.prewarm import run_forever, run_once, get_status
+
+def print_status():
+    print(f"{'feed':16} {'cache age':>10} {'last refresh':>20} {'ms':>6} {'products':>8}  result")
+    for feed, info in get_status().items():
+        age = f"{info['cache_age'] / 3600:.1f}h" if info.get("cache_age") is not None else "-"
+        last = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(info["last_refresh"])) if info.get("last_refresh") else "-"
+        result = "ok" if info.get("ok") else (info.get("error") or "-")
+        print(f"{feed:16} {age:>10} {last:>20} {info.get('duration_ms', '-'):>6} {info.get('products', '-'):>8}  {result}")
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "run"
+
+    if command == "run":
+        try:
+            run_forever()
+        except KeyboardInterrupt:
+            pass
+    elif command in ("once", "force"):
+        run_once(force=command == "force")
+        print_status()
+    elif command == "status":
+        print_status()
+    else:
+        print("Usage: python scripts/prewarm.py [run|once|force|status]")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
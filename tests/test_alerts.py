@@ -0,0 +1,177 @@
+import sqlite3
+from contextlib import contextmanager
+import pytest
+from app import alerts
+from app import database
+from app.alerts import AlertIndex
+
+def alert(alert_id, title, target, email="a@example.com"):
+    return {"id": alert_id, "user_id": 1, "product_title": title, "target_price": target, "email": email}
+
+def product(title, price, pid="p1"):
+    return {"id": pid, "title": title, "price": price, "source": "Amazon"}
+
+def fired_ids(fired):
+    return sorted(a["id"] for a, _ in fired)
+
+@pytest.fixture
+def index():
+    return AlertIndex(threshold=0.6)
+
+def test_group_fires_only_targets_at_or_above_the_price(index):
+    for alert_id, target in [(1, 90.0), (2, 100.0), (3, 120.0)]:
+        index.add(alert(alert_id, "Instant Pot Duo 7-in-1 Pressure Cooker", target))
+    assert index.stats()["groups"] == 1
+
+    assert index.match([product("Instant Pot Duo 7-in-1 Pressure Cooker", 130.0)]) == []
+    assert fired_ids(index.match([product("Instant Pot Duo 7-in-1 Pressure Cooker", 100.0)])) == [2, 3]
+    assert len(index) == 1
+    assert fired_ids(index.match([product("Instant Pot Duo 7-in-1 Pressure Cooker", 80.0)])) == [1]
+    assert index.stats() == {"alerts": 0, "groups": 0, "posting_words": 0}
+
+def test_each_alert_fires_once_per_batch(index):
+    index.add(alert(1, "Instant Pot Duo Pressure Cooker", 100.0))
+    batch = [product("Instant Pot Duo Pressure Cooker", 90.0, "p1"), product("Instant Pot Duo Pressure Cooker", 80.0, "p2")]
+    fired = index.match(batch)
+    assert [(a["id"], p["id"]) for a, p in fired] == [(1, "p1")]
+
+def test_model_number_decides_the_match(index):
+    index.add(alert(1, "Sony WH-1000XM5 Headphones", 300.0))
+    assert index.stats()["posting_words"] == 1  # Posted under the model number only
+    # Similar words, different model
+    assert index.match([product("Sony WH-1000XM4 Headphones", 200.0)]) == []
+    # Few shared words, same model (hyphenated or not)
+    assert fired_ids(index.match([product("wh1000xm5 black", 250.0)])) == [1]
+
+def test_titles_without_models_post_their_rarest_words(index):
+    index.add(alert(1, "blue ceramic coffee mug", 20.0))
+    # 4 words, 3 needed to match: any match contains one of 2 posted words
+    assert index.stats()["posting_words"] == 2
+    index.add(alert(2, "blue ceramic tea pot", 40.0))
+    assert fired_ids(index.match([product("ceramic coffee mug blue large", 15.0)])) == [1]
+    assert index.match([product("blue plastic coffee cup", 10.0)]) == []
+
+def test_unrelated_and_unpriced_products_are_ignored(index):
+    index.add(alert(1, "blue ceramic coffee mug", 20.0))
+    assert index.match([product("blue ceramic coffee mug", 0)]) == []
+    assert index.match([product("garden hose", 5.0)]) == []
+    assert len(index) == 1
+
+def test_remove_and_readd(index):
+    index.add(alert(1, "blue ceramic coffee mug", 20.0))
+    index.add(alert(1, "blue ceramic coffee mug", 50.0))  # Same id: no-op
+    index.remove(1)
+    assert index.stats() == {"alerts": 0, "groups": 0, "posting_words": 0}
+
+def test_replace_swaps_the_whole_index(index):
+    index.add(alert(1, "blue ceramic coffee mug", 20.0))
+    index.replace([alert(2, "Sony WH-1000XM5", 300.0)])
+    assert len(index) == 1
+    assert index.match([product("blue ceramic coffee mug", 10.0)]) == []
+    assert fired_ids(index.match([product("Sony WH-1000XM5", 290.0)])) == [2]
+
+# ---------------------------
+# Outbox and reload, against SQLite posing as MySQL
+# ---------------------------
+SCHEMA = [
+    """CREATE TABLE price_alerts (id INTEGER PRIMARY KEY, user_id INT, product_title TEXT NOT NULL,
+       target_price DECIMAL(10, 2) NOT NULL, email TEXT NOT NULL)""",
+    """CREATE TABLE price_alert_outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, alert_id INT NOT NULL, user_id INT,
+       email TEXT NOT NULL, product_id TEXT, product_title TEXT NOT NULL, source TEXT, price DECIMAL(10, 2) NOT NULL,
+       target_price DECIMAL(10, 2) NOT NULL, sent_at TIMESTAMP NULL)""",
+    "CREATE UNIQUE INDEX uq_alert_outbox_alert ON price_alert_outbox (alert_id)",
+]
+
+class FakeCursor:
+    def __init__(self, conn, dictionary=False):
+        self._cursor = conn.cursor()
+        self._dictionary = dictionary
+
+    def _sql(self, sql):
+        return sql.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE")
+
+    def execute(self, sql, params=None):
+        self._cursor.execute(self._sql(sql), params or ())
+
+    def executemany(self, sql, rows):
+        self._cursor.executemany(self._sql(sql), rows)
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        if not self._dictionary:
+            return rows
+        names = [d[0] for d in self._cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    def close(self):
+        self._cursor.close()
+
+class FakeMySQL:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self._conn, dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+@pytest.fixture
+def db(monkeypatch):
+    conn = sqlite3.connect(":memory:")
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.executemany("INSERT INTO price_alerts VALUES (?, ?, ?, ?, ?)", [
+        (1, 1, "blue ceramic coffee mug", 20.0, "a@example.com"),
+        (2, 2, "Sony WH-1000XM5", 300.0, "b@example.com"),
+    ])
+    conn.commit()
+
+    @contextmanager
+    def db_connection():
+        yield FakeMySQL(conn)
+
+    monkeypatch.setattr(database, "db_connection", db_connection)
+    monkeypatch.setattr(alerts, "alert_index", AlertIndex(threshold=0.6))
+    return conn
+
+def outbox(db):
+    return db.execute("SELECT alert_id, price FROM price_alert_outbox ORDER BY alert_id").fetchall()
+
+def test_fired_alerts_go_to_the_outbox_once(db):
+    assert alerts.load_alerts()
+    assert len(alerts.alert_index) == 2
+    assert alerts.process_batch([product("blue ceramic coffee mug", 15.0)]) == 1
+    assert outbox(db) == [(1, 15.0)]
+
+    # Another worker with its own (older) index fires the same alert: the outbox keeps one row
+    other = AlertIndex(threshold=0.6)
+    other.replace([alert(1, "blue ceramic coffee mug", 20.0)])
+    [(fired, matched)] = other.match([product("blue ceramic coffee mug", 12.0)])
+    assert database.save_fired_alerts([{
+        "alert_id": fired["id"], "user_id": fired["user_id"], "email": fired["email"], "product_id": matched["id"],
+        "product_title": matched["title"], "source": matched["source"], "price": matched["price"],
+        "target_price": fired["target_price"]
+    }])
+    assert outbox(db) == [(1, 15.0)]
+
+def test_reload_skips_alerts_already_in_the_outbox(db):
+    alerts.load_alerts()
+    alerts.process_batch([product("blue ceramic coffee mug", 15.0)])
+    db.execute("INSERT INTO price_alerts VALUES (3, 1, 'Instant Pot Duo', 90.0, 'a@example.com')")
+    db.commit()
+
+    assert alerts.load_alerts()
+    index = alerts.alert_index
+    assert len(index) == 2
+    assert index.match([product("blue ceramic coffee mug", 10.0)]) == []
+    assert fired_ids(index.match([product("Instant Pot Duo", 85.0)])) == [3]
+
+def test_failed_reload_keeps_the_current_index(db, monkeypatch):
+    alerts.load_alerts()
+    monkeypatch.setattr(alerts, "get_active_alerts", lambda: None)
+    assert alerts.load_alerts() is False
+    assert len(alerts.alert_index) == 2
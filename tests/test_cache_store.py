@@ -0,0 +1,60 @@
+import os
+import time
+import pytest
+from app.cache_store import CacheStore, hash_key
+
+@pytest.fixture
+def store(tmp_path):
+    # janitor_interval=0: no background sweeper in tests
+    return CacheStore(str(tmp_path / "cache.sqlite3"), lifetime=60, retention=60, max_bytes=10_000, janitor_interval=0)
+
+def test_get_missing(store):
+    assert store.get("nothing") is None
+
+def test_set_and_get(store):
+    store.set("serpapi_iphone", '[{"id": 1}]', stored_at=100.0)
+    assert store.get("serpapi_iphone") == ('[{"id": 1}]', 100.0)
+
+def test_set_replaces(store):
+    store.set("k", "[1]", stored_at=100.0)
+    store.set("k", "[2]", stored_at=200.0)
+    assert store.get("k") == ("[2]", 200.0)
+    assert store.stats()["entries"] == 1
+
+def test_stored_at_without_values(store):
+    store.set("a", "[]", stored_at=1.0)
+    store.set("b", "[]", stored_at=2.0)
+    assert store.stored_at(["a", "b", "c"]) == {"a": 1.0, "b": 2.0}
+    assert store.stored_at([]) == {}
+
+def test_iter_values_since(store):
+    store.set("old", '"old"', stored_at=10.0)
+    store.set("new", '"new"', stored_at=20.0)
+    assert list(store.iter_values(since=15.0)) == [('"new"', 20.0)]
+
+def test_sweep_removes_rows_past_purge_time(store):
+    store.set("expired", "[]", stored_at=time.time() - 500)
+    store.set("kept", "[]")
+    assert store.sweep()["expired"] == 1
+    assert store.get("expired") is None
+    assert store.get("kept") is not None
+
+def test_sweep_trims_oldest_to_max_bytes(store):
+    now = time.time()
+    for i in range(15):
+        store.set(f"k{i}", "x" * 1000, stored_at=now + i)
+    result = store.sweep()
+    assert result["trimmed"] > 0
+    assert store.stats()["bytes"] <= store.max_bytes
+    assert result["trimmed"] == 5
+    assert store.get("k4") is None
+    assert store.get("k5") is not None
+
+def test_imports_legacy_files(tmp_path):
+    legacy = tmp_path / f"{hash_key('serpapi_tv')}.json"
+    legacy.write_text('[{"id": "tv"}]')
+    (tmp_path / "prewarm_state.json").write_text("{}")
+    store = CacheStore(str(tmp_path / "cache.sqlite3"), 60, 60, 10_000, janitor_interval=0)
+    assert store.get("serpapi_tv")[0] == '[{"id": "tv"}]'
+    assert not legacy.exists()
+    assert os.path.exists(tmp_path / "prewarm_state.json")
@@ -0,0 +1,133 @@
+import time
+import itertools
+import pytest
+from app import cart_optimizer
+from app.cart_optimizer import (
+    basket_cost, sellers_used, shipping_cost, optimize_cart, _greedy, _local_search, _branch_and_bound
+)
+
+def make_offers(*items):
+    """items: one [(store, price), ...] per cart item."""
+    return [
+        sorted(({"store": store, "price": float(price), "product": {"id": f"{store}-{i}"}} for store, price in item),
+                key=lambda o: o["price"])
+        for i, item in enumerate(items)
+    ]
+
+def unit_cart(n):
+    return [{"id": str(i), "quantity": 1} for i in range(n)]
+
+def brute_force(cart, offers, max_sellers):
+    choices = itertools.product(*[range(len(o)) for o in offers])
+    feasible = [list(c) for c in choices if sellers_used(offers, c) <= max_sellers]
+    return min(basket_cost(cart, offers, c)[0] for c in feasible)
+
+def later(seconds=1.0):
+    return time.perf_counter() + seconds
+
+def stores(offers, choice):
+    return [offers[i][j]["store"] for i, j in enumerate(choice)]
+
+def test_shipping_cost_threshold():
+    assert shipping_cost("amazon", 100) == 40.0
+    assert shipping_cost("amazon", 499) == 0.0
+    assert shipping_cost("unknown-store", 100) == 99.0
+    assert shipping_cost(cart_optimizer.CURRENT_STORE, 100) == 0.0
+
+def test_known_optimum():
+    cart = unit_cart(3)
+    offers = make_offers(
+        [("amazon", 300), ("bestbuy", 280), ("walmart", 310)],
+        [("amazon", 150), ("bestbuy", 160)],
+        [("walmart", 90), ("amazon", 120)]
+    )
+    incumbent = _local_search(cart, offers, _greedy(cart, offers, 3), 3, later())
+    choice, finished = _branch_and_bound(cart, offers, 3, incumbent, later())
+    assert finished
+    # Everything at Amazon reaches its free-shipping threshold
+    assert stores(offers, choice) == ["amazon", "amazon", "amazon"]
+    assert basket_cost(cart, offers, choice)[0] == brute_force(cart, offers, 3) == 570.0
+
+def test_free_shipping_threshold_beats_cheaper_items():
+    cart = unit_cart(2)
+    offers = make_offers([("amazon", 300), ("bestbuy", 290)], [("amazon", 250), ("bestbuy", 260)])
+    choice = _local_search(cart, offers, _greedy(cart, offers, 3), 3, later())
+    assert stores(offers, choice) == ["amazon", "amazon"]
+    assert basket_cost(cart, offers, choice)[0] == 550.0
+
+def test_greedy_respects_max_sellers():
+    cart = unit_cart(3)
+    offers = make_offers(
+        [("amazon", 100), ("walmart", 110)],
+        [("bestbuy", 100), ("walmart", 105)],
+        [("target", 100), ("walmart", 120)]
+    )
+    choice = _greedy(cart, offers, 1)
+    assert stores(offers, choice) == ["walmart"] * 3
+
+def test_infeasible_greedy_basket_does_not_bound_the_search():
+    # Greedy drops the wrong store first and ends with two sellers; only all-"c" meets the limit
+    cart = unit_cart(3)
+    offers = make_offers([("d", 800), ("c", 1700)], [("b", 100), ("c", 1300)], [("c", 200), ("b", 500), ("d", 1000)])
+    incumbent = _greedy(cart, offers, 1)
+    assert sellers_used(offers, incumbent) > 1
+    choice, finished = _branch_and_bound(cart, offers, 1, incumbent, later())
+    assert finished
+    assert stores(offers, choice) == ["c", "c", "c"]
+    assert basket_cost(cart, offers, choice)[0] == brute_force(cart, offers, 1)
+
+def test_local_search_keeps_max_sellers():
+    cart = unit_cart(2)
+    offers = make_offers([("amazon", 100), ("walmart", 150)], [("bestbuy", 100), ("walmart", 150)])
+    choice = _local_search(cart, offers, [1, 1], 1, later())
+    assert stores(offers, choice) == ["walmart", "walmart"]
+
+def test_branch_and_bound_matches_brute_force():
+    cart = [{"id": str(i), "quantity": 1 + i % 2} for i in range(5)]
+    offers = make_offers(*[
+        [(store, 100 + (i * 37 + k * 53) % 400) for k, store in enumerate(["amazon", "bestbuy", "walmart", "ebay"])]
+        for i in range(5)
+    ])
+    for max_sellers in (1, 2, 3):
+        incumbent = _greedy(cart, offers, max_sellers)
+        choice, finished = _branch_and_bound(cart, offers, max_sellers, incumbent, later())
+        assert finished
+        assert sellers_used(offers, choice) <= max_sellers
+        assert basket_cost(cart, offers, choice)[0] == pytest.approx(brute_force(cart, offers, max_sellers))
+
+def test_time_budget_stops_the_search():
+    n = 12
+    cart = unit_cart(n)
+    offers = make_offers(*[
+        [(store, 100 + (i * 31 + k * 17) % 90) for k, store in enumerate(["amazon", "bestbuy", "walmart", "ebay", "target"])]
+        for i in range(n)
+    ])
+    incumbent = _greedy(cart, offers, 3)
+    started = time.perf_counter()
+    choice, finished = _branch_and_bound(cart, offers, 3, incumbent, started)
+    assert not finished
+    assert time.perf_counter() - started < 0.5
+    assert basket_cost(cart, offers, choice)[0] <= basket_cost(cart, offers, incumbent)[0]
+    assert _local_search(cart, offers, incumbent, 3, started) == incumbent
+
+def test_totals_report_shipping_separately(monkeypatch):
+    cart = [
+        {"id": "1", "title": "Kettle", "price": 300.0, "quantity": 1, "source": "Best Buy"},
+        {"id": "2", "title": "Toaster", "price": 260.0, "quantity": 1, "source": "Best Buy"}
+    ]
+
+    def gather_offers(items, threshold, deadline):
+        offers = [[{"store": "bestbuy", "price": item["price"], "product": item}] for item in items]
+        offers[0].insert(0, {"store": "amazon", "price": 290.0, "product": {"id": "a1"}})
+        offers[1].insert(0, {"store": "amazon", "price": 250.0, "product": {"id": "a2"}})
+        return offers, []
+
+    monkeypatch.setattr(cart_optimizer, "gather_offers", gather_offers)
+    result = optimize_cart(cart, max_sellers=3)
+    # Item prices only, like /api/cart's total
+    assert result["original_total"] == 560.0
+    assert result["original_shipping"] == 149.0
+    assert result["new_total"] == 540.0
+    assert result["new_shipping"] == 0.0
+    assert result["savings"] == (560.0 + 149.0) - 540.0
+    assert result["constraint_met"]
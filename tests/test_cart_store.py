@@ -0,0 +1,168 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+import pytest
+from flask import Flask, session
+from app import cart_store as carts
+from app import routes
+from app.cart_store import MemoryCartStore, SQLCartStore
+
+CART_ITEMS = """CREATE TABLE cart_items (
+    cart_token VARCHAR(64) NOT NULL,
+    product_id VARCHAR(255) NOT NULL,
+    title VARCHAR(500),
+    price DECIMAL(10, 2) NOT NULL,
+    quantity INT NOT NULL,
+    source VARCHAR(50),
+    added_at DOUBLE PRECISION NOT NULL,
+    expires_at DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (cart_token, product_id)
+)"""
+
+class FakeCursor:
+    def __init__(self, conn):
+        self._cursor = conn.cursor()
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(sql.replace("%s", "?"), params)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+class FakePostgres:
+    """SQLite connection posing as psycopg2 (it has .info), so the store uses ON CONFLICT upserts."""
+
+    info = None
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path)
+
+    def cursor(self):
+        return FakeCursor(self._conn)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(carts.time, "time", lambda: now[0])
+    return now
+
+@pytest.fixture
+def memory_store():
+    return MemoryCartStore(ttl=60)
+
+@pytest.fixture
+def sql_store(tmp_path, monkeypatch):
+    path = str(tmp_path / "carts.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute(CART_ITEMS)
+
+    @contextmanager
+    def db_connection():
+        conn = FakePostgres(path)
+        try:
+            yield conn
+        finally:
+            conn._conn.close()
+
+    monkeypatch.setattr(carts, "db_connection", db_connection)
+    return SQLCartStore(ttl=60)
+
+@pytest.fixture(params=["memory", "sql"])
+def store(request):
+    return request.getfixturevalue(f"{request.param}_store")
+
+def product(price, title="Thing"):
+    return {"title": title, "price": price, "source": "Amazon"}
+
+def quantities(cart):
+    return {item["id"]: item["quantity"] for item in cart}
+
+def test_empty_cart(store):
+    assert store.get("t1") == []
+
+def test_add_remove_clear(store):
+    store.add("t1", "p1", product(10.0, "Kettle"))
+    cart = store.add("t1", "p2", product(5.5), quantity=2)
+    assert [(i["id"], i["title"], i["price"], i["quantity"]) for i in cart] == [
+        ("p1", "Kettle", 10.0, 1), ("p2", "Thing", 5.5, 2)
+    ]
+    assert quantities(store.remove("t1", "p1")) == {"p2": 2}
+    store.clear("t1")
+    assert store.get("t1") == []
+
+def test_carts_are_separate(store):
+    store.add("t1", "p1", product(10.0))
+    store.add("t2", "p2", product(10.0))
+    assert quantities(store.get("t1")) == {"p1": 1}
+    assert quantities(store.get("t2")) == {"p2": 1}
+
+def test_adding_again_increments_quantity(store):
+    store.add("t1", "p1", product(10.0))
+    store.add("t1", "p1", product(10.0), quantity=3)
+    assert quantities(store.get("t1")) == {"p1": 4}
+
+def test_concurrent_adds_lose_no_updates(memory_store):
+    def add_many():
+        for _ in range(200):
+            memory_store.add("t1", "p1", product(1.0))
+
+    threads = [threading.Thread(target=add_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert quantities(memory_store.get("t1")) == {"p1": 800}
+
+def test_cart_expires_after_ttl(store, clock):
+    store.add("t1", "p1", product(10.0))
+    clock[0] += 59
+    assert quantities(store.get("t1")) == {"p1": 1}
+    clock[0] += 2
+    assert store.get("t1") == []
+
+def test_changes_push_expiry_forward(store, clock):
+    store.add("t1", "p1", product(10.0))
+    clock[0] += 50
+    store.add("t1", "p2", product(10.0))
+    clock[0] += 50
+    assert quantities(store.get("t1")) == {"p1": 1, "p2": 1}
+
+def test_expired_items_are_not_revived(store, clock):
+    store.add("t1", "p1", product(10.0), quantity=5)
+    clock[0] += 61
+    assert quantities(store.add("t1", "p1", product(10.0))) == {"p1": 1}
+
+def test_legacy_cookie_cart_moves_to_the_store(memory_store, monkeypatch):
+    monkeypatch.setattr(routes, "cart_store", memory_store)
+    app = Flask(__name__)
+    app.secret_key = "test"
+    with app.test_request_context():
+        session["cart"] = [
+            {"id": 7, "title": "Kettle", "price": "10.0", "quantity": 2, "source": "Amazon"},
+            {"id": "p2", "title": "Thing", "price": 5.5, "source": "Amazon"}
+        ]
+        token = routes.current_cart_token()
+        assert token and session["cart_token"] == token
+        assert "cart" not in session
+        assert quantities(routes.get_current_cart()) == {"7": 2, "p2": 1}
+        # Already moved: a second call doesn't add the items again
+        assert routes.current_cart_token() == token
+        assert quantities(routes.get_current_cart()) == {"7": 2, "p2": 1}
+
+def test_no_token_without_a_cart(memory_store, monkeypatch):
+    monkeypatch.setattr(routes, "cart_store", memory_store)
+    app = Flask(__name__)
+    app.secret_key = "test"
+    with app.test_request_context():
+        assert routes.current_cart_token() is None
+        assert routes.get_current_cart() == []
+        assert routes.current_cart_token(create=True)
@@ -0,0 +1,113 @@
+import time
+import pytest
+from app import routes
+from app import search_fanout
+from app import catalog_index as catalog
+from app.catalog_index import CatalogIndex
+
+def product(pid, title, price=100.0, source="Amazon"):
+    return {"id": pid, "title": title, "price": price, "source": source}
+
+@pytest.fixture
+def index():
+    index = CatalogIndex(max_docs=100)
+    index.add([
+        product("1", "Sony WH-1000XM5 wireless headphones"),
+        product("2", "Sony wireless speaker"),
+        product("3", "Bose wireless headphones with a long extra descriptive title for testing"),
+        product("4", "Apple iPhone 15 case"),
+        product("5", "Bose QuietComfort headphones", source="Walmart"),
+    ])
+    return index
+
+def ids(hits):
+    return [p["id"] for _, p in hits]
+
+def test_all_terms_required_by_default(index):
+    assert set(ids(index.search("wireless headphones"))) == {"1", "3"}
+    assert ids(index.search("sony iphone")) == []
+
+def test_shorter_titles_rank_higher_on_equal_terms(index):
+    assert ids(index.search("wireless headphones")) == ["1", "3"]
+
+def test_rare_terms_outweigh_common_ones(index):
+    # 'sony' is in 2 titles, 'headphones' in 3: with half the terms required, Sony headphones first,
+    # then the other Sony title (rarer word) before the other headphones
+    hits = ids(index.search("sony headphones", min_coverage=0.5))
+    assert hits[0] == "1"
+    assert hits[1] == "2"
+    assert set(hits) == {"1", "2", "3", "5"}
+
+def test_scores_are_sorted_and_limited(index):
+    hits = index.search("headphones", limit=2)
+    assert len(hits) == 2
+    assert hits[0][0] >= hits[1][0]
+
+def test_unpriced_and_empty_titles_are_skipped():
+    index = CatalogIndex()
+    index.add([product("1", "Kettle", price=0), product("2", "the and", price=10.0)])
+    assert len(index) == 0
+
+def test_readding_replaces_per_source_and_id(index):
+    index.add([product("1", "Sony WH-1000XM5 noise cancelling", price=80.0)])
+    assert len(index) == 5
+    assert ids(index.search("wireless headphones")) == ["3"]
+    [(_, hit)] = index.search("noise cancelling")
+    assert hit["price"] == 80.0
+    # Same id from another store is a different document
+    index.add([product("1", "Sony WH-1000XM5 noise cancelling", source="Walmart")])
+    assert len(index) == 6
+
+def test_older_copy_does_not_replace_a_newer_one():
+    index = CatalogIndex()
+    index.add([product("1", "Kettle", price=20.0)], indexed_at=200)
+    index.add([product("1", "Kettle", price=30.0)], indexed_at=100)
+    assert index.search("kettle")[0][1]["price"] == 20.0
+
+def test_oldest_documents_are_evicted_past_max_docs():
+    index = CatalogIndex(max_docs=3)
+    index.add([product(str(i), f"kettle model{i}") for i in range(5)])
+    assert len(index) == 3
+    assert set(ids(index.search("kettle"))) == {"2", "3", "4"}
+    assert index.stats()["terms"] == 4  # kettle + the three models left
+    assert ids(index.search("model0")) == []
+
+def test_max_age_filters_old_documents():
+    index = CatalogIndex()
+    index.add([product("1", "Kettle")], indexed_at=time.time() - 1000)
+    index.add([product("2", "Kettle")])
+    assert ids(index.search("kettle", max_age=500)) == ["2"]
+
+def test_exact_cached_query_beats_the_local_catalog(monkeypatch):
+    local = [product(str(i), "tv", source=f"Store {i % 3}") for i in range(25)]
+    monkeypatch.setattr(routes, "search_catalog", lambda query: (local, True))
+    monkeypatch.setattr(routes, "fan_out_search",
+                        lambda query: iter([("amazon", local + [product("x", "tv")], "fresh", 1.0)]))
+
+    monkeypatch.setattr(routes, "has_fresh_results", lambda query: False)
+    summary, _, _ = routes.run_search("tv")
+    assert summary["cache_state"] == {"local": "fresh"}
+
+    monkeypatch.setattr(routes, "has_fresh_results", lambda query: True)
+    summary, _, _ = routes.run_search("tv")
+    assert summary["cache_state"] == {"amazon": "fresh"}
+    assert summary["total"] == 26
+
+def test_search_catalog_needs_enough_stores(monkeypatch):
+    index = CatalogIndex()
+    monkeypatch.setattr(catalog, "catalog_index", index)
+    monkeypatch.setattr(catalog, "start_warm_load", lambda: None)
+    monkeypatch.setattr(catalog, "CATALOG_MIN_RESULTS", 2)
+    monkeypatch.setattr(catalog, "CATALOG_MIN_STORES", 2)
+    index.add([product("1", "kettle"), product("2", "kettle")])
+    assert catalog.search_catalog("kettle")[1] is False
+    index.add([product("3", "kettle", source="Walmart")])
+    assert catalog.search_catalog("kettle")[1] is True
+
+def test_has_fresh_results_needs_a_fresh_exact_entry(monkeypatch):
+    entries = {"walmart_tv": ([product("1", "tv")], time.time() - 10 * 86400)}
+    monkeypatch.setattr(search_fanout, "peek_cache", lambda key: entries.get(key, (None, None)))
+    assert not search_fanout.has_fresh_results("tv")
+    entries["bestbuy_tv"] = ([product("2", "tv")], time.time())
+    assert search_fanout.has_fresh_results("tv")
+    assert not search_fanout.has_fresh_results("tvs")
@@ -0,0 +1,65 @@
+import time
+import pytest
+from app.circuit_breaker import CircuitBreaker
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker("store", failure_threshold=2, cooldown=0.05)
+
+def open_circuit(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+def test_closed_until_threshold(breaker):
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.stats()["state"] == "open"
+    assert not breaker.allow()
+
+def test_success_resets_failure_count(breaker):
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.stats()["state"] == "closed"
+
+def test_half_open_lets_one_trial_through(breaker):
+    open_circuit(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert breaker.stats()["state"] == "half-open"
+
+def test_trial_success_closes(breaker):
+    open_circuit(breaker)
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.stats()["state"] == "closed"
+    assert breaker.allow()
+
+def test_trial_failure_reopens(breaker):
+    open_circuit(breaker)
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.stats()["state"] == "open"
+    assert breaker.stats()["times_opened"] == 2
+    assert not breaker.allow()
+
+def test_released_trial_lets_the_next_call_try(breaker):
+    open_circuit(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
+
+@pytest.mark.parametrize("state", ["fresh", "stale", "limited"])
+def test_fanout_releases_trial_answered_from_cache(monkeypatch, state):
+    from app import search_fanout
+    breaker = CircuitBreaker("amazon", failure_threshold=1, cooldown=0)
+    monkeypatch.setitem(search_fanout.breakers, "amazon", breaker)
+    breaker.record_failure()
+    assert breaker.allow()
+    search_fanout._record("amazon", state)
+    assert breaker.allow()
@@ -0,0 +1,54 @@
+from app.credit_budget import CreditBudget
+
+RESERVES = {"interactive": 0.0, "background": 0.3, "suggestion": 0.5}
+
+def make_budget(tmp_path, rate=0, burst=0, daily=0, monthly=0):
+    return CreditBudget(str(tmp_path / "credits.sqlite3"), rate, burst, daily, monthly, RESERVES)
+
+def test_disabled_by_default_limits(tmp_path):
+    budget = make_budget(tmp_path)
+    assert not budget.enabled
+    assert budget.acquire() == (True, None)
+    assert budget.stats() == {"enabled": False}
+
+def test_burst_then_rate_limited(tmp_path):
+    budget = make_budget(tmp_path, rate=1, burst=3)
+    assert [budget.acquire()[0] for _ in range(3)] == [True, True, True]
+    assert budget.acquire() == (False, "rate")
+
+def test_burst_defaults_to_one_minute_of_rate(tmp_path):
+    assert make_budget(tmp_path, rate=10).burst == 10
+
+def test_daily_budget(tmp_path):
+    budget = make_budget(tmp_path, daily=2)
+    assert budget.acquire()[0] and budget.acquire()[0]
+    assert budget.acquire() == (False, "daily")
+    assert budget.stats()["used_today"] == 2
+
+def test_lower_priorities_leave_a_reserve(tmp_path):
+    budget = make_budget(tmp_path, daily=10)
+    for _ in range(5):
+        assert budget.acquire("suggestion")[0]
+    assert budget.acquire("suggestion") == (False, "daily")
+    assert budget.available("background")
+    assert budget.available("interactive")
+
+def test_available_spends_nothing(tmp_path):
+    budget = make_budget(tmp_path, daily=1)
+    assert budget.available()
+    assert budget.available()
+    assert budget.stats()["used_today"] == 0
+
+def test_state_is_shared_through_the_file(tmp_path):
+    first = make_budget(tmp_path, daily=2)
+    second = make_budget(tmp_path, daily=2)
+    first.acquire()
+    second.acquire()
+    assert first.acquire() == (False, "daily")
+
+def test_fails_open_when_the_file_is_unusable(tmp_path):
+    (tmp_path / "blocked").write_text("")
+    budget = CreditBudget(str(tmp_path / "blocked" / "credits.sqlite3"), 1, 1, 0, 0, RESERVES)
+    assert budget.available()
+    assert budget.acquire() == (True, None)
+    assert "error" in budget.stats()
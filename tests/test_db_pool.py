@@ -0,0 +1,183 @@
+import threading
+import pytest
+from app import db_pool
+from app.db_pool import ConnectionPool
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql):
+        if self.conn.dead:
+            raise OSError("server has gone away")
+        self.conn.pings += 1
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    """psycopg2-like: `closed` is checked locally, `dead` only shows on a round trip."""
+
+    def __init__(self):
+        self.closed = 0
+        self.dead = False
+        self.pings = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.dead:
+            raise OSError("server has gone away")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+class FakeDriver:
+    def __init__(self):
+        self.opened = []
+        self.fail = False
+
+    def connect(self):
+        if self.fail:
+            raise OSError("connection refused")
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+@pytest.fixture
+def driver():
+    return FakeDriver()
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(db_pool.time, "monotonic", lambda: now[0])
+    return now
+
+def make_pool(driver, **kwargs):
+    options = dict(min_size=0, max_size=2, idle_timeout=300, ping_after=30, checkout_timeout=0.2)
+    options.update(kwargs)
+    return ConnectionPool(driver.connect, **options)
+
+def test_connections_are_reused(driver):
+    pool = make_pool(driver)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert len(driver.opened) == 1
+    assert first.rollbacks == 2  # Every return ends the transaction
+    assert pool.stats()["checkouts"] == 2
+
+def test_min_size_is_opened_on_first_use(driver):
+    pool = make_pool(driver, min_size=2, max_size=3)
+    assert driver.opened == []
+    conn = pool.acquire()
+    assert len(driver.opened) == 2
+    stats = pool.stats()
+    assert (stats["size"], stats["idle"], stats["in_use"]) == (2, 1, 1)
+    pool.release(conn)
+
+def test_min_size_is_capped_by_max_size(driver):
+    pool = make_pool(driver, min_size=5, max_size=2)
+    pool.release(pool.acquire())
+    assert len(driver.opened) == 2
+
+def test_failed_prefill_gives_back_its_slots(driver):
+    driver.fail = True
+    pool = make_pool(driver, min_size=2)
+    assert pool.acquire() is None
+    assert pool.stats()["size"] == 0
+    driver.fail = False
+    assert pool.acquire() is not None
+
+def test_full_pool_waits_then_times_out(driver):
+    pool = make_pool(driver, max_size=1, checkout_timeout=0.1)
+    held = pool.acquire()
+    assert pool.acquire() is None
+    assert pool.stats()["timeouts"] == 1
+    assert len(driver.opened) == 1
+    pool.release(held)
+
+def test_waiter_gets_a_released_connection(driver):
+    pool = make_pool(driver, max_size=1, checkout_timeout=2)
+    held = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    threading.Timer(0.05, pool.release, args=(held,)).start()
+    waiter.join(3)
+    assert got == [held]
+    assert pool.stats()["waits"] == 1
+
+def test_idle_connections_are_pinged_after_ping_after(driver, clock):
+    pool = make_pool(driver)
+    conn = pool.acquire()
+    pool.release(conn)
+    clock[0] += 10
+    pool.release(pool.acquire())
+    assert conn.pings == 0
+    clock[0] += 31
+    assert pool.acquire() is conn
+    assert conn.pings == 1
+
+def test_dead_connection_is_replaced(driver, clock):
+    pool = make_pool(driver)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.dead = True
+    clock[0] += 31
+    replacement = pool.acquire()
+    assert replacement is not conn
+    assert conn.closed
+    stats = pool.stats()
+    assert (stats["failed_checks"], stats["size"]) == (1, 1)
+
+def test_closed_connection_is_not_returned_to_the_pool(driver):
+    pool = make_pool(driver)
+    with pool.connection() as conn:
+        conn.close()
+    assert pool.stats()["size"] == 0
+
+def test_idle_connections_are_reaped_down_to_min_size(driver, clock):
+    pool = make_pool(driver, min_size=1, max_size=3, idle_timeout=60)
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+    assert pool.stats()["size"] == 3
+    clock[0] += 61
+    pool.release(pool.acquire())
+    assert pool.stats()["size"] == 1
+    assert sum(1 for conn in conns if conn.closed) == 2
+
+def test_fork_forgets_inherited_connections(driver, monkeypatch):
+    pool = make_pool(driver, min_size=1, max_size=2)
+    parent_idle = pool.acquire()
+    pool.release(parent_idle)
+    in_use = pool.acquire()
+
+    monkeypatch.setattr(db_pool.os, "getpid", lambda: -1)
+    child_conn = pool.acquire()
+    assert child_conn is not parent_idle and child_conn is not in_use
+    # The parent's connections are neither reused nor closed, and don't count in the child
+    pool.release(in_use, broken=True)
+    assert not in_use.closed and not parent_idle.closed
+    stats = pool.stats()
+    assert (stats["size"], stats["in_use"]) == (1, 1)
+    pool.release(child_conn)
+    assert pool.stats()["size"] == 1
+
+def test_close_all_closes_idle_connections(driver):
+    pool = make_pool(driver)
+    conns = [pool.acquire(), pool.acquire()]
+    for conn in conns:
+        pool.release(conn)
+    pool.close_all()
+    assert all(conn.closed for conn in conns)
+    assert pool.stats()["size"] == 0
@@ -0,0 +1,41 @@
+import time
+import pytest
+from flask import Flask
+from app import routes
+from app.http_cache import versioned_json, remaining_ttl
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+def respond(app, version, stored, etag=None):
+    headers = {"If-None-Match": f'"{etag}"'} if etag else {}
+    with app.test_request_context("/api/search?q=tv", headers=headers):
+        return versioned_json(lambda: {"ok": True}, version, stored)
+
+def test_repeat_with_etag_is_not_modified(app):
+    stored = [("fresh", time.time())]
+    first = respond(app, ("fresh", 1.0), stored)
+    assert first.status_code == 200
+    etag = first.get_etag()[0]
+    assert respond(app, ("fresh", 1.0), stored, etag).status_code == 304
+    assert respond(app, ("fresh", 2.0), stored, etag).status_code == 200
+
+def test_stale_entries_are_not_cacheable():
+    now = time.time()
+    assert remaining_ttl([("fresh", now), ("live", now)], cap=300) == 300
+    assert remaining_ttl([("fresh", now), ("stale", now)]) is None
+
+def test_search_version_changes_with_cache_state(monkeypatch):
+    states = iter(["live", "fresh"])
+
+    def fan_out_search(query):
+        state = next(states)
+        yield "amazon", [{"id": "a1", "title": "TV", "price": 100.0}], state, 1234.0
+
+    monkeypatch.setattr(routes, "fan_out_search", fan_out_search)
+    live_summary, live_version, _ = routes.run_search("tv", use_local=False)
+    fresh_summary, fresh_version, _ = routes.run_search("tv", use_local=False)
+    # The bodies differ (cache_state), so their strong ETags must too
+    assert live_summary["cache_state"] != fresh_summary["cache_state"]
+    assert live_version != fresh_version
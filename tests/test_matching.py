@@ -0,0 +1,62 @@
+from app.matching import title_tokens, similarity, extract_model_numbers, group_products
+
+def listing(pid, title, price, source="Amazon"):
+    return {"id": pid, "title": title, "price": price, "source": source}
+
+def grouped_ids(groups):
+    return sorted(sorted(o["id"] for o in g["offers"]) for g in groups)
+
+def test_title_tokens_join_hyphens_and_drop_filler():
+    assert title_tokens("The Sony WH-1000XM5, Free Shipping!") == {"sony", "wh1000xm5"}
+
+def test_model_numbers_ignore_sizes_and_years():
+    assert extract_model_numbers({"wh1000xm5", "256gb", "15in", "2024", "2pack", "sony", "a2894"}) == {"wh1000xm5", "a2894"}
+
+def test_similarity_is_jaccard():
+    assert similarity({"a", "b", "c"}, {"b", "c", "d"}) == 0.5
+    assert similarity(set(), {"a"}) == 0.0
+
+def test_model_number_spellings_merge():
+    groups = group_products([
+        listing("1", "Sony WH-1000XM5 Wireless Noise Cancelling Headphones", 348.0),
+        listing("2", "sony wh1000xm5 black", 329.0, "Walmart"),
+        listing("3", "Sony WH-1000XM4 Wireless Noise Cancelling Headphones", 248.0),
+    ])
+    assert grouped_ids(groups) == [["1", "2"], ["3"]]
+    xm5 = next(g for g in groups if g["offer_count"] == 2)
+    assert (xm5["id"], xm5["min_price"], xm5["max_price"]) == ("2", 329.0, 348.0)
+    assert xm5["stores"] == ["Amazon", "Walmart"]
+    assert [o["price"] for o in xm5["offers"]] == [329.0, 348.0]
+
+def test_similar_titles_merge_without_model_numbers():
+    groups = group_products([
+        listing("1", "Stainless Steel Electric Kettle 1.7 Liter", 30.0),
+        listing("2", "Electric Kettle Stainless Steel 1.7 Liter Cordless", 28.0, "Target"),
+        listing("3", "Ceramic Coffee Mug Set", 20.0),
+    ])
+    assert grouped_ids(groups) == [["1", "2"], ["3"]]
+
+def test_low_jaccard_is_rejected():
+    groups = group_products([
+        listing("1", "Stainless Steel Electric Kettle", 30.0),
+        listing("2", "Stainless Steel Water Bottle Insulated", 30.0),
+    ])
+    assert grouped_ids(groups) == [["1"], ["2"]]
+
+def test_price_ratio_rejects_same_titles():
+    groups = group_products([
+        listing("1", "Sony WH-1000XM5 Headphones", 100.0),
+        listing("2", "Sony WH-1000XM5 Headphones", 300.0, "eBay"),
+    ])
+    assert grouped_ids(groups) == [["1"], ["2"]]
+
+def test_union_find_merges_transitively():
+    # 1 and 3 share no model number, but each shares one with 2
+    groups = group_products([
+        listing("1", "Acme XY1234 camera", 500.0),
+        listing("2", "Acme XY1234 camera with ZQ5678 lens kit", 600.0, "Best Buy"),
+        listing("3", "Acme ZQ5678 lens", 550.0, "Walmart"),
+        listing("4", "Tripod", 40.0),
+    ])
+    assert grouped_ids(groups) == [["1", "2", "3"], ["4"]]
+    assert [g["min_price"] for g in groups] == [40.0, 500.0]
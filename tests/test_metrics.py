@@ -0,0 +1,65 @@
+from flask import Flask
+from app import metrics
+from app.metrics import Counter, Gauge, Histogram, HTTP_IN_PROGRESS
+
+def in_progress():
+    # The unlabelled series is the last line of the rendered gauge (absent until first set)
+    line = HTTP_IN_PROGRESS.render()[-1]
+    return 0 if line.startswith("#") else float(line.split()[-1])
+
+seen = []
+
+def make_app(monkeypatch, guard=None):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "")
+    app = Flask(__name__)
+    if guard:
+        app.before_request(guard)  # Runs before the metrics hook
+    metrics.init_metrics(app)
+
+    @app.route("/ping")
+    def ping():
+        seen.append(in_progress())
+        return "pong"
+
+    return app.test_client()
+
+def test_gauge_counts_requests_in_progress(monkeypatch):
+    client = make_app(monkeypatch)
+    before = in_progress()
+    assert client.get("/ping").data == b"pong"
+    assert seen[-1] == before + 1
+    assert in_progress() == before
+
+def test_gauge_does_not_drift_when_an_earlier_hook_answers(monkeypatch):
+    client = make_app(monkeypatch, guard=lambda: ("Service unavailable", 503))
+    before = in_progress()
+    for _ in range(3):
+        assert client.get("/ping").status_code == 503
+    assert in_progress() == before
+
+def test_request_durations_are_recorded_by_route(monkeypatch):
+    client = make_app(monkeypatch)
+    client.get("/ping")
+    client.get("/missing")
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="GET",route="/ping",status="200"}' in text
+    assert 'route="unmatched",status="404"' in text
+
+def test_metric_types_render():
+    counter = Counter("test_events_total", "Events.", ("kind",))
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    assert counter.render()[-1] == 'test_events_total{kind="a"} 3'
+
+    gauge = Gauge("test_level", "Level.")
+    gauge.set(5)
+    gauge.dec()
+    assert gauge.render()[-1] == "test_level 4"
+
+    histogram = Histogram("test_seconds", "Time.", buckets=(0.1, 1.0))
+    histogram.observe(0.5)
+    lines = histogram.render()
+    assert 'test_seconds_bucket{le="0.1"} 0' in lines
+    assert 'test_seconds_bucket{le="1.0"} 1' in lines
+    assert "test_seconds_count 1" in lines
@@ -0,0 +1,138 @@
+import sqlite3
+import pytest
+from app import migrate as migrations
+from app import database
+
+class FakeCursor:
+    """sqlite3 cursor speaking the MySQL driver's %s placeholders and advisory lock calls."""
+
+    def __init__(self, conn):
+        self._cursor = conn.cursor()
+        self._lock_row = None
+
+    def execute(self, sql, params=()):
+        if "GET_LOCK" in sql or "RELEASE_LOCK" in sql:
+            self._lock_row = (1,)
+            return
+        self._lock_row = None
+        self._cursor.execute(sql.replace("%s", "?"), params)
+
+    def fetchone(self):
+        return self._lock_row if self._lock_row is not None else self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+class FakeConnection:
+    """A MySQL-dialect connection (no .info attribute) backed by an in-memory SQLite database."""
+
+    def __init__(self):
+        self._conn = sqlite3.connect(":memory:", isolation_level=None)
+        self._conn.execute("BEGIN")
+
+    def cursor(self):
+        return FakeCursor(self._conn)
+
+    def commit(self):
+        self._conn.execute("COMMIT")
+        self._conn.execute("BEGIN")
+
+    def rollback(self):
+        self._conn.execute("ROLLBACK")
+        self._conn.execute("BEGIN")
+
+    def tables(self):
+        rows = self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+        return {row[0] for row in rows}
+
+@pytest.fixture
+def migrations_dir(tmp_path, monkeypatch):
+    (tmp_path / "0001_items.sql").write_text(
+        "-- Items\nCREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, name TEXT);\n"
+    )
+    (tmp_path / "0002_tags.mysql.sql").write_text("CREATE TABLE tags (id INTEGER PRIMARY KEY)")
+    (tmp_path / "0002_tags.postgres.sql").write_text("CREATE TABLE tags (id SERIAL PRIMARY KEY)")
+    (tmp_path / "0003_notes.sql").write_text(
+        "CREATE TABLE notes (id INTEGER PRIMARY KEY);\nCREATE INDEX idx_notes_id ON notes (id);"
+    )
+    (tmp_path / "README.md").write_text("not a migration")
+    monkeypatch.setattr(migrations, "MIGRATIONS_DIR", str(tmp_path))
+    monkeypatch.setattr(migrations, "_available", {})
+    return tmp_path
+
+def test_available_migrations_per_dialect(migrations_dir):
+    mysql = migrations.available_migrations("mysql")
+    assert [(v, name) for v, name, _ in mysql] == [(1, "items"), (2, "tags"), (3, "notes")]
+    assert mysql[1][2].endswith("0002_tags.mysql.sql")
+    assert migrations.available_migrations("postgres")[1][2].endswith("0002_tags.postgres.sql")
+    assert migrations.latest_version("mysql") == 3
+
+def test_duplicate_numbers_are_rejected(migrations_dir):
+    (migrations_dir / "0003_other.sql").write_text("SELECT 1")
+    with pytest.raises(ValueError):
+        migrations.available_migrations("mysql")
+
+def test_split_statements_drops_comments():
+    sql = "-- header\nCREATE TABLE a (id INT);\n\n  -- note\nCREATE TABLE b (id INT);\n"
+    assert migrations.split_statements(sql) == ["CREATE TABLE a (id INT)", "CREATE TABLE b (id INT)"]
+
+def test_current_version_without_table_is_zero():
+    assert migrations.current_version(FakeConnection()) == 0
+
+def test_migrate_up_to_target_then_the_rest(migrations_dir):
+    conn = FakeConnection()
+    assert migrations.migrate(conn, target=2) == [1, 2]
+    assert migrations.current_version(conn) == 2
+    assert "notes" not in conn.tables()
+
+    assert migrations.migrate(conn) == [3]
+    assert migrations.current_version(conn) == 3
+    assert {"items", "tags", "notes"} <= conn.tables()
+    assert set(migrations.applied_migrations(conn)) == {1, 2, 3}
+
+def test_migrate_is_idempotent(migrations_dir):
+    conn = FakeConnection()
+    migrations.migrate(conn)
+    assert migrations.migrate(conn) == []
+
+def test_failed_migration_keeps_earlier_ones_on_mysql(migrations_dir):
+    (migrations_dir / "0004_broken.sql").write_text("CREATE TABLE broken (")
+    conn = FakeConnection()
+    with pytest.raises(sqlite3.Error):
+        migrations.migrate(conn)
+    assert migrations.current_version(conn) == 3
+
+def test_new_migration_takes_the_next_number(migrations_dir):
+    paths = migrations.new_migration("Add price index!")
+    assert [p.rsplit("/", 1)[-1] for p in paths] == [
+        "0004_add_price_index.mysql.sql", "0004_add_price_index.postgres.sql"
+    ]
+    assert migrations.latest_version("mysql") == 4
+    shared = migrations.new_migration("shared", dialects=None)
+    assert shared[0].endswith("0005_shared.sql")
+    with pytest.raises(ValueError):
+        migrations.new_migration("  !! ")
+
+def test_ensure_schema_retries_after_a_failure(migrations_dir, monkeypatch):
+    monkeypatch.setattr(database, "_schema_checked", False)
+    monkeypatch.setattr(database, "_schema_retry_at", 0.0)
+    monkeypatch.setattr(database, "DB_AUTO_MIGRATE", True)
+    broken = migrations_dir / "0004_broken.sql"
+    broken.write_text("CREATE TABLE broken (")
+    conn = FakeConnection()
+
+    database.ensure_schema(conn)
+    assert not database._schema_checked
+    assert database._schema_retry_at > 0
+
+    broken.write_text("CREATE TABLE fixed (id INTEGER)")
+    database.ensure_schema(conn)  # Too soon to retry
+    assert not database._schema_checked
+
+    monkeypatch.setattr(database, "_schema_retry_at", 0.0)
+    database.ensure_schema(conn)
+    assert database._schema_checked
+    assert migrations.current_version(conn) == 4
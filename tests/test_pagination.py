@@ -0,0 +1,76 @@
+from app.config import PAGE_MAX_LIMIT
+from app.pagination import parse_page_args, encode_cursor, decode_cursor, paginate
+
+PRODUCTS = [
+    {"id": "a", "title": "Kettle", "price": 30.0, "source": "Amazon"},
+    {"id": "b", "title": "apron", "price": 10.0, "source": "Best Buy"},
+    {"id": "c", "title": "Blender", "price": 20.0, "source": "Walmart"},
+    {"id": "d", "title": "Dish rack", "price": 20.0, "source": "Amazon"},
+    {"id": "e", "title": "Espresso", "price": 50.0, "source": "Best Buy"},
+]
+
+def page_of(**args):
+    page, error = parse_page_args(args)
+    assert error is None
+    return page
+
+def ids(result):
+    return [p["id"] for p in result["products"]]
+
+def test_no_limit_or_cursor_means_no_paging():
+    assert parse_page_args({}) == (None, None)
+    assert parse_page_args({"sort": "title"}) == (None, None)
+
+def test_bad_args_are_errors():
+    assert parse_page_args({"limit": "x"})[1]
+    assert parse_page_args({"limit": "0"})[1]
+    assert parse_page_args({"limit": "5", "sort": "rating"})[1]
+    assert parse_page_args({"cursor": "not-a-cursor"})[1]
+
+def test_limit_is_capped():
+    assert page_of(limit=str(PAGE_MAX_LIMIT + 1))["limit"] == PAGE_MAX_LIMIT
+
+def test_source_accepts_store_ids_and_names():
+    page = page_of(limit="5", source="bestbuy, Walmart")
+    assert {"bestbuy", "best buy", "walmart"} <= page["sources"]
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("price_asc", (20.0, "c"))
+    assert decode_cursor(cursor, "price_asc") == (20.0, "c")
+    assert decode_cursor(cursor, "title") is None
+
+def test_cursor_from_another_sort_is_rejected():
+    cursor = encode_cursor("price_asc", (20.0, "c"))
+    assert parse_page_args({"cursor": cursor, "sort": "title"})[1]
+
+def test_pages_follow_the_sort_and_cover_every_product():
+    page = page_of(limit="2")
+    first = paginate(PRODUCTS, page)
+    assert ids(first) == ["b", "c"]
+    assert first["total"] == 5
+
+    page = page_of(limit="2", cursor=first["next_cursor"])
+    second = paginate(PRODUCTS, page)
+    assert ids(second) == ["d", "a"]
+
+    page = page_of(limit="2", cursor=second["next_cursor"])
+    last = paginate(PRODUCTS, page)
+    assert ids(last) == ["e"]
+    assert last["next_cursor"] is None
+
+def test_price_desc_and_title_sorts():
+    assert ids(paginate(PRODUCTS, page_of(limit="2", sort="price_desc"))) == ["e", "a"]
+    assert ids(paginate(PRODUCTS, page_of(limit="3", sort="title"))) == ["b", "c", "d"]
+
+def test_filters_apply_before_paging():
+    result = paginate(PRODUCTS, page_of(limit="10", min_price="15", max_price="40", source="amazon"))
+    assert ids(result) == ["d", "a"]
+    assert result["total"] == 2
+    assert result["next_cursor"] is None
+
+def test_cursor_survives_new_products():
+    page = page_of(limit="2")
+    first = paginate(PRODUCTS, page)
+    grown = PRODUCTS + [{"id": "f", "title": "Fork", "price": 5.0, "source": "Amazon"}]
+    second = paginate(grown, page_of(limit="2", cursor=first["next_cursor"]))
+    assert ids(second) == ["d", "a"]
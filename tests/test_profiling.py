@@ -0,0 +1,54 @@
+import json
+import pytest
+from flask import Flask
+from app import profiling
+from app.profiling import span
+
+def make_app(monkeypatch, tmp_path, token="", sample_rate=0.0, slow_ms=0):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", token)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", sample_rate)
+    monkeypatch.setattr(profiling, "PROFILE_SLOW_MS", slow_ms)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    app = Flask(__name__)
+
+    @app.route("/work")
+    def work():
+        with span("stage"):
+            sum(range(1000))
+        return "ok"
+
+    profiling.init_profiling(app)
+    return app.test_client()
+
+def reports(tmp_path):
+    return [json.loads(p.read_text()) for p in sorted(tmp_path.glob("*.json"))]
+
+def test_unprofiled_request_is_not_reported(monkeypatch, tmp_path):
+    client = make_app(monkeypatch, tmp_path, slow_ms=60_000)
+    response = client.get("/work")
+    assert "Server-Timing" not in response.headers
+    assert reports(tmp_path) == []
+
+def test_sampled_request_is_reported_and_saved(monkeypatch, tmp_path):
+    client = make_app(monkeypatch, tmp_path, sample_rate=1.0, slow_ms=60_000)
+    response = client.get("/work")
+    assert "stage;dur=" in response.headers["Server-Timing"]
+    [report] = reports(tmp_path)
+    assert report["id"] == response.headers["X-Profile-Id"]
+    assert report["mode"] == "sample"
+    assert [s["name"] for s in report["spans"]] == ["stage"]
+    assert list(tmp_path.glob("*.folded"))
+
+def test_token_request_uses_cprofile(monkeypatch, tmp_path):
+    client = make_app(monkeypatch, tmp_path, token="secret")
+    response = client.get("/work", headers={"X-Profile": "secret"})
+    assert "Server-Timing" in response.headers
+    assert reports(tmp_path)[0]["mode"] == "cprofile"
+    assert list(tmp_path.glob("*.prof"))
+
+@pytest.mark.parametrize("token", ["wrong", ""])
+def test_bad_token_is_ignored(monkeypatch, tmp_path, token):
+    client = make_app(monkeypatch, tmp_path, token="secret")
+    response = client.get("/work", headers={"X-Profile": token})
+    assert "Server-Timing" not in response.headers
+    assert reports(tmp_path) == []
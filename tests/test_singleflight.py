@@ -0,0 +1,108 @@
+import threading
+import pytest
+from app.singleflight import SingleFlight, file_lock
+
+CALLERS = 8
+
+def run_concurrently(flight, key, fn, timeout=5):
+    """Start CALLERS threads calling flight.do; returns (threads, results, errors) to join and check."""
+    results, errors = [], []
+    lock = threading.Lock()
+
+    def caller():
+        try:
+            value = flight.do(key, fn, timeout)
+            with lock:
+                results.append(value)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+def wait_for_followers(flight, count):
+    # Followers register (deduplicated += 1) before they wait on the leader
+    while flight.stats()["deduplicated"] < count:
+        threading.Event().wait(0.001)
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return ["product"]
+
+    threads, results, errors = run_concurrently(flight, "amazon_tv", fetch)
+    wait_for_followers(flight, CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [["product"]] * CALLERS
+    assert errors == []
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "deduplicated": CALLERS - 1, "cross_worker_deduplicated": 0}
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise TimeoutError("upstream timed out")
+
+    threads, results, errors = run_concurrently(flight, "amazon_tv", fetch)
+    wait_for_followers(flight, CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == []
+    assert len(errors) == CALLERS
+    assert all(isinstance(e, TimeoutError) for e in errors)
+
+def test_next_call_after_completion_runs_again():
+    flight = SingleFlight()
+    assert flight.do("k", lambda: 1) == 1
+    assert flight.do("k", lambda: 2) == 2
+    assert flight.stats()["leaders"] == 2
+
+def test_different_keys_do_not_wait_on_each_other():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("slow", lambda: release.wait(5)))
+    leader.start()
+    try:
+        assert flight.do("fast", lambda: "done") == "done"
+        assert flight.in_flight("slow")
+    finally:
+        release.set()
+        leader.join()
+
+def test_follower_gives_up_after_timeout():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("k", lambda: release.wait(5)))
+    leader.start()
+    try:
+        while not flight.in_flight("k"):
+            threading.Event().wait(0.001)
+        assert flight.do("k", lambda: "unused", timeout=0.05) is None
+    finally:
+        release.set()
+        leader.join()
+
+def test_file_lock_is_exclusive(tmp_path):
+    pytest.importorskip("fcntl")
+    with file_lock(str(tmp_path), "amazon_tv", timeout=1) as first:
+        assert first
+        with file_lock(str(tmp_path), "amazon_tv", timeout=0.1) as second:
+            assert not second
+        with file_lock(str(tmp_path), "walmart_tv", timeout=0.1) as other:
+            assert other